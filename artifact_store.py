@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Almacén de artefactos direccionado por contenido (SQLite + blobs)
+Las capturas y los reportes JSON se guardan una sola vez con el hash SHA-256 de
+su contenido como nombre (blobs/ab/abcd....png), repartidos en 256
+subdirectorios. Cada ejecución registra qué blobs usa cada comparación (su
+manifiesto), y la recolección de basura borra las ejecuciones que caen fuera
+de la política de retención (antigüedad, tamaño total) y los blobs que ya nadie
+referencia. Los nombres de siempre (page_v1_screenshot.png,
+comparison_*.json) son enlaces duros a la última versión: no ocupan espacio
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from shared_results import journal_mode
+
+
+ARTIFACT_DB_NAME = "artifacts.db"
+BLOBS_DIRNAME = "blobs"
+
+# Un blob sin referencias más reciente que esto puede pertenecer a una ejecución
+# en curso (las referencias se registran al terminar cada comparación)
+GC_GRACE_SECONDS = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (
+    run_id TEXT NOT NULL,
+    comparison TEXT NOT NULL,
+    role TEXT NOT NULL,
+    key TEXT NOT NULL REFERENCES blobs(key),
+    created_at REAL NOT NULL,
+    PRIMARY KEY (run_id, comparison, role)
+);
+CREATE INDEX IF NOT EXISTS idx_refs_key ON refs(key);
+CREATE INDEX IF NOT EXISTS idx_refs_comparison ON refs(comparison, created_at);
+"""
+
+
+def blob_key(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _link(target: Path, alias: Path) -> None:
+    """Sustituye `alias` de forma atómica por un enlace duro a `target` (copia si no se puede)"""
+    if alias.exists() and os.path.samefile(target, alias):
+        return
+    tmp_path = alias.with_name(f".{alias.name}.{threading.get_ident()}.link")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        os.link(target, tmp_path)
+    except OSError:
+        shutil.copyfile(target, tmp_path)
+    os.replace(tmp_path, alias)
+    # rename() no hace nada si ambos nombres ya son el mismo inodo (carrera con otro hilo)
+    tmp_path.unlink(missing_ok=True)
+
+
+def _recompress_png(path: Path, alias: Optional[Path]) -> None:
+    """Recompresión PNG sin pérdida (optimize). Conserva el mtime para que las
+    previsualizaciones no se consideren obsoletas, y mueve el alias al blob nuevo."""
+    from PIL import Image
+
+    before = path.stat()
+    tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+    with Image.open(path) as img:
+        img.save(tmp_path, format='PNG', optimize=True)
+    if tmp_path.stat().st_size >= before.st_size:
+        tmp_path.unlink()
+        return
+    os.utime(tmp_path, ns=(before.st_atime_ns, before.st_mtime_ns))
+    os.replace(tmp_path, path)
+    if alias is not None:
+        try:
+            if alias.stat().st_ino == before.st_ino:
+                _link(path, alias)
+        except FileNotFoundError:
+            pass
+
+
+class ArtifactStore:
+    """Blobs por contenido y referencias (ejecución, comparación, rol) -> blob.
+
+    Las escrituras van por el ArtifactWriter (en segundo plano, atómicas);
+    la base de datos se usa desde un solo hilo a la vez (el de ArtifactWriter.run_db
+    mientras hay comparaciones en curso).
+    """
+
+    def __init__(self, db_path: Path, results_dir: Path, writer=None, recompress: bool = False):
+        self.db_path = Path(db_path)
+        self.results_dir = Path(results_dir)
+        self.writer = writer
+        self.recompress = recompress  # recompresión PNG en segundo plano tras escribir cada captura nueva
+        self._recompressor: Optional[ThreadPoolExecutor] = None
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # put() y record_refs() llegan desde el hilo de ArtifactWriter.run_db
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(f"PRAGMA journal_mode={journal_mode(self.db_path.parent)}")
+        self.conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_results_dir(cls, results_dir: Path, writer=None, **kwargs) -> "ArtifactStore":
+        return cls(Path(results_dir) / ARTIFACT_DB_NAME, results_dir, writer, **kwargs)
+
+    def close(self) -> None:
+        if self._recompressor is not None:
+            self._recompressor.shutdown()
+        self.conn.close()
+
+    def blob_path(self, key: str, suffix: str) -> Path:
+        return self.results_dir / BLOBS_DIRNAME / key[:2] / f"{key}{suffix}"
+
+    # --- Escritura ---
+
+    def put(self, data: bytes, suffix: str, kind: str, tag: str = None, alias: Path = None,
+            key: str = None) -> str:
+        """Guarda `data` (si no está ya) y devuelve su ruta relativa a results_dir.
+
+        El blob se escribe en segundo plano: usar writer.wait_for() con la ruta
+        antes de leerlo. `alias` se enlaza al blob en cuanto está en disco.
+        """
+        key = key or blob_key(data)
+        path = self.blob_path(key, suffix)
+        relpath = path.relative_to(self.results_dir).as_posix()
+        now = time.time()
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO blobs (key, path, kind, size, created_at, last_used_at) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET last_used_at = excluded.last_used_at
+            """, (key, relpath, kind, len(data), now, now))
+
+        if path.exists():
+            # Contenido ya almacenado: solo se mueve el alias
+            if alias is not None:
+                _link(path, alias)
+            return relpath
+
+        recompress = self.recompress and suffix == ".png"
+
+        def after_write(written: Path):
+            if alias is not None:
+                _link(written, alias)
+            if recompress:
+                self._recompression_pool().submit(_recompress_png, written, alias)
+
+        self.writer.write(path, data, tag, then=after_write)
+        return relpath
+
+    def _recompression_pool(self) -> ThreadPoolExecutor:
+        # Un solo hilo: la recompresión no compite con las escrituras por la CPU
+        if self._recompressor is None:
+            self._recompressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact-recompress")
+        return self._recompressor
+
+    def record_refs(self, run_id: str, comparison: str, refs: Dict[str, str]) -> None:
+        """Manifiesto de la comparación en la ejecución: {rol: ruta relativa del blob}.
+        El nombre de cada blob (sin extensión) es su clave."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO refs (run_id, comparison, role, key, created_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(run_id, comparison, role) DO UPDATE SET
+                    key = excluded.key, created_at = excluded.created_at
+            """, [(str(run_id), comparison, role, Path(relpath).stem, now)
+                  for role, relpath in refs.items()])
+
+    # --- Consulta ---
+
+    def manifest(self, run_id: str) -> Dict[str, Dict[str, str]]:
+        """{comparación: {rol: ruta del blob}} de una ejecución"""
+        rows = self.conn.execute("""
+            SELECT refs.comparison, refs.role, blobs.path FROM refs JOIN blobs ON blobs.key = refs.key
+            WHERE refs.run_id = ? ORDER BY refs.comparison, refs.role
+        """, (str(run_id),)).fetchall()
+        manifest: Dict[str, Dict[str, str]] = {}
+        for row in rows:
+            manifest.setdefault(row['comparison'], {})[row['role']] = row['path']
+        return manifest
+
+    def runs(self) -> List[sqlite3.Row]:
+        return self.conn.execute("""
+            SELECT run_id, MIN(created_at) AS started_at, COUNT(DISTINCT comparison) AS comparisons,
+                   COUNT(DISTINCT key) AS blobs
+            FROM refs GROUP BY run_id ORDER BY started_at
+        """).fetchall()
+
+    def stats(self) -> Dict[str, int]:
+        blobs = self.conn.execute("SELECT COUNT(*) AS n, COALESCE(SUM(size), 0) AS size FROM blobs").fetchone()
+        refs = self.conn.execute("""
+            SELECT COUNT(*) AS n, COALESCE(SUM(blobs.size), 0) AS size, COUNT(DISTINCT refs.run_id) AS runs
+            FROM refs JOIN blobs ON blobs.key = refs.key
+        """).fetchone()
+        return {"blobs": blobs['n'], "blob_bytes": blobs['size'], "runs": refs['runs'],
+                "refs": refs['n'], "referenced_bytes": refs['size']}
+
+    # --- Recolección de basura ---
+
+    def gc(self, max_age_days: float = None, max_bytes: int = None, dry_run: bool = False,
+           grace_seconds: float = GC_GRACE_SECONDS) -> Dict:
+        """Aplica la retención y borra los blobs sin referencias (y sus previsualizaciones).
+
+        - `max_age_days`: se descartan las ejecuciones más antiguas.
+        - `max_bytes`: se descartan ejecuciones, de la más antigua a la más nueva,
+          hasta que los blobs referenciados quepan.
+        La última versión de cada comparación (la que muestran el índice y los
+        reportes con nombre fijo) se conserva siempre.
+        """
+        now = time.time()
+        # (comparación, rol) -> referencia más reciente: protegida
+        latest = {}
+        for row in self.conn.execute("SELECT run_id, comparison, role, key, created_at FROM refs ORDER BY created_at"):
+            latest[(row['comparison'], row['role'])] = (row['run_id'], row['key'])
+        protected_refs = {(run_id, comparison, role) for (comparison, role), (run_id, _) in latest.items()}
+
+        runs = [row['run_id'] for row in self.runs()]
+        dropped = set()
+        if max_age_days is not None:
+            cutoff = now - max_age_days * 86400
+            dropped |= {row['run_id'] for row in self.runs() if row['started_at'] < cutoff}
+
+        refs = self.conn.execute("SELECT run_id, comparison, role, key FROM refs").fetchall()
+        sizes = {row['key']: self._stored_size(row['path'], row['size'])
+                 for row in self.conn.execute("SELECT key, path, size FROM blobs")}
+
+        def kept_keys():
+            return {ref['key'] for ref in refs
+                    if ref['run_id'] not in dropped or (ref['run_id'], ref['comparison'], ref['role']) in protected_refs}
+
+        if max_bytes is not None:
+            for run_id in runs:
+                if sum(sizes.get(key, 0) for key in kept_keys()) <= max_bytes:
+                    break
+                dropped.add(run_id)
+
+        kept = kept_keys()
+        ever_referenced = {ref['key'] for ref in refs}
+        unreferenced = [row for row in self.conn.execute("SELECT key, path, created_at FROM blobs")
+                        if row['key'] not in kept and (row['key'] in ever_referenced
+                                                         or row['created_at'] < now - grace_seconds)]
+        result = {"runs_dropped": len(dropped), "blobs_deleted": len(unreferenced),
+                  "bytes_freed": sum(sizes.get(row['key'], 0) for row in unreferenced),
+                  "bytes_kept": sum(sizes.get(key, 0) for key in kept), "dry_run": dry_run}
+        if dry_run:
+            return result
+
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM refs WHERE run_id = ? AND comparison = ? AND role = ?",
+                [(ref['run_id'], ref['comparison'], ref['role']) for ref in refs
+                 if ref['run_id'] in dropped and (ref['run_id'], ref['comparison'], ref['role']) not in protected_refs]
+            )
+            self.conn.executemany("DELETE FROM blobs WHERE key = ?", [(row['key'],) for row in unreferenced])
+        if unreferenced:
+            from thumbnails import preview_paths
+            for row in unreferenced:
+                path = self.results_dir / row['path']
+                path.unlink(missing_ok=True)
+                thumb_path, tiles_dir = preview_paths(path, self.results_dir)
+                thumb_path.unlink(missing_ok=True)
+                shutil.rmtree(tiles_dir, ignore_errors=True)
+        return result
+
+    def _stored_size(self, relpath: str, size: int) -> int:
+        # Tamaño real en disco (distinto del original si se recompresó)
+        try:
+            return (self.results_dir / relpath).stat().st_size
+        except FileNotFoundError:
+            return size
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Escritura de artefactos en segundo plano (capturas, JSON, HTML)
+Las escrituras se hacen en un pool de hilos desde objetos en memoria, de forma
+atómica (fichero temporal + rename), con fsync agrupado en lotes, y se
+contabilizan las lecturas y escrituras de disco de cada comparación. Las
+consultas y commits de los almacenes SQLite van a un hilo propio (run_db)
+"""
+
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+
+# Políticas de fsync:
+#   "always": fsync de cada fichero antes de dar la escritura por terminada
+#   "batch":  fsync agrupado cada FSYNC_BATCH ficheros y al cerrar (por defecto)
+#   "never":  se deja al sistema operativo
+FSYNC_POLICIES = ("always", "batch", "never")
+FSYNC_BATCH = 32
+
+_IO_KEYS = ("reads", "writes", "bytes_read", "bytes_written")
+
+
+class ArtifactWriter:
+    """Escritor asíncrono de artefactos con contadores de E/S por etiqueta"""
+
+    def __init__(self, max_workers: int = 4, fsync: str = "batch", fsync_batch: int = FSYNC_BATCH):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Política de fsync desconocida: {fsync}")
+        self.fsync = fsync
+        self.fsync_batch = fsync_batch
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="artifact-writer")
+        # Un solo hilo para SQLite: los commits salen del event loop y no se solapan entre sí
+        self.db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact-db")
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._unsynced: List[Path] = []
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    # Contadores
+
+    def _count(self, tag: Optional[str], key: str, nbytes: int) -> None:
+        if tag is None:
+            return
+        with self._lock:
+            stats = self._stats.setdefault(tag, dict.fromkeys(_IO_KEYS, 0))
+            stats[key + "s"] += 1
+            stats["bytes_" + ("read" if key == "read" else "written")] += nbytes
+
+    def count_read(self, tag: Optional[str], nbytes: int) -> None:
+        """Registra una lectura hecha fuera del escritor (p. ej. al reutilizar una captura)"""
+        self._count(tag, "read", nbytes)
+
+    def count_write(self, tag: Optional[str], nbytes: int) -> None:
+        """Registra una escritura hecha fuera del escritor (p. ej. en el pool de procesos)"""
+        self._count(tag, "write", nbytes)
+
+    def add_stats(self, tag: Optional[str], counts: Dict[str, int]) -> None:
+        """Suma contadores medidos en otro proceso (p. ej. las previsualizaciones)"""
+        if tag is None:
+            return
+        with self._lock:
+            stats = self._stats.setdefault(tag, dict.fromkeys(_IO_KEYS, 0))
+            for key in _IO_KEYS:
+                stats[key] += counts.get(key, 0)
+
+    def stats(self, tag: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats.get(tag) or dict.fromkeys(_IO_KEYS, 0))
+
+    def pop_stats(self, tag: str) -> Dict[str, int]:
+        with self._lock:
+            return self._stats.pop(tag, None) or dict.fromkeys(_IO_KEYS, 0)
+
+    def read_bytes(self, path: Path, tag: str = None) -> bytes:
+        data = Path(path).read_bytes()
+        self.count_read(tag, len(data))
+        return data
+
+    # Escrituras
+
+    def write(self, path: Path, data: Union[bytes, str], tag: str = None,
+              then: Callable[[Path], None] = None) -> Future:
+        """Programa la escritura de `data` en `path` y devuelve su Future.
+        `then(path)` se ejecuta en el mismo hilo tras escribir (p. ej. enlazar un alias)."""
+        path = Path(path)
+        future = self.executor.submit(self._write_file, path, data, tag, then)
+        with self._lock:
+            self._pending[str(path)] = future
+        future.add_done_callback(lambda f, key=str(path): self._forget(key, f))
+        return future
+
+    def write_json(self, path: Path, obj, tag: str = None) -> Future:
+        """Como write(), pero la serialización también se hace en el pool"""
+        return self.write(path, _JsonPayload(obj), tag)
+
+    def _forget(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def _write_file(self, path: Path, data, tag: Optional[str], then: Callable[[Path], None] = None) -> Path:
+        if isinstance(data, _JsonPayload):
+            data = json.dumps(data.obj, indent=2)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            if self.fsync == "always":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._count(tag, "write", len(data))
+
+        if self.fsync == "batch":
+            with self._lock:
+                self._unsynced.append(path)
+                batch = self._unsynced if len(self._unsynced) >= self.fsync_batch else None
+                if batch is not None:
+                    self._unsynced = []
+            if batch:
+                _fsync_paths(batch)
+        if then is not None:
+            then(path)
+        return path
+
+    async def wait_for(self, paths: Iterable[Path]) -> None:
+        """Espera, sin bloquear el event loop, a que terminen las escrituras de `paths`"""
+        with self._lock:
+            futures = [self._pending[str(Path(p))] for p in paths if str(Path(p)) in self._pending]
+        if futures:
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+
+    async def run_db(self, fn: Callable, *args, **kwargs):
+        """Ejecuta `fn` (consultas y commits de los almacenes) en el hilo de base de datos"""
+        return await asyncio.get_running_loop().run_in_executor(self.db_executor, partial(fn, *args, **kwargs))
+
+    def flush(self) -> None:
+        """Espera todas las escrituras pendientes y sincroniza el lote en curso"""
+        with self._lock:
+            futures = list(self._pending.values())
+        for future in futures:
+            future.result()
+        with self._lock:
+            batch, self._unsynced = self._unsynced, []
+        if batch:
+            _fsync_paths(batch)
+
+    def close(self) -> None:
+        self.db_executor.shutdown()
+        self.flush()
+        self.executor.shutdown()
+
+
+class _JsonPayload:
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+
+def _fsync_paths(paths: List[Path]) -> None:
+    """fsync de cada fichero y una sola vez de cada directorio (para los renames)"""
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            continue
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    for directory in {path.parent for path in paths}:
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Clasificador de cambios para respuestas en texto libre del modelo
+Compila los conjuntos de palabras clave una sola vez en una única expresión
+regular y categoriza cada línea en una pasada
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    'layout': ['layout', 'position', 'grid', 'flex', 'alignment', 'structure', 'spacing', 'moved'],
+    'text': ['text', 'font', 'typography', 'content', 'heading', 'paragraph', 'title', 'label'],
+    'style': ['color', 'background', 'border', 'shadow', 'gradient', 'style', 'theme', 'dark'],
+    'element': ['button', 'element', 'component', 'widget', 'card', 'section', 'badge', 'banner'],
+}
+
+# Marcadores de sección usados al formatear el análisis
+SECTION_MARKERS = ['LAYOUT', 'TEXT', 'STYLE', 'ELEMENT']
+
+_IGNORED_LINES = {'[', ']', '{', '}'}
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """Regex con prefijos factorizados en forma de trie: el motor de `re` descarta
+    alternativas por su primer carácter en lugar de probar cada palabra."""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # La palabra termina aquí pero puede continuar: el cuantificador voraz
+            # prefiere la más larga
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    return build(trie)
+
+
+class ChangeClassifier:
+    """Asigna cada línea a la categoría con más palabras clave distintas"""
+
+    def __init__(self, keywords: Dict[str, Iterable[str]] = None):
+        keywords = keywords or CATEGORY_KEYWORDS
+        self.categories = list(keywords.keys())
+        self._keyword_categories: Dict[str, List[int]] = {}
+        for index, category in enumerate(self.categories):
+            for keyword in keywords[category]:
+                self._keyword_categories.setdefault(keyword.lower(), []).append(index)
+
+        # Una palabra clave contenida en otra (p. ej. "text" en "context") siempre
+        # aparece cuando aparece la larga: se precalculan esas implicaciones.
+        all_keywords = sorted(self._keyword_categories, key=len, reverse=True)
+        self._implied = {
+            keyword: frozenset(other for other in all_keywords if other in keyword)
+            for keyword in all_keywords
+        }
+        # La regex consume cada coincidencia, así que una palabra que empiece dentro
+        # de otra y continúe después (p. ej. "fon[t]ext") se comprueba aparte.
+        self._overlaps = {
+            keyword: [(offset, other) for other in all_keywords
+                      for offset in range(1, len(keyword))
+                      if len(keyword) - offset < len(other) and other.startswith(keyword[offset:])]
+            for keyword in all_keywords
+        }
+        self._keyword_re = re.compile(_trie_pattern(all_keywords))
+
+        names = '|'.join(re.escape(category) for category in self.categories)
+        self._json_key_re = re.compile(f'^(?:"(?:{names})_changes"|(?:{names})_changes:)')
+        self._section_re = re.compile('|'.join(re.escape(m) for m in SECTION_MARKERS), re.IGNORECASE)
+
+    def scores(self, line: str) -> List[int]:
+        """Número de palabras clave distintas de cada categoría presentes en la línea"""
+        line = line.lower()
+        found = set()
+        for match in self._keyword_re.finditer(line):
+            keyword = match.group()
+            found |= self._implied[keyword]
+            for offset, other in self._overlaps[keyword]:
+                if line.startswith(other, match.start() + offset):
+                    found |= self._implied[other]
+        scores = [0] * len(self.categories)
+        for keyword in found:
+            for index in self._keyword_categories[keyword]:
+                scores[index] += 1
+        return scores
+
+    def classify(self, line: str) -> Optional[str]:
+        """Categoría con mayor puntuación; en caso de empate, la primera"""
+        scores = self.scores(line)
+        best_score = max(scores)
+        if best_score == 0:
+            return None
+        return self.categories[scores.index(best_score)]
+
+    def is_section_header(self, line: str) -> bool:
+        return self._section_re.search(line) is not None
+
+    def categorize(self, raw_text: str) -> Dict:
+        """Extrae insights categorizados del análisis de texto libre"""
+        categories = {name: {'changes': []} for name in self.categories}
+
+        # Dividir por líneas o frases
+        for line in raw_text.replace('. ', '.\n').split('\n'):
+            line_clean = line.strip()
+
+            # Ignorar líneas que son formato JSON o están vacías
+            if len(line_clean) < 10 or line_clean in _IGNORED_LINES or self._json_key_re.match(line_clean):
+                continue
+
+            best_match = self.classify(line_clean)
+            if best_match is None:
+                continue
+
+            # Limpiar y capitalizar la línea
+            clean_line = line_clean.strip('.-,[]"\' ')
+            if clean_line and not clean_line[0].isupper():
+                clean_line = clean_line[0].upper() + clean_line[1:]
+
+            # No añadir si es una clave JSON
+            if not clean_line.lower().endswith('_changes'):
+                categories[best_match]['changes'].append(clean_line)
+
+        detected_changes = {name: len(data['changes']) for name, data in categories.items()}
+
+        return {
+            'categories': categories,
+            'detected_changes': detected_changes,
+            'total_changes': sum(detected_changes.values())
+        }
+
+
+_default_classifier = None
+
+
+def get_classifier() -> ChangeClassifier:
+    """Clasificador compartido, compilado una vez por proceso"""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = ChangeClassifier()
+    return _default_classifier
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Interfaz de línea de comandos de SmartVisionQA
+Permite elegir objetivos, concurrencia, cachés y modelo sin editar código.
+Los subcomandos de solo reportes (rebuild-reports, rebuild-index) no importan
+asyncio, el navegador ni el modelo.
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+
+DEFAULT_MODEL = "qwen2.5vl:7b"
+
+# Casos de prueba con archivos locales
+DEMO_TEST_CASES = [
+    ("page_v1.html", "page_v2.html"),
+    ("page_v1.html", "page_v3.html"),
+    ("page_v2.html", "page_v3.html"),
+]
+
+
+def _add_run_options(parser: argparse.ArgumentParser) -> None:
+    """Opciones comunes a los subcomandos que ejecutan comparaciones"""
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Comparaciones en paralelo (por defecto: 1)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Modelo de Ollama (por defecto: {DEFAULT_MODEL})")
+    parser.add_argument("--host", default=None,
+                        help="Endpoint de Ollama, p. ej. http://gpu-01:11434 (por defecto: OLLAMA_HOST o localhost)")
+    parser.add_argument("--strategy", choices=["stack", "side_by_side", "separate", "overlay"], default="stack",
+                        help="Cómo se envían V1 y V2 al modelo (por defecto: stack); "
+                             "ver scripts/benchmark_strategies.py")
+    parser.add_argument("--profile", choices=["default", "fast-triage", "thorough", "cpu-small"], default="default",
+                        help="Perfil de inferencia: num_ctx, num_thread, num_predict, temperatura y "
+                             "resolución de imagen (por defecto: valores del servidor); "
+                             "ver scripts/benchmark_profiles.py")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Llamadas al modelo en vuelo por host (por defecto: el punto de saturación "
+                             "medido en --limits-file, o sin límite)")
+    parser.add_argument("--autotune", action="store_true",
+                        help="Ajustar el límite en vuelo en línea (AIMD según errores y latencia por token)")
+    parser.add_argument("--limits-file", type=Path, default=Path(".inference_limits.json"),
+                        help="Mediciones de scripts/load_test_inference.py (por defecto: .inference_limits.json)")
+    parser.add_argument("--dom-diff", action="store_true",
+                        help="Extraer el DOM en cada captura y reportar cambios de texto, elementos y estilos "
+                             "sin el modelo; el modelo solo analiza las diferencias visuales residuales")
+    parser.add_argument("--components", nargs="*", metavar="NOMBRE=SELECTOR", default=None,
+                        help="Capturar y analizar por separado estos componentes, con caché por componente; "
+                             "sin valores usa los de las páginas de demo (header, card, stats, cta)")
+    parser.add_argument("--mask", nargs="+", metavar="SELECTOR", default=None,
+                        help="Enmascarar las zonas de estos selectores CSS (fechas, anuncios, carruseles): "
+                             "no cuentan en el pre-diff ni en el recorte y el modelo no las ve")
+    parser.add_argument("--auto-mask", type=int, default=0, metavar="K",
+                        help="Renderizar cada página K veces y enmascarar los píxeles que varían entre "
+                             "sus propias capturas (K >= 2)")
+    parser.add_argument("--cache-dir", type=Path, default=None,
+                        help="Directorio de la caché de red record-and-replay para capturas de URLs")
+    parser.add_argument("--block-noise", action="store_true",
+                        help="Bloquear analítica, anuncios, chats y vídeos embebidos en capturas de URLs")
+    parser.add_argument("--only-changed", action="store_true",
+                        help="Omitir pares de ficheros cuyas entradas no cambiaron desde el último reporte")
+    parser.add_argument("--timings", action="store_true", help="Mostrar tiempos por etapa al terminar")
+    parser.add_argument("--fsync", choices=["always", "batch", "never"], default="batch",
+                        help="Política de fsync de capturas y reportes (por defecto: batch)")
+    parser.add_argument("--recompress", action="store_true",
+                        help="Recomprimir sin pérdida las capturas nuevas en segundo plano (PNG optimize)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continuar la última ejecución: omitir pares terminados y reutilizar "
+                             "capturas y análisis ya registrados en el journal")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="smartVisionQA",
+        description="Visual QA Testing con Ollama. Sin subcomando ejecuta los casos de demo."
+    )
+    parser.add_argument("--results-dir", type=Path, default=Path("results"),
+                        help="Directorio de resultados (por defecto: results)")
+    # Las opciones globales también se aceptan después del subcomando
+    common = argparse.ArgumentParser(add_help=False)
+    # SUPPRESS: si no se repite tras el subcomando, no pisa el valor dado antes
+    common.add_argument("--results-dir", type=Path, default=argparse.SUPPRESS,
+                        help="Directorio de resultados (por defecto: results)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    files_parser = subparsers.add_parser("compare-files", parents=[common], help="Comparar pares de ficheros HTML")
+    files_parser.add_argument("files", nargs="*",
+                              help="Pares V1 V2 (relativos a --demo-dir). Sin ficheros: casos de demo")
+    files_parser.add_argument("--demo-dir", type=Path, default=Path("demo"))
+    _add_run_options(files_parser)
+
+    urls_parser = subparsers.add_parser("compare-urls", parents=[common], help="Comparar pares de URLs")
+    urls_parser.add_argument("urls", nargs="+", help="Pares URL1 URL2")
+    _add_run_options(urls_parser)
+
+    run_parser = subparsers.add_parser("run", parents=[common],
+                                       help="Ejecutar las comparaciones de un manifiesto JSON")
+    run_parser.add_argument("manifest", type=Path)
+    _add_run_options(run_parser)
+
+    watch_parser = subparsers.add_parser(
+        "watch", parents=[common],
+        help="Vigilar los ficheros y repetir solo las comparaciones afectadas (navegador y modelo calientes)"
+    )
+    watch_parser.add_argument("files", nargs="*",
+                              help="Pares V1 V2 (relativos a --demo-dir). Sin ficheros: casos de demo")
+    watch_parser.add_argument("--demo-dir", type=Path, default=Path("demo"))
+    watch_parser.add_argument("--watch-dir", type=Path, action="append", default=[],
+                              help="Directorio adicional a vigilar (p. ej. estilos compartidos); repetible")
+    watch_parser.add_argument("--interval", type=float, default=0.5, help="Segundos entre sondeos")
+    watch_parser.add_argument("--keep-alive", default="30m",
+                              help="Tiempo que Ollama mantiene el modelo cargado (por defecto: 30m)")
+    _add_run_options(watch_parser)
+
+    serve_parser = subparsers.add_parser(
+        "serve", parents=[common],
+        help="Servicio HTTP de comparaciones con navegador y modelo calientes (ver qa_service.py)"
+    )
+    serve_parser.add_argument("--demo-dir", type=Path, default=Path("demo"),
+                              help="Directorio de los ficheros que se pueden comparar con {v1, v2}")
+    serve_parser.add_argument("--bind", default="127.0.0.1", help="Dirección de escucha (por defecto: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--queue-size", type=int, default=100,
+                              help="Comparaciones en espera antes de responder 429 (por defecto: 100)")
+    serve_parser.add_argument("--per-client", type=int, default=2,
+                              help="Comparaciones en ejecución por cliente (X-Client-Id o IP; por defecto: 2)")
+    serve_parser.add_argument("--keep-alive", default="30m",
+                              help="Tiempo que Ollama mantiene el modelo cargado (por defecto: 30m)")
+    _add_run_options(serve_parser)
+
+    reports_parser = subparsers.add_parser("rebuild-reports", parents=[common],
+                                           help="Regenerar reportes HTML desde los JSON")
+    reports_parser.add_argument("json_files", nargs="*", type=Path,
+                                help="Reportes JSON (por defecto: todos los comparison_*.json)")
+    reports_parser.add_argument("--jobs", "-j", type=int, default=None)
+
+    index_parser = subparsers.add_parser("rebuild-index", parents=[common], help="Regenerar results/index.html")
+    index_parser.add_argument("--rebuild", action="store_true",
+                              help="Reimportar todos los comparison_*.json")
+    index_parser.add_argument("--page-size", type=int, default=100, help="Tarjetas por página del índice")
+
+    store_parser = subparsers.add_parser("store", parents=[common],
+                                         help="Almacén de artefactos por contenido: uso y retención")
+    store_subparsers = store_parser.add_subparsers(dest="store_command", required=True)
+    store_subparsers.add_parser("stats", parents=[common], help="Blobs, bytes y ejecuciones registradas")
+    store_subparsers.add_parser("runs", parents=[common], help="Ejecuciones con sus comparaciones y blobs")
+    store_manifest_parser = store_subparsers.add_parser("manifest", parents=[common],
+                                                        help="Blobs de cada comparación de una ejecución")
+    store_manifest_parser.add_argument("run_id")
+    gc_parser = store_subparsers.add_parser("gc", parents=[common],
+                                            help="Aplicar la retención y borrar blobs sin referencias")
+    gc_parser.add_argument("--max-age-days", type=float, default=None,
+                           help="Descartar las ejecuciones más antiguas que esto")
+    gc_parser.add_argument("--max-size-mb", type=float, default=None,
+                           help="Descartar ejecuciones antiguas hasta que los blobs ocupen como mucho esto")
+    gc_parser.add_argument("--dry-run", action="store_true", help="Solo mostrar lo que se borraría")
+
+    queue_parser = subparsers.add_parser("queue", parents=[common],
+                                         help="Cola de trabajo compartida entre varias máquinas")
+    queue_parser.add_argument("--queue", type=Path, default=None,
+                              help="Base de datos de la cola (por defecto: <results-dir>/queue.db)")
+    queue_subparsers = queue_parser.add_subparsers(dest="queue_command", required=True)
+
+    enqueue_parser = queue_subparsers.add_parser("enqueue", parents=[common],
+                                                 help="Encolar las comparaciones de un manifiesto")
+    enqueue_parser.add_argument("manifest", type=Path)
+
+    work_parser = queue_subparsers.add_parser("work", parents=[common], help="Procesar trabajos hasta vaciar la cola")
+    work_parser.add_argument("--worker-id", default=None, help="Identificador del worker (por defecto: host:pid)")
+    work_parser.add_argument("--lease-seconds", type=float, default=None,
+                             help="Duración del lease antes de considerar abandonado un trabajo")
+    _add_run_options(work_parser)
+
+    status_parser = queue_subparsers.add_parser("status", parents=[common], help="Progreso y throughput de la cola")
+    status_parser.add_argument("--watch", type=float, default=None, metavar="SECONDS",
+                               help="Refrescar cada SECONDS segundos hasta vaciar la cola")
+
+    queue_subparsers.add_parser("retry-failed", parents=[common], help="Reencolar los trabajos fallidos")
+
+    return parser
+
+
+def _pairs(values: List[str], first_key: str, second_key: str) -> List[Dict]:
+    if len(values) % 2:
+        raise SystemExit(f"Error: se esperaban pares, se recibieron {len(values)} valores")
+    return [{first_key: values[i], second_key: values[i + 1]} for i in range(0, len(values), 2)]
+
+
+def load_manifest(path: Path) -> Dict:
+    """Manifiesto: {"demo_dir": "demo", "comparisons": [{"v1": ..., "v2": ...}, {"url1": ..., "url2": ...}]}"""
+    with open(path, 'r') as f:
+        manifest = json.load(f)
+    for spec in manifest.get("comparisons", []):
+        if not ({"v1", "v2"} <= spec.keys() or {"url1", "url2"} <= spec.keys()):
+            raise SystemExit(f"Error: comparación inválida en {path}: {spec}")
+    return manifest
+
+
+def create_qa(args, demo_dir: Path = Path("demo")):
+    """Construye SmartVisionQA con las opciones de la línea de comandos"""
+    from artifact_store import ArtifactStore
+    from artifact_writer import ArtifactWriter
+    from component_cache import parse_components
+    from inference_limits import measured_limit
+    from network_cache import NetworkCache
+    from request_routing import RoutingPolicy
+    from smartVisionQA import HTMLRenderer, SmartVisionQA, VisionAnalyzer
+
+    renderer = HTMLRenderer(
+        network_cache=NetworkCache(args.cache_dir) if args.cache_dir else None,
+        routing=RoutingPolicy.block_noise() if args.block_noise else None,
+        dom_snapshot=args.dom_diff,
+        components=parse_components(args.components) if args.components is not None else None,
+        masks=args.mask,
+        auto_mask=args.auto_mask
+    )
+    max_in_flight = args.max_in_flight
+    if max_in_flight is None:
+        max_in_flight = measured_limit(args.limits_file, args.host, args.model)
+        if max_in_flight:
+            print(f"Límite en vuelo medido para {args.model}: {max_in_flight} ({args.limits_file})")
+    analyzer = VisionAnalyzer(model=args.model, host=args.host, strategy=args.strategy,
+                              max_in_flight=max_in_flight, autotune=args.autotune, profile=args.profile)
+    writer = ArtifactWriter(fsync=args.fsync)
+    store = ArtifactStore.for_results_dir(args.results_dir.resolve(), writer, recompress=args.recompress)
+    return SmartVisionQA(demo_dir=demo_dir, results_dir=args.results_dir, renderer=renderer, analyzer=analyzer,
+                         writer=writer, store=store)
+
+
+def _print_timings(outcomes: List[Dict], wall_ms: float) -> None:
+    print("\n" + "=" * 50)
+    print("TIEMPOS POR COMPARACIÓN (ms) Y E/S DE DISCO")
+    print("=" * 50)
+    for outcome in outcomes:
+        label = f"{outcome['file1']} vs {outcome['file2']}"
+        if outcome['status'] != 'ok':
+            print(f"{label}: {outcome['status']}")
+            continue
+        stages = "  ".join(f"{stage}={ms:.0f}" for stage, ms in outcome.get('timings', {}).items())
+        io = outcome.get('io')
+        if io:
+            stages += (f"  io={io['reads']}r/{io['writes']}w "
+                       f"({io['bytes_read'] / 1024:.0f}/{io['bytes_written'] / 1024:.0f} KB)")
+        analysis = outcome.get('analysis', {})
+        if analysis.get('structural'):
+            stages += f"  dom_diff={analysis['structural']['ms']:.0f}"
+        components = analysis.get('components')
+        if components:
+            stages += (f"  componentes={components['analyzed']} analizados/{components['cached']} en caché/"
+                       f"{components['unchanged']} sin cambios")
+        if analysis.get('masked_regions'):
+            stages += f"  máscaras={analysis['masked_regions']}"
+        if ('structural' in analysis or components or analysis.get('masked_regions')) and analysis.get('identical'):
+            stages += " (página sin modelo)"
+        print(f"{label}: {stages}")
+    print(f"\nTiempo total: {wall_ms:.0f} ms")
+
+
+def run_comparisons(args, comparisons: List[Dict], demo_dir: Path = Path("demo")) -> int:
+    import asyncio
+
+    qa = create_qa(args, demo_dir)
+    start = time.perf_counter()
+    try:
+        outcomes = asyncio.run(qa.run_suite(comparisons, jobs=args.jobs, only_changed=args.only_changed,
+                                             resume=args.resume))
+    finally:
+        qa.close()
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    if args.timings:
+        _print_timings(outcomes, wall_ms)
+    if qa.analyzer.limiter and qa.analyzer.limiter.adaptive:
+        stats = qa.analyzer.limiter.stats()
+        print(f"\nLímite en vuelo final: {stats['limit']} ({stats['decreases']} reducciones "
+              f"en {stats['completions']} llamadas)")
+    coalesced = {kind: counts["coalesced"] for kind, counts in qa.single_flight_stats().items() if counts["coalesced"]}
+    if coalesced:
+        print("Peticiones idénticas agrupadas: " + ", ".join(f"{n} ({kind})" for kind, n in coalesced.items()))
+
+    skipped = sum(1 for o in outcomes if o['status'] == 'skipped')
+    errors = sum(1 for o in outcomes if o['status'] == 'error')
+    print(f"\n{len(outcomes)} comparaciones: {len(outcomes) - skipped - errors} ejecutadas, "
+          f"{skipped} omitidas, {errors} con error")
+    return 1 if errors else 0
+
+
+def run_watch(args, comparisons: List[Dict], demo_dir: Path) -> int:
+    """Modo watch: navegador arrancado una vez, modelo precargado y caché de capturas
+    por versión de página; cada cambio repite solo las comparaciones afectadas."""
+    import asyncio
+    from watch_mode import watch
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+    from generate_index import generate_index_html
+
+    qa = create_qa(args, demo_dir)
+    qa.analyzer.keep_alive = args.keep_alive
+    qa.render_cache = {}
+
+    async def session():
+        await qa.renderer.start()
+        try:
+            try:
+                print(f"Cargando {qa.analyzer.model}...")
+                print(f"Modelo listo en {await asyncio.to_thread(qa.analyzer.warm_up) / 1000:.1f} s")
+            except Exception as e:
+                print(f"No se pudo precargar el modelo: {e}")
+            await watch(qa, comparisons, [demo_dir, *args.watch_dir], jobs=args.jobs, interval=args.interval,
+                        on_batch=lambda outcomes: generate_index_html(args.results_dir))
+        finally:
+            await qa.renderer.close()
+
+    try:
+        asyncio.run(session())
+    except KeyboardInterrupt:
+        print("\n[watch] Fin")
+    finally:
+        qa.close()
+    return 0
+
+
+def run_serve(args) -> int:
+    """Servicio HTTP: --jobs workers comparten un navegador y un modelo calientes"""
+    from qa_service import serve
+
+    qa = create_qa(args, args.demo_dir)
+    qa.analyzer.keep_alive = args.keep_alive
+    try:
+        serve(qa, args.bind, args.port, workers=args.jobs, queue_size=args.queue_size, per_client=args.per_client)
+    finally:
+        qa.close()
+    return 0
+
+
+def rebuild_reports(args) -> int:
+    from generate_html_report import generate_reports_parallel
+
+    json_files = args.json_files or sorted(args.results_dir.glob("comparison_*.json"))
+    html_paths = generate_reports_parallel(json_files, jobs=args.jobs)
+    print(f"{len(html_paths)} reportes HTML regenerados")
+    return 0
+
+
+def rebuild_index(args) -> int:
+    sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+    from generate_index import generate_index_html
+
+    args.results_dir.mkdir(exist_ok=True)
+    generate_index_html(args.results_dir, rebuild=args.rebuild, page_size=args.page_size)
+    return 0
+
+
+def run_store(args) -> int:
+    from artifact_store import ArtifactStore
+
+    store = ArtifactStore.for_results_dir(args.results_dir.resolve())
+    try:
+        if args.store_command == "stats":
+            stats = store.stats()
+            print(f"{stats['blobs']} blobs ({stats['blob_bytes'] / 1e6:.1f} MB) en {stats['runs']} ejecuciones; "
+                  f"{stats['refs']} referencias ({stats['referenced_bytes'] / 1e6:.1f} MB sin deduplicar)")
+        elif args.store_command == "runs":
+            for run in store.runs():
+                started = time.strftime("%Y-%m-%d %H:%M", time.localtime(run['started_at']))
+                print(f"{run['run_id']:>8}  {started}  {run['comparisons']} comparaciones, {run['blobs']} blobs")
+        elif args.store_command == "manifest":
+            print(json.dumps(store.manifest(args.run_id), indent=2))
+        else:
+            max_bytes = int(args.max_size_mb * 1e6) if args.max_size_mb is not None else None
+            result = store.gc(max_age_days=args.max_age_days, max_bytes=max_bytes, dry_run=args.dry_run)
+            action = "Se borrarían" if result['dry_run'] else "Borrados"
+            print(f"{action} {result['blobs_deleted']} blobs ({result['bytes_freed'] / 1e6:.1f} MB) de "
+                  f"{result['runs_dropped']} ejecuciones; se conservan {result['bytes_kept'] / 1e6:.1f} MB")
+        return 0
+    finally:
+        store.close()
+
+
+def run_queue(args) -> int:
+    import asyncio
+    from shared_results import mark_shared
+    from work_queue import QUEUE_DB_NAME, WorkQueue, format_progress, run_worker
+
+    # Los workers de todas las máquinas escriben en el mismo results_dir: sus
+    # bases SQLite dejan WAL por el journal de rollback (ver shared_results.py)
+    mark_shared(args.results_dir)
+    queue_path = args.queue or args.results_dir / QUEUE_DB_NAME
+    options = {"lease_seconds": args.lease_seconds} if getattr(args, "lease_seconds", None) else {}
+    queue = WorkQueue(queue_path, **options)
+    try:
+        if args.queue_command == "enqueue":
+            manifest = load_manifest(args.manifest)
+            # El demo_dir del manifiesto debe ser accesible desde todos los workers
+            queue.set_meta("demo_dir", str(manifest.get("demo_dir", "demo")))
+            # Todos los workers comparten una ejecución del journal: un trabajo
+            # reintentado reutiliza las etapas que el worker caído dejó hechas
+            queue.set_meta("journal_run", uuid.uuid4().hex)
+            print(f"{queue.enqueue(manifest['comparisons'])} trabajos encolados en {queue_path}")
+            return 0
+
+        if args.queue_command == "work":
+            qa = create_qa(args, Path(queue.get_meta("demo_dir", "demo")))
+            qa.start_journal(run_key=queue.get_meta("journal_run"))
+            try:
+                totals = asyncio.run(run_worker(qa, queue, args.worker_id, jobs=args.jobs,
+                                                only_changed=args.only_changed))
+            finally:
+                qa.close()
+            print(f"Worker terminado: {totals['done']} completados, {totals['errors']} intentos con error, "
+                  f"{totals['lost']} con lease perdido")
+            return 0
+
+        if args.queue_command == "retry-failed":
+            print(f"{queue.retry_failed()} trabajos reencolados")
+            return 0
+
+        while True:
+            print(format_progress(queue.progress()))
+            if not args.watch or queue.is_drained():
+                break
+            time.sleep(args.watch)
+            print()
+        for job in queue.failures():
+            print(f"  fallido #{job['id']} {job['spec']}: {job['error']}")
+        return 0
+    finally:
+        queue.close()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        args = parser.parse_args(["--results-dir", str(args.results_dir), "compare-files"])
+
+    if args.command == "compare-files":
+        comparisons = _pairs(args.files, "v1", "v2") if args.files else [
+            {"v1": v1, "v2": v2} for v1, v2 in DEMO_TEST_CASES
+        ]
+        return run_comparisons(args, comparisons, args.demo_dir)
+    if args.command == "watch":
+        comparisons = _pairs(args.files, "v1", "v2") if args.files else [
+            {"v1": v1, "v2": v2} for v1, v2 in DEMO_TEST_CASES
+        ]
+        return run_watch(args, comparisons, args.demo_dir)
+    if args.command == "serve":
+        return run_serve(args)
+    if args.command == "compare-urls":
+        return run_comparisons(args, _pairs(args.urls, "url1", "url2"))
+    if args.command == "run":
+        manifest = load_manifest(args.manifest)
+        return run_comparisons(args, manifest["comparisons"], Path(manifest.get("demo_dir", "demo")))
+    if args.command == "rebuild-reports":
+        return rebuild_reports(args)
+    if args.command == "rebuild-index":
+        return rebuild_index(args)
+    if args.command == "store":
+        return run_store(args)
+    if args.command == "queue":
+        return run_queue(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
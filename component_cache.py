@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Captura por componentes y caché de su análisis (SQLite)
+Durante la captura se registran las cajas de una lista de selectores
+(cabecera, tarjetas, estadísticas, botones...). Cada componente se recorta de
+la captura completa y se identifica por el hash de sus píxeles: solo los que
+cambian se vuelven a analizar, y el resultado de cada par de versiones de un
+componente se reutiliza entre ejecuciones y páginas
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from shared_results import journal_mode
+
+
+COMPONENT_CACHE_DB_NAME = "components.db"
+
+# Componentes de las páginas de demo: nombre -> selector CSS
+DEFAULT_COMPONENTS = {
+    "header": "header",
+    "card": ".feature-card",
+    "stats": ".stats",
+    "cta": ".button",
+}
+
+# Cajas en coordenadas de documento (las de la captura full_page) de los
+# elementos visibles de cada selector. Varias coincidencias: nombre, nombre[2]...
+_BOXES_SCRIPT = """
+(components) => {
+    const boxes = {};
+    const sx = window.scrollX, sy = window.scrollY;
+    for (const [name, selector] of Object.entries(components)) {
+        let n = 0;
+        for (const el of document.querySelectorAll(selector)) {
+            const rect = el.getBoundingClientRect();
+            if (rect.width < 1 || rect.height < 1) continue;
+            n += 1;
+            boxes[n > 1 ? `${name}[${n}]` : name] = [
+                Math.floor(rect.left + sx), Math.floor(rect.top + sy),
+                Math.ceil(rect.right + sx), Math.ceil(rect.bottom + sy),
+            ];
+        }
+    }
+    return boxes;
+}
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS components (
+    cache_key TEXT PRIMARY KEY,
+    differences TEXT NOT NULL,
+    analysis TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+async def capture_component_boxes(page, components: Dict[str, str]) -> Dict[str, List[int]]:
+    """Cajas (x0, y0, x1, y1) de los componentes visibles de `page` (Playwright)"""
+    return await page.evaluate(_BOXES_SCRIPT, components)
+
+
+def parse_components(specs: List[str]) -> Dict[str, str]:
+    """Convierte ["nombre=selector", ...] en {nombre: selector}; vacío usa DEFAULT_COMPONENTS"""
+    if not specs:
+        return dict(DEFAULT_COMPONENTS)
+    components = {}
+    for spec in specs:
+        name, sep, selector = spec.partition("=")
+        if not sep or not name.strip() or not selector.strip():
+            raise ValueError(f"Componente inválido: {spec!r} (formato nombre=selector)")
+        components[name.strip()] = selector.strip()
+    return components
+
+
+class ComponentCache:
+    """Análisis del modelo por par de versiones de un componente"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # get()/put() se llaman desde el hilo de ArtifactWriter.run_db
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(f"PRAGMA journal_mode={journal_mode(self.db_path.parent)}")
+        self.conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_results_dir(cls, results_dir: Path) -> "ComponentCache":
+        return cls(Path(results_dir) / COMPONENT_CACHE_DB_NAME)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    @staticmethod
+    def cache_key(sha1: str, sha2: str, model: str, strategy: str, profile: str = "default") -> str:
+        """El mismo par de píxeles analizado con otro modelo, composición o perfil es otra entrada"""
+        return hashlib.sha256(f"{model}\0{strategy}\0{profile}\0{sha1}\0{sha2}".encode('utf-8')).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[Tuple[Dict, Dict]]:
+        row = self.conn.execute(
+            "SELECT differences, analysis FROM components WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE components SET hits = hits + 1, last_used_at = ? WHERE cache_key = ?",
+                              (time.time(), cache_key))
+        return json.loads(row['differences']), json.loads(row['analysis'])
+
+    def put(self, cache_key: str, differences: Dict, analysis: Dict) -> None:
+        now = time.time()
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO components (cache_key, differences, analysis, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    differences = excluded.differences, analysis = excluded.analysis,
+                    last_used_at = excluded.last_used_at
+            """, (cache_key, json.dumps(differences), json.dumps(analysis), now, now))
+
+    def stats(self) -> Dict[str, int]:
+        row = self.conn.execute(
+            "SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS hits FROM components"
+        ).fetchone()
+        return {"entries": row['entries'], "hits": row['hits']}
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Snapshot estructural del DOM renderizado y diff determinista entre versiones
+Durante la captura se extraen el texto visible, las cajas de los elementos y
+los estilos calculados clave; el diff produce text/element/style/layout changes
+en milisegundos y las cajas que esos cambios explican, para que el modelo solo
+vea las diferencias visuales residuales
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+
+# Estilos calculados que se comparan; los heredados (color, fuente) se agrupan en el diff
+STYLE_PROPERTIES = (
+    "color", "background-color", "background-image", "font-family", "font-size",
+    "font-weight", "font-style", "text-decoration-line", "text-transform", "text-align",
+    "border-top", "border-right", "border-bottom", "border-left", "border-radius",
+    "box-shadow", "opacity",
+)
+MAX_ELEMENTS = 3000
+MAX_TEXT = 300
+
+# Desplazamientos o cambios de tamaño menores que esto (px) no se reportan
+LAYOUT_TOLERANCE_PX = 4
+# Máximo de entradas por categoría; el resto se resume en una línea
+MAX_CHANGES_PER_CATEGORY = 20
+
+# Propiedades heredadas: el cambio en un contenedor se repite en todos sus descendientes
+_INHERITED = {"color", "font-family", "font-size", "font-weight", "font-style", "text-transform", "text-align"}
+
+_BACKGROUND = ("background-color", "background-image")
+
+# Elementos cuyo contenido no se refleja en el DOM: nunca se dan por explicados
+_OPAQUE_TAGS = {"canvas", "video", "iframe", "svg", "object", "embed"}
+
+# Script ejecutado en la página tras la espera de "lista". Cada elemento lleva una
+# clave estable formada por la cadena de tag#id.clases de sus ancestros más el
+# ordinal entre hermanos con la misma firma: insertar un elemento distinto no
+# renumera a los demás. Las cajas están en coordenadas de documento (las mismas
+# que la captura full_page).
+_SNAPSHOT_SCRIPT = """
+({properties, maxElements, maxText}) => {
+    const elements = [];
+    const counters = new Map();
+    const sx = window.scrollX, sy = window.scrollY;
+    const signature = (el) => {
+        let sig = el.tagName.toLowerCase();
+        if (el.id) sig += '#' + el.id;
+        const classes = Array.from(el.classList).sort().join('.');
+        return classes ? sig + '.' + classes : sig;
+    };
+    const ownText = (el) => {
+        let text = '';
+        for (const node of el.childNodes) {
+            if (node.nodeType === Node.TEXT_NODE) text += node.textContent;
+        }
+        return text.replace(/\\s+/g, ' ').trim().slice(0, maxText);
+    };
+    const walk = (el, parentKey) => {
+        if (elements.length >= maxElements) return;
+        const style = getComputedStyle(el);
+        if (style.display === 'none') return;
+        const base = parentKey ? parentKey + ' > ' + signature(el) : signature(el);
+        const n = (counters.get(base) || 0) + 1;
+        counters.set(base, n);
+        const key = n > 1 ? `${base}[${n}]` : base;
+        const rect = el.getBoundingClientRect();
+        const visible = style.visibility !== 'hidden' && parseFloat(style.opacity) > 0;
+        if (visible && rect.width > 0 && rect.height > 0) {
+            const styles = {};
+            for (const prop of properties) styles[prop] = style.getPropertyValue(prop);
+            const entry = {
+                key, tag: el.tagName.toLowerCase(), text: ownText(el), styles,
+                box: [Math.round(rect.left + sx), Math.round(rect.top + sy),
+                      Math.round(rect.width), Math.round(rect.height)],
+            };
+            if (el.tagName === 'IMG') entry.src = el.currentSrc || el.src;
+            if (el.tagName === 'INPUT' || el.tagName === 'TEXTAREA') entry.text = String(el.value).slice(0, maxText);
+            elements.push(entry);
+        }
+        for (const child of el.children) walk(child, key);
+    };
+    walk(document.body, '');
+    return {
+        elements,
+        truncated: elements.length >= maxElements,
+        size: [document.documentElement.scrollWidth, document.documentElement.scrollHeight],
+    };
+}
+"""
+
+
+async def capture_dom_snapshot(page, max_elements: int = MAX_ELEMENTS) -> Dict:
+    """Snapshot compacto del DOM visible de `page` (Playwright)"""
+    return await page.evaluate(_SNAPSHOT_SCRIPT, {
+        "properties": list(STYLE_PROPERTIES), "maxElements": max_elements, "maxText": MAX_TEXT,
+    })
+
+
+def _parent_key(key: str) -> Optional[str]:
+    return key.rsplit(" > ", 1)[0] if " > " in key else None
+
+
+def _name(element: Dict) -> str:
+    """Nombre corto: tag con su id o su primera clase"""
+    signature = element["key"].rsplit(" > ", 1)[-1].split("[", 1)[0]
+    tag, _, rest = signature.partition(".")
+    return tag if "#" in tag else (f"{tag}.{rest.split('.')[0]}" if rest else tag)
+
+
+def _corners(box: List[int]) -> Tuple[int, int, int, int]:
+    x, y, width, height = box
+    return (x, y, x + width, y + height)
+
+
+def _cap(changes: List[str], what: str) -> List[str]:
+    if len(changes) <= MAX_CHANGES_PER_CATEGORY:
+        return changes
+    extra = len(changes) - MAX_CHANGES_PER_CATEGORY
+    return changes[:MAX_CHANGES_PER_CATEGORY] + [f"... and {extra} more {what}"]
+
+
+def _subtree_text(key: str, elements: Dict[str, Dict]) -> str:
+    """Texto de un elemento y sus descendientes (para describir bloques añadidos)"""
+    prefix = key + " > "
+    texts = [element["text"] for child_key, element in elements.items()
+             if (child_key == key or child_key.startswith(prefix)) and element.get("text")]
+    return " ".join(texts)
+
+
+def _describe(key: str, elements: Dict[str, Dict]) -> str:
+    text = _subtree_text(key, elements)
+    return f'{_name(elements[key])} "{text[:60]}{"..." if len(text) > 60 else ""}"' if text else _name(elements[key])
+
+
+def diff_snapshots(snapshot1: Dict, snapshot2: Dict, tolerance: int = LAYOUT_TOLERANCE_PX) -> Tuple[Dict, Dict]:
+    """Diff estructural de V1 contra V2.
+
+    Devuelve (diferencias con las mismas claves que el análisis del modelo,
+    regiones). Las regiones son {"explained": cajas (x0, y0, x1, y1) cuyos
+    píxeles explican los cambios reportados, "moved": pares [caja V1, caja V2]
+    de bloques desplazados}; los desplazamientos solo se dan por explicados si
+    los píxeles coinciden (ver image_ops.diff_bbox).
+    """
+    elements1 = {element["key"]: element for element in snapshot1.get("elements", [])}
+    elements2 = {element["key"]: element for element in snapshot2.get("elements", [])}
+    parents = {_parent_key(key) for key in (*elements1, *elements2)}
+    explained: List[Tuple[int, int, int, int]] = []
+    moved: List[List[Tuple[int, int, int, int]]] = []
+
+    def explain(element: Dict) -> None:
+        if element["tag"] not in _OPAQUE_TAGS:
+            explained.append(_corners(element["box"]))
+
+    # Elementos añadidos o eliminados: se reporta la raíz de cada subárbol
+    element_changes = []
+    for key, element in elements2.items():
+        if key not in elements1:
+            explain(element)
+            if _parent_key(key) in elements1:
+                element_changes.append(f"V2 adds {_describe(key, elements2)}")
+    for key, element in elements1.items():
+        if key not in elements2:
+            explain(element)
+            if _parent_key(key) in elements2:
+                element_changes.append(f"V1 has {_describe(key, elements1)}, missing in V2")
+
+    text_changes = []
+    style_groups: Dict[Tuple[str, str, str], List[str]] = {}
+    moved_groups: Dict[Tuple[Optional[str], int, int], List[str]] = {}
+    resized = []
+    for key, before in elements1.items():
+        after = elements2.get(key)
+        if after is None:
+            continue
+        name = _name(after)
+        changed = False
+
+        if before.get("text") != after.get("text"):
+            changed = True
+            text_changes.append(f'{name}: V1 has "{before.get("text") or ""}", V2 has "{after.get("text") or ""}"')
+        if before.get("src") != after.get("src"):
+            changed = True
+            element_changes.append(f"{name}: V1 shows {before.get('src')}, V2 shows {after.get('src')}")
+
+        for prop, value in before["styles"].items():
+            new_value = after["styles"].get(prop)
+            if new_value == value:
+                continue
+            style_groups.setdefault((prop, value, new_value), []).append(name)
+            # Un estilo heredado solo cambia píxeles donde hay texto propio;
+            # el resto de la caja lo explican sus descendientes
+            if prop not in _INHERITED or after.get("text"):
+                changed = True
+
+        (x1, y1, w1, h1), (x2, y2, w2, h2) = before["box"], after["box"]
+        dx, dy = x2 - x1, y2 - y1
+        if abs(dx) > tolerance or abs(dy) > tolerance:
+            # Solo se reporta (y se verifica) lo que se mueve respecto a su contenedor
+            parent = _parent_key(key)
+            parent_delta = None
+            if parent in elements1 and parent in elements2:
+                (px1, py1, _, _), (px2, py2, _, _) = elements1[parent]["box"], elements2[parent]["box"]
+                parent_delta = (px2 - px1, py2 - py1)
+            if parent_delta is None or abs(parent_delta[0] - dx) > tolerance or abs(parent_delta[1] - dy) > tolerance:
+                moved_groups.setdefault((parent, dx, dy), []).append(name)
+                if (w1, h1) == (w2, h2) and before["tag"] not in _OPAQUE_TAGS:
+                    moved.append([_corners(before["box"]), _corners(after["box"])])
+        if abs(w2 - w1) > tolerance or abs(h2 - h1) > tolerance:
+            resized.append((abs(w2 * h2 - w1 * h1), f"{name}: V1 is {w1}x{h1}px, V2 is {w2}x{h2}px"))
+            # Un contenedor cambia de tamaño por sus hijos; solo las hojas se explican solas.
+            # Del contenedor se explica la franja nueva si su fondo no ha cambiado.
+            if key not in parents:
+                changed = True
+            elif all(before["styles"].get(prop) == after["styles"].get(prop) for prop in _BACKGROUND):
+                if h2 > h1:
+                    explained.append((x2, y2 + h1, x2 + w2, y2 + h2))
+                if w2 > w1:
+                    explained.append((x2 + w1, y2, x2 + w2, y2 + h2))
+
+        if changed:
+            explain(before)
+            explain(after)
+
+    style_changes = []
+    for (prop, value, new_value), names in sorted(style_groups.items(), key=lambda item: -len(item[1])):
+        where = names[0] + (f" and {len(names) - 1} more elements" if len(names) > 1 else "")
+        style_changes.append(f"{prop}: V1 has {value or 'none'}, V2 has {new_value or 'none'} ({where})")
+
+    layout_changes = []
+    size1, size2 = snapshot1.get("size"), snapshot2.get("size")
+    if size1 and size2 and size1 != size2:
+        layout_changes.append(f"Page size: V1 is {size1[0]}x{size1[1]}px, V2 is {size2[0]}x{size2[1]}px")
+    for (_, dx, dy), names in sorted(moved_groups.items(), key=lambda item: -len(item[1])):
+        moves = []
+        if dy:
+            moves.append(f"{'down' if dy > 0 else 'up'} {abs(dy)}px")
+        if dx:
+            moves.append(f"{'right' if dx > 0 else 'left'} {abs(dx)}px")
+        more = f" and {len(names) - 4} more" if len(names) > 4 else ""
+        layout_changes.append(f"{', '.join(names[:4])}{more} moved {' and '.join(moves)} in V2")
+    layout_changes += [change for _, change in sorted(resized, key=lambda item: -item[0])]
+
+    differences = {
+        "layout_changes": _cap(layout_changes, "layout changes"),
+        "text_changes": _cap(text_changes, "text changes"),
+        "style_changes": _cap(style_changes, "style changes"),
+        "element_changes": _cap(element_changes, "element changes"),
+    }
+    return differences, {"explained": explained, "moved": moved}
+
+
+def merge_differences(structural: Dict, visual: Dict) -> Dict:
+    """Une el diff estructural con el del modelo (regiones residuales) sin duplicados"""
+    merged = {}
+    for key in ("layout_changes", "text_changes", "style_changes", "element_changes"):
+        merged[key] = list(structural.get(key, []))
+        for change in visual.get(key, []):
+            if change not in merged[key]:
+                merged[key].append(change)
+    if "raw_response" in visual:
+        merged["raw_response"] = visual["raw_response"]
+    return merged
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Máscaras de zonas dinámicas (fechas, carruseles, anuncios, contadores animados)
+Las zonas enmascaradas se pintan de un color plano en ambas capturas antes del
+pre-diff: no cuentan como cambio, no influyen en el recorte y el modelo no las
+ve. Hay dos fuentes de máscaras:
+- selectores CSS: se registran las cajas de sus elementos durante la captura;
+- auto-máscara: la página se renderiza K veces y se enmascaran las celdas cuyos
+  píxeles varían entre sus propias capturas
+"""
+
+import io
+from typing import Dict, List
+
+from component_cache import capture_component_boxes
+
+
+# Tamaño (px) de las celdas en que se agrupan los píxeles que varían
+AUTO_MASK_CELL = 16
+
+
+async def capture_mask_boxes(page, selectors: List[str]) -> List[List[int]]:
+    """Cajas (x0, y0, x1, y1) de los elementos visibles de los selectores"""
+    boxes = await capture_component_boxes(page, {f"mask{n}": selector for n, selector in enumerate(selectors)})
+    return list(boxes.values())
+
+
+def varying_regions(screenshots: List[bytes], cell: int = AUTO_MASK_CELL) -> List[List[int]]:
+    """Cajas de las zonas que cambian entre varias capturas de la misma página.
+
+    Los píxeles distintos de la primera captura se agrupan en celdas de `cell`
+    px; cada tramo de celdas contiguas de una fila es una caja, y las cajas de
+    filas consecutivas con el mismo tramo se unen. Si la altura de la página
+    varía, la parte que no está en todas las capturas también se enmascara.
+    """
+    from PIL import Image, ImageChops
+
+    images = [Image.open(io.BytesIO(data)).convert('RGB') for data in screenshots]
+    width = max(img.width for img in images)
+    height = max(img.height for img in images)
+
+    def padded(img: Image.Image) -> Image.Image:
+        if img.size == (width, height):
+            return img
+        canvas = Image.new('RGB', (width, height))
+        canvas.paste(img, (0, 0))
+        return canvas
+
+    base = padded(images[0])
+    varying = Image.new('L', (width, height))
+    for img in images:
+        if img is not images[0]:
+            # Umbral por canal y de nuevo en gris: un cambio de 1 en un solo canal cuenta
+            diff = ImageChops.difference(base, padded(img)).point(lambda value: 255 if value else 0)
+            varying = ImageChops.lighter(varying, diff.convert('L').point(lambda value: 255 if value else 0))
+        if img.size != (width, height):
+            # Lo que falta en una captura más pequeña también varía
+            varying.paste(255, (0, img.height, width, height))
+            varying.paste(255, (img.width, 0, width, height))
+    if varying.getbbox() is None:
+        return []
+
+    # Una celda varía si tiene algún píxel distinto: la media del bloque no es 0
+    grid = varying.reduce(cell) if cell > 1 else varying
+    columns, rows = grid.size
+    flags = [value > 0 for value in grid.getdata()]
+
+    boxes: List[List[int]] = []
+    open_boxes: Dict[tuple, List[int]] = {}  # (x0, x1) -> caja que llega hasta la fila anterior
+    for row in range(rows):
+        runs = []
+        start = None
+        for column in range(columns + 1):
+            on = column < columns and flags[row * columns + column]
+            if on and start is None:
+                start = column
+            elif not on and start is not None:
+                runs.append((start, column))
+                start = None
+        still_open = {}
+        for run in runs:
+            box = open_boxes.pop(run, None)
+            if box is None:
+                box = [run[0] * cell, row * cell, min(width, run[1] * cell), 0]
+                boxes.append(box)
+            box[3] = min(height, (row + 1) * cell)
+            still_open[run] = box
+        open_boxes = still_open
+    return boxes
+
+
+def unmasked_snapshot(snapshot: Dict, masks: List) -> Dict:
+    """Snapshot del DOM sin los elementos que caen por completo dentro de una máscara,
+    para que el diff estructural tampoco reporte sus cambios"""
+    def masked(box: List[int]) -> bool:
+        x, y, width, height = box
+        return any(x0 <= x and y0 <= y and x + width <= x1 and y + height <= y1 for x0, y0, x1, y1 in masks)
+
+    return {**snapshot, "elements": [element for element in snapshot.get("elements", [])
+                                     if not masked(element["box"])]}
@@ -31,7 +31,7 @@ async def compare_websites():
         
         try:
             results = await qa.run_url_comparison(url1, url2)
-            qa.generate_report(results)
+            await qa.generate_report(results)
         except Exception as e:
             print(f"Error: {e}")
 
@@ -48,7 +48,7 @@ async def compare_local_vs_production():
     
     try:
         results = await qa.run_url_comparison(local_url, prod_url)
-        qa.generate_report(results)
+        await qa.generate_report(results)
     except Exception as e:
         print(f"Error: {e}")
         print("Asegúrate de que tu servidor local esté corriendo")
@@ -4,11 +4,28 @@ HTML Report Generator para SmartVisionQA
 Convierte reportes JSON en reportes HTML visuales
 """
 
+import argparse
+import html
 import json
+import os
+import re
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Tuple
+
+from change_classifier import get_classifier
+from report_templates import ASSETS_DIRNAME, REPORT_PAGE, ensure_assets
+
+
+def safe_name(name: str) -> str:
+    """Convierte un nombre de fichero o una URL en un nombre de fichero válido"""
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', name.replace('.html', ''))
+
+
+def report_stem(file1: str, file2: str) -> str:
+    """Nombre base de los reportes de un par"""
+    return f"{safe_name(file1)}_vs_{safe_name(file2)}"
 
 
 class HTMLReportGenerator:
@@ -19,486 +36,51 @@ class HTMLReportGenerator:
     
     def generate_html_report(self, results: Dict) -> Path:
         """Genera reporte HTML con imágenes y análisis"""
+        report_path, html_content = self.render_html_report(results)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+        
+        return report_path
+    
+    def render_html_report(self, results: Dict) -> Tuple[Path, str]:
+        """Construye el HTML en memoria y devuelve (ruta de destino, contenido) sin escribirlo"""
         
         file1_name = results['file1'].replace('.html', '')
         file2_name = results['file2'].replace('.html', '')
-        img1_path = f"{file1_name}_screenshot.png"
-        img2_path = f"{file2_name}_screenshot.png"
+        screenshots = results.get('screenshots') or [f"{file1_name}_screenshot.png", f"{file2_name}_screenshot.png"]
+        previews = results.get('previews') or [None, None]
         
         diff = results['differences']
         
-        # Template HTML
-        html_content = f"""
-<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Smart Vision QA Report - {file1_name} vs {file2_name}</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: 'Segoe UI', system-ui, sans-serif;
-            background: #f8fafc;
-            padding: 20px;
-            line-height: 1.6;
-        }}
-        
-        .container {{
-            max-width: 1400px;
-            margin: 0 auto;
-        }}
-        
-        .header {{
-            background: white;
-            border-radius: 12px;
-            padding: 30px;
-            margin-bottom: 30px;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.05);
-        }}
-        
-        .header h1 {{
-            color: #1e293b;
-            font-size: 2.5rem;
-            margin-bottom: 10px;
-        }}
-        
-        .comparison-info {{
-            color: #64748b;
-            font-size: 1.1rem;
-        }}
-        
-        .comparison-grid {{
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 20px;
-            margin-bottom: 30px;
-        }}
-        
-        .screenshot-panel {{
-            background: white;
-            border-radius: 12px;
-            padding: 20px;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.05);
-        }}
-        
-        .screenshot-panel h3 {{
-            color: #1e293b;
-            margin-bottom: 15px;
-            font-size: 1.3rem;
-        }}
-        
-        .screenshot-panel img {{
-            width: 100%;
-            height: auto;
-            border-radius: 8px;
-            border: 1px solid #e2e8f0;
-        }}
-        
-        .analysis-section {{
-            background: white;
-            border-radius: 12px;
-            padding: 30px;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.05);
-        }}
-        
-        .analysis-section h2 {{
-            color: #1e293b;
-            margin-bottom: 25px;
-            font-size: 1.8rem;
-        }}
-        
-        .change-category {{
-            margin-bottom: 25px;
-            padding: 20px;
-            border-radius: 8px;
-            border-left: 4px solid #e2e8f0;
-        }}
-        
-        .change-category.layout {{
-            background: #fef3f2;
-            border-color: #ef4444;
-        }}
-        
-        .change-category.text {{
-            background: #fff7ed;
-            border-color: #f97316;
-        }}
-        
-        .change-category.style {{
-            background: #f0f9ff;
-            border-color: #3b82f6;
-        }}
-        
-        .change-category.element {{
-            background: #f0fdf4;
-            border-color: #22c55e;
-        }}
-        
-        .change-category h3 {{
-            color: #1e293b;
-            margin-bottom: 10px;
-            font-size: 1.2rem;
-        }}
-        
-        .change-list {{
-            list-style: none;
-        }}
-        
-        .change-list li {{
-            padding: 8px 0;
-            border-bottom: 1px solid rgba(0,0,0,0.05);
-        }}
-        
-        .change-list li:last-child {{
-            border-bottom: none;
-        }}
-        
-        .raw-analysis {{
-            background: #f8fafc;
-            border-radius: 8px;
-            padding: 20px;
-            margin-top: 20px;
-            font-family: 'Courier New', monospace;
-            white-space: pre-wrap;
-            border: 1px solid #e2e8f0;
-        }}
-        
-        .timestamp {{
-            text-align: center;
-            color: #64748b;
-            margin-top: 30px;
-            font-size: 0.9rem;
-        }}
-        
-        .no-changes {{
-            text-align: center;
-            color: #22c55e;
-            font-size: 1.1rem;
-            padding: 20px;
-            background: #f0fdf4;
-            border-radius: 8px;
-            border: 1px solid #22c55e;
-        }}
-        
-        /* Dashboard Styles */
-        .dashboard {{
-            background: white;
-            border-radius: 12px;
-            padding: 30px;
-            margin-bottom: 20px;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.05);
-        }}
-        
-        .dashboard-header {{
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 25px;
-            border-bottom: 2px solid #f1f5f9;
-            padding-bottom: 15px;
-        }}
-        
-        .dashboard-header h3 {{
-            color: #1e293b;
-            font-size: 1.5rem;
-            margin: 0;
-        }}
-        
-        .severity-badge {{
-            padding: 8px 16px;
-            border-radius: 20px;
-            font-weight: 600;
-            font-size: 0.9rem;
-        }}
-        
-        .severity-badge.low {{
-            background: #dcfce7;
-            color: #166534;
-        }}
-        
-        .severity-badge.medium {{
-            background: #fef3c7;
-            color: #92400e;
-        }}
-        
-        .severity-badge.high {{
-            background: #fecaca;
-            color: #991b1b;
-        }}
-        
-        .metrics-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(150px, 1fr));
-            gap: 20px;
-            margin-bottom: 30px;
-        }}
-        
-        .metric-card {{
-            text-align: center;
-            padding: 20px;
-            background: #f8fafc;
-            border-radius: 8px;
-            border: 1px solid #e2e8f0;
-        }}
-        
-        .metric-number {{
-            font-size: 2rem;
-            font-weight: bold;
-            color: #3b82f6;
-            margin-bottom: 5px;
-        }}
-        
-        .metric-label {{
-            color: #64748b;
-            font-size: 0.9rem;
-            font-weight: 500;
-        }}
-        
-        .distribution-chart {{
-            margin-bottom: 30px;
-        }}
-        
-        .distribution-chart h4 {{
-            color: #1e293b;
-            margin-bottom: 15px;
-            font-size: 1.2rem;
-        }}
-        
-        .chart-container {{
-            background: #f8fafc;
-            border-radius: 8px;
-            padding: 20px;
-        }}
-        
-        .chart-item {{
-            display: flex;
-            align-items: center;
-            margin-bottom: 12px;
-        }}
-        
-        .chart-bar {{
-            height: 20px;
-            border-radius: 10px;
-            margin-right: 15px;
-            min-width: 20px;
-            transition: width 0.3s ease;
-        }}
-        
-        .chart-label {{
-            color: #374151;
-            font-size: 0.9rem;
-            font-weight: 500;
-        }}
-        
-        .changes-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-            gap: 20px;
-        }}
-        
-        .change-card {{
-            background: #f8fafc;
-            border-radius: 8px;
-            padding: 20px;
-            border-left: 4px solid #e2e8f0;
-            transition: transform 0.2s;
-        }}
-        
-        .change-card:hover {{
-            transform: translateY(-2px);
-        }}
-        
-        .change-card.layout {{
-            border-left-color: #ef4444;
-        }}
-        
-        .change-card.text {{
-            border-left-color: #f97316;
-        }}
-        
-        .change-card.style {{
-            border-left-color: #3b82f6;
-        }}
-        
-        .change-card.element {{
-            border-left-color: #22c55e;
-        }}
-        
-        .card-header {{
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-            margin-bottom: 15px;
-        }}
-        
-        .card-header h4 {{
-            color: #1e293b;
-            margin: 0;
-            font-size: 1.1rem;
-        }}
-        
-        .card-icon {{
-            font-size: 1.2rem;
-            margin-right: 10px;
-        }}
-        
-        .change-count {{
-            background: #e2e8f0;
-            color: #475569;
-            padding: 4px 8px;
-            border-radius: 12px;
-            font-size: 0.8rem;
-            font-weight: 600;
-        }}
-        
-        .card-progress {{
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }}
-        
-        .progress-bar {{
-            flex: 1;
-            height: 8px;
-            background: #e2e8f0;
-            border-radius: 4px;
-            overflow: hidden;
-        }}
-        
-        .progress-fill {{
-            height: 100%;
-            border-radius: 4px;
-            transition: width 0.3s ease;
-        }}
-        
-        .progress-fill.layout {{
-            background: #ef4444;
-        }}
-        
-        .progress-fill.text {{
-            background: #f97316;
-        }}
-        
-        .progress-fill.style {{
-            background: #3b82f6;
-        }}
-        
-        .progress-fill.element {{
-            background: #22c55e;
-        }}
-        
-        .percentage {{
-            color: #64748b;
-            font-size: 0.9rem;
-            font-weight: 600;
-            min-width: 50px;
-        }}
-        
-        .status-card {{
-            display: flex;
-            align-items: center;
-            padding: 25px;
-            border-radius: 12px;
-            border: 2px solid #e2e8f0;
-        }}
-        
-        .status-card.success {{
-            background: #f0fdf4;
-            border-color: #22c55e;
-        }}
-        
-        .status-icon {{
-            font-size: 2rem;
-            margin-right: 20px;
-        }}
-        
-        .status-content h4 {{
-            color: #1e293b;
-            margin-bottom: 5px;
-            font-size: 1.3rem;
-        }}
-        
-        .status-content p {{
-            color: #64748b;
-            margin: 0;
-        }}
-        
-        .detailed-analysis {{
-            margin-top: 30px;
-        }}
-        
-        .detailed-analysis details {{
-            background: #f8fafc;
-            border-radius: 8px;
-            border: 1px solid #e2e8f0;
-        }}
-        
-        .detailed-analysis summary {{
-            padding: 15px 20px;
-            cursor: pointer;
-            font-weight: 600;
-            color: #374151;
-            border-radius: 8px;
-            transition: background 0.2s;
-        }}
-        
-        .detailed-analysis summary:hover {{
-            background: #e2e8f0;
-        }}
-        
-        .detailed-analysis .raw-analysis {{
-            margin: 0;
-            border-top: 1px solid #e2e8f0;
-            border-radius: 0 0 8px 8px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>Smart Vision QA Report</h1>
-            <div class="comparison-info">
-                Comparing: <strong>V1: {results['file1']}</strong> vs <strong>V2: {results['file2']}</strong>
-            </div>
-        </div>
-        
-        <div class="comparison-grid">
-            <div class="screenshot-panel">
-                <h3>Version 1: {file1_name}</h3>
-                <img src="{img1_path}" alt="Screenshot of {file1_name}">
-            </div>
-            <div class="screenshot-panel">
-                <h3>Version 2: {file2_name}</h3>
-                <img src="{img2_path}" alt="Screenshot of {file2_name}">
-            </div>
-        </div>
-        
-        <div class="analysis-section">
-            <h2>Analysis Results</h2>
-            {self._generate_changes_html(diff)}
-        </div>
+        html_content = REPORT_PAGE.substitute(
+            assets_href=ASSETS_DIRNAME,
+            file1=results['file1'],
+            file2=results['file2'],
+            file1_name=file1_name,
+            file2_name=file2_name,
+            screenshot1_html=self._generate_screenshot_html(screenshots[0], previews[0], file1_name),
+            screenshot2_html=self._generate_screenshot_html(screenshots[1], previews[1], file2_name),
+            changes_html=self._generate_changes_html(diff),
+            timestamp=self._get_timestamp()
+        )
+        
+        # CSS compartido: se escribe una vez por directorio de resultados
+        ensure_assets(self.results_dir)
+        
+        report_filename = f"visual_report_{report_stem(results['file1'], results['file2'])}.html"
+        return self.results_dir / report_filename, html_content
+    
+    def _generate_screenshot_html(self, screenshot: str, preview: Dict, name: str) -> str:
+        """Miniatura con carga diferida; la resolución completa solo se pide al hacer clic"""
         
-        <div class="timestamp">
-            Report generated on {self._get_timestamp()}
-        </div>
-    </div>
-</body>
-</html>"""
+        if not preview:
+            return f'<img src="{screenshot}" alt="Screenshot of {name}" loading="lazy">'
         
-        file1_name = results['file1'].replace('.html', '')
-        file2_name = results['file2'].replace('.html', '')
-        report_filename = f"visual_report_{file1_name}_vs_{file2_name}.html"
-        report_path = self.results_dir / report_filename
-        with open(report_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        return report_path
+        pyramid = html.escape(json.dumps(preview['pyramid'], separators=(',', ':')))
+        return f"""<a class="zoomable" href="{preview['full']}" data-tiles="{preview['tiles']}" data-pyramid="{pyramid}">
+                    <img src="{preview['thumbnail']}" alt="Screenshot of {name}" loading="lazy">
+                </a>
+                <div class="zoom-hint">Click to open at full resolution</div>"""
     
     def _generate_changes_html(self, diff: Dict) -> str:
         """Genera HTML para los cambios detectados"""
@@ -625,70 +207,7 @@ class HTMLReportGenerator:
 
     def _parse_raw_analysis(self, raw_text: str) -> Dict:
         """Extrae insights categorizados del análisis de texto libre"""
-        
-        categories = {
-            'layout': {
-                'keywords': ['layout', 'position', 'grid', 'flex', 'alignment', 'structure', 'spacing', 'moved'],
-                'changes': []
-            },
-            'text': {
-                'keywords': ['text', 'font', 'typography', 'content', 'heading', 'paragraph', 'title', 'label'],
-                'changes': []
-            },
-            'style': {
-                'keywords': ['color', 'background', 'border', 'shadow', 'gradient', 'style', 'theme', 'dark'],
-                'changes': []
-            },
-            'element': {
-                'keywords': ['button', 'element', 'component', 'widget', 'card', 'section', 'badge', 'banner'],
-                'changes': []
-            }
-        }
-        
-        # Dividir por líneas o frases
-        lines = raw_text.replace('. ', '.\n').split('\n')
-        
-        for line in lines:
-            line_clean = line.strip()
-            
-            # Ignorar líneas que son formato JSON o están vacías
-            if (not line_clean or 
-                len(line_clean) < 10 or
-                line_clean in ['[', ']', '{', '}'] or
-                any(line_clean.startswith(f'"{key}_changes"') for key in categories.keys()) or
-                any(line_clean.startswith(f'{key}_changes:') for key in categories.keys())):
-                continue
-                
-            # Asignar cada línea a la categoría más relevante
-            best_match = None
-            best_score = 0
-            
-            for cat_name, cat_data in categories.items():
-                score = sum(1 for keyword in cat_data['keywords'] 
-                        if keyword.lower() in line_clean.lower())
-                if score > best_score:
-                    best_score = score
-                    best_match = cat_name
-            
-            if best_match and best_score > 0:
-                # Limpiar y capitalizar la línea
-                clean_line = line_clean.strip('.-,[]"\' ')
-                if clean_line and not clean_line[0].isupper():
-                    clean_line = clean_line[0].upper() + clean_line[1:]
-                
-                # No añadir si es una clave JSON
-                if not any(clean_line.lower().endswith('_changes') for _ in categories.keys()):
-                    categories[best_match]['changes'].append(clean_line)
-        
-        # Contar cambios detectados
-        detected_changes = {cat: len(data['changes']) 
-                        for cat, data in categories.items()}
-        
-        return {
-            'categories': categories,
-            'detected_changes': detected_changes,
-            'total_changes': sum(detected_changes.values())
-        }
+        return get_classifier().categorize(raw_text)
     
     def _create_visual_analysis(self, analysis_data: Dict, raw_text: str) -> str:
         """Crea análisis visual desde datos parseados"""
@@ -734,12 +253,13 @@ class HTMLReportGenerator:
         """Genera versión formateada del análisis AI"""
         
         # Formatear el texto para mejor legibilidad
+        classifier = get_classifier()
         formatted_lines = []
         for line in raw_text.split('\n'):
             line = line.strip()
             if line:
                 # Detectar y formatear secciones
-                if any(marker in line.upper() for marker in ['LAYOUT', 'TEXT', 'STYLE', 'ELEMENT']):
+                if classifier.is_section_header(line):
                     formatted_lines.append(f"<strong>{line}</strong>")
                 elif line.startswith('-') or line.startswith('•') or line.startswith('*'):
                     formatted_lines.append(f"  {line}")
@@ -872,6 +392,17 @@ class HTMLReportGenerator:
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
+def generate_from_results(results: Dict, results_dir: Path) -> Path:
+    """Genera HTML directamente desde el diccionario de resultados en memoria"""
+    generator = HTMLReportGenerator(results_dir)
+    return generator.generate_html_report(results)
+
+
+def render_from_results(results: Dict, results_dir: Path) -> Tuple[Path, str]:
+    """Como generate_from_results, pero devuelve el HTML sin escribirlo (para escritura asíncrona)"""
+    return HTMLReportGenerator(results_dir).render_html_report(results)
+
+
 def generate_from_json(json_path: Path, results_dir: Path = None) -> Path:
     """Función para generar HTML desde archivo JSON"""
     if results_dir is None:
@@ -880,26 +411,55 @@ def generate_from_json(json_path: Path, results_dir: Path = None) -> Path:
     with open(json_path, 'r') as f:
         results = json.load(f)
     
-    generator = HTMLReportGenerator(results_dir)
-    return generator.generate_html_report(results)
+    return generate_from_results(results, results_dir)
+
+
+def _generate_report_worker(json_path: str, results_dir: str = None) -> str:
+    """Tarea ejecutada en cada proceso del pool (argumentos y retorno serializables)"""
+    return str(generate_from_json(Path(json_path), Path(results_dir) if results_dir else None))
+
+
+def generate_reports_parallel(json_paths: List[Path], results_dir: Path = None, jobs: int = None) -> List[Path]:
+    """Regenera muchos reportes en paralelo usando un pool de procesos"""
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(json_paths) <= 1:
+        return [generate_from_json(Path(p), results_dir) for p in json_paths]
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    results_arg = str(results_dir) if results_dir else None
+    # Trozos grandes para amortizar el coste de IPC con miles de reportes
+    chunksize = max(1, len(json_paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        paths = pool.map(
+            _generate_report_worker,
+            [str(p) for p in json_paths],
+            [results_arg] * len(json_paths),
+            chunksize=chunksize
+        )
+        return [Path(p) for p in paths]
 
 
 def main():
     """Script principal para ejecutar desde línea de comandos"""
-    if len(sys.argv) < 2:
-        print("Uso: python generate_html_report.py <comparison_report.json>")
-        print("Ejemplo: python generate_html_report.py results/comparison_report.json")
-        sys.exit(1)
-    
-    json_path = Path(sys.argv[1])
+    parser = argparse.ArgumentParser(
+        description="Genera reportes HTML a partir de reportes JSON de comparación",
+        epilog="Ejemplo: python generate_html_report.py results/comparison_*.json --jobs 8"
+    )
+    parser.add_argument("json_files", nargs="+", type=Path, help="Reportes comparison_*.json")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Procesos en paralelo (por defecto, núcleos disponibles)")
+    args = parser.parse_args()
     
-    if not json_path.exists():
-        print(f"Error: No se encontró {json_path}")
+    missing = [p for p in args.json_files if not p.exists()]
+    if missing:
+        print(f"Error: No se encontró {missing[0]}")
         sys.exit(1)
     
     try:
-        html_path = generate_from_json(json_path)
-        print(f"Reporte HTML generado: {html_path}")
+        html_paths = generate_reports_parallel(args.json_files, jobs=args.jobs)
+        for html_path in html_paths:
+            print(f"Reporte HTML generado: {html_path}")
     except Exception as e:
         print(f"Error generando reporte HTML: {e}")
         sys.exit(1)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Preparación de imágenes en un pool de procesos dedicado
+Decodificación, máscaras, pre-diff, recorte, composición y codificación fuera del
+event loop. Las imágenes viajan entre procesos como rutas de fichero o
+memoria compartida, nunca como bytes serializados con pickle.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from PIL import Image, ImageChops, ImageDraw, ImageFilter
+
+
+# Margen alrededor de la franja con cambios y fracción máxima de la altura
+# para que merezca la pena recortar
+CROP_MARGIN = 200
+CROP_MAX_FRACTION = 0.7
+
+# Formas de presentar V1 y V2 al modelo:
+#   "stack":        una imagen, V1 arriba y V2 abajo
+#   "side_by_side": una imagen, V1 a la izquierda y V2 a la derecha
+#   "separate":     dos imágenes en la misma petición
+#   "overlay":      una imagen, V2 con las zonas distintas de V1 resaltadas
+STRATEGIES = ("stack", "side_by_side", "separate", "overlay")
+
+SEPARATOR_PX = 16
+OVERLAY_COLOR = (255, 0, 64)
+OVERLAY_ALPHA = 0.45
+
+# Color de las zonas enmascaradas (ver dynamic_masks.py)
+MASK_FILL = (128, 128, 128)
+
+# Una imagen se pasa a un worker como ruta o como {"shm": nombre, "size": bytes}
+ImageSource = Union[str, Dict]
+
+
+def _open_source(source: ImageSource) -> Image.Image:
+    """Decodifica una imagen desde una ruta o un bloque de memoria compartida"""
+    if isinstance(source, dict):
+        # El bloque pertenece al proceso principal, que es quien lo libera; los
+        # workers comparten su resource_tracker, así que aquí solo se cierra
+        block = shared_memory.SharedMemory(name=source["shm"])
+        try:
+            img = Image.open(io.BytesIO(block.buf[:source["size"]]))
+            img.load()
+        finally:
+            block.close()
+    else:
+        img = Image.open(source)
+        img.load()
+    return img.convert('RGB')
+
+
+def mask_regions(img1: Image.Image, img2: Image.Image, boxes: List) -> None:
+    """Pinta las zonas enmascaradas del mismo color en ambas imágenes (in situ):
+    dejan de contar en el pre-diff, no amplían el recorte y el modelo no las ve"""
+    for img in (img1, img2):
+        draw = ImageDraw.Draw(img)
+        for x0, y0, x1, y1 in boxes:
+            if x1 > x0 and y1 > y0:
+                draw.rectangle((x0, y0, x1 - 1, y1 - 1), fill=MASK_FILL)
+
+
+def diff_bbox(img1: Image.Image, img2: Image.Image,
+              regions: Dict = None) -> Optional[Tuple[int, int, int, int]]:
+    """Caja que contiene todos los píxeles distintos, o None si son idénticas.
+
+    Con `regions` (ver dom_snapshot.diff_snapshots) se ignoran los píxeles que
+    ya explica el diff estructural: las cajas "explained" y los bloques "moved"
+    cuyo contenido es idéntico en su posición de V1 y de V2. Las zonas "masked"
+    se pintan antes con mask_regions, fuera de esta función.
+    """
+    width = max(img1.width, img2.width)
+    height = max(img1.height, img2.height)
+    if img1.size != (width, height):
+        padded = Image.new('RGB', (width, height))
+        padded.paste(img1, (0, 0))
+        img1 = padded
+    if img2.size != (width, height):
+        padded = Image.new('RGB', (width, height))
+        padded.paste(img2, (0, 0))
+        img2 = padded
+    diff = ImageChops.difference(img1, img2)
+    if not regions or diff.getbbox() is None:
+        return diff.getbbox()
+
+    masked = []
+    for box1, box2 in regions.get("moved", []):
+        if ImageChops.difference(img1.crop(box1), img2.crop(box2)).getbbox() is None:
+            masked += [box1, box2]
+    draw = ImageDraw.Draw(diff)
+    for x0, y0, x1, y1 in [*masked, *regions.get("explained", [])]:
+        if x1 > x0 and y1 > y0:
+            draw.rectangle((x0, y0, x1 - 1, y1 - 1), fill=(0, 0, 0))
+    return diff.getbbox()
+
+
+def crop_band(img1: Image.Image, img2: Image.Image, bbox: Tuple[int, int, int, int],
+              margin: int = CROP_MARGIN) -> Tuple[Image.Image, Image.Image, bool]:
+    """Recorta ambas imágenes a la misma franja horizontal con cambios.
+    Se mantiene el ancho completo para no perder el contexto del layout."""
+    height = max(img1.height, img2.height)
+    top = max(0, bbox[1] - margin)
+    bottom = min(height, bbox[3] + margin)
+    if bottom - top > height * CROP_MAX_FRACTION:
+        return img1, img2, False
+    return (img1.crop((0, top, img1.width, min(bottom, img1.height))),
+            img2.crop((0, top, img2.width, min(bottom, img2.height))),
+            True)
+
+
+def stack_vertical(img1: Image.Image, img2: Image.Image) -> Image.Image:
+    """V1 arriba, V2 abajo en una sola imagen"""
+    combined = Image.new('RGB', (max(img1.width, img2.width), img1.height + img2.height))
+    combined.paste(img1, (0, 0))
+    combined.paste(img2, (0, img1.height))
+    return combined
+
+
+def side_by_side(img1: Image.Image, img2: Image.Image, gap: int = SEPARATOR_PX) -> Image.Image:
+    """V1 a la izquierda, V2 a la derecha, con una franja gris entre ambas"""
+    combined = Image.new('RGB', (img1.width + gap + img2.width, max(img1.height, img2.height)),
+                         (128, 128, 128))
+    combined.paste(img1, (0, 0))
+    combined.paste(img2, (img1.width + gap, 0))
+    return combined
+
+
+def diff_overlay(img1: Image.Image, img2: Image.Image) -> Image.Image:
+    """V2 con los píxeles distintos de V1 teñidos, ensanchados unos píxeles para
+    que los cambios pequeños (un carácter, un borde) sigan siendo visibles"""
+    base = img2
+    if img1.size != img2.size:
+        img1 = img1.crop((0, 0, img2.width, img2.height))
+    mask = ImageChops.difference(img1, img2).convert('L').point(lambda value: 255 if value > 16 else 0)
+    mask = mask.filter(ImageFilter.MaxFilter(5))
+    tint = Image.blend(base, Image.new('RGB', base.size, OVERLAY_COLOR), OVERLAY_ALPHA)
+    return Image.composite(tint, base, mask)
+
+
+def compose(img1: Image.Image, img2: Image.Image, strategy: str = "stack") -> List[Image.Image]:
+    """Imágenes que se envían al modelo según la estrategia"""
+    if strategy == "stack":
+        return [stack_vertical(img1, img2)]
+    if strategy == "side_by_side":
+        return [side_by_side(img1, img2)]
+    if strategy == "separate":
+        return [img1, img2]
+    if strategy == "overlay":
+        return [diff_overlay(img1, img2)]
+    raise ValueError(f"Estrategia de composición desconocida: {strategy}")
+
+
+def limit_width(image: Image.Image, max_width: int = None) -> Image.Image:
+    """Reduce una captura para que no pase de `max_width` px de ancho, con la misma
+    proporción. Se aplica a cada captura antes de componer: limitar el lado mayor
+    de la imagen compuesta dejaba una página completa en una tira ilegible."""
+    if not max_width or image.width <= max_width:
+        return image
+    scale = max_width / image.width
+    return image.resize((max_width, max(1, round(image.height * scale))), Image.LANCZOS)
+
+
+def prepare_comparison(source1: ImageSource, source2: ImageSource, output_path: str,
+                       crop: bool = True, strategy: str = "stack", regions: Dict = None,
+                       max_width: int = None) -> Dict:
+    """Prepara las imágenes que se envían al modelo. Se ejecuta en un worker del pool.
+
+    Devuelve {"identical": True} si no hay ningún píxel distinto (fuera de las
+    `regions` ya explicadas o enmascaradas); en otro caso escribe un PNG por imagen compuesta
+    (`output_path`, `output_path` con sufijo _2...), con cada captura reducida a
+    `max_width` px de ancho si se indica, y devuelve sus rutas y tamaños.
+    """
+    img1 = _open_source(source1)
+    img2 = _open_source(source2)
+    if regions and regions.get("masked"):
+        mask_regions(img1, img2, regions["masked"])
+
+    bbox = diff_bbox(img1, img2, regions)
+    if bbox is None:
+        return {"identical": True}
+
+    cropped = False
+    if crop:
+        img1, img2, cropped = crop_band(img1, img2, bbox)
+    img1, img2 = limit_width(img1, max_width), limit_width(img2, max_width)
+
+    output_path = Path(output_path)
+    paths, sizes = [], []
+    for index, image in enumerate(compose(img1, img2, strategy)):
+        path = output_path if index == 0 else output_path.with_name(
+            f"{output_path.stem}_{index + 1}{output_path.suffix}")
+        image.save(path, format='PNG')
+        paths.append(str(path))
+        sizes.append(list(image.size))
+    return {"identical": False, "paths": paths, "sizes": sizes, "bbox": list(bbox),
+            "cropped": cropped, "strategy": strategy}
+
+
+def crop_components(source1: ImageSource, source2: ImageSource, boxes1: Dict[str, List[int]],
+                    boxes2: Dict[str, List[int]], output_prefix: str, masks: List = None) -> Dict[str, Dict]:
+    """Recorta cada componente de ambas capturas y calcula el hash de sus píxeles.
+
+    Devuelve {nombre: {"sha1", "sha2"}} (None si el componente no existe en esa
+    versión). Solo los componentes presentes en ambas y con píxeles distintos se
+    escriben como PNG ("path1", "path2") para analizarlos. Las zonas de `masks`
+    se pintan antes de recortar: un contador dentro de un componente no lo cambia.
+    """
+    img1 = _open_source(source1)
+    img2 = _open_source(source2)
+    if masks:
+        mask_regions(img1, img2, masks)
+
+    def pixels_hash(img: Image.Image) -> str:
+        digest = hashlib.sha256(f"{img.width}x{img.height}".encode('utf-8'))
+        digest.update(img.tobytes())
+        return digest.hexdigest()
+
+    crops = {}
+    for index, name in enumerate(sorted({*boxes1, *boxes2})):
+        crop1 = img1.crop(tuple(boxes1[name])) if name in boxes1 else None
+        crop2 = img2.crop(tuple(boxes2[name])) if name in boxes2 else None
+        entry = {"sha1": pixels_hash(crop1) if crop1 else None, "sha2": pixels_hash(crop2) if crop2 else None}
+        if crop1 and crop2 and entry["sha1"] != entry["sha2"]:
+            entry["path1"] = f"{output_prefix}_{index}_v1.png"
+            entry["path2"] = f"{output_prefix}_{index}_v2.png"
+            crop1.save(entry["path1"], format='PNG')
+            crop2.save(entry["path2"], format='PNG')
+        crops[name] = entry
+    return crops
+
+
+class ImageWorkPool:
+    """Pool de procesos para el trabajo de imagen intensivo en CPU"""
+
+    def __init__(self, max_workers: int = None, work_dir: Path = None):
+        self.executor = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1)
+        self.work_dir = Path(work_dir or tempfile.mkdtemp(prefix="smartvisionqa_"))
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self._counter = 0
+
+    def output_path(self, suffix: str = ".png") -> Path:
+        self._counter += 1
+        return self.work_dir / f"prepared_{os.getpid()}_{self._counter}{suffix}"
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    @contextmanager
+    def _shared(self, *images: Union[bytes, Path]):
+        """Fuentes para un worker: los bytes en memoria se comparten mediante
+        shared_memory (y se liberan al salir); las rutas se pasan tal cual."""
+        blocks = []
+        try:
+            sources = []
+            for image in images:
+                if isinstance(image, (bytes, bytearray, memoryview)):
+                    block = shared_memory.SharedMemory(create=True, size=max(1, len(image)))
+                    block.buf[:len(image)] = image
+                    blocks.append(block)
+                    sources.append({"shm": block.name, "size": len(image)})
+                else:
+                    sources.append(str(image))
+            yield sources
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    async def prepare_comparison(self, image1: Union[bytes, Path], image2: Union[bytes, Path],
+                                 crop: bool = True, strategy: str = "stack", regions: Dict = None,
+                                 max_width: int = None) -> Dict:
+        """Pre-diff, recorte y composición en un worker"""
+        with self._shared(image1, image2) as sources:
+            return await self.run(prepare_comparison, sources[0], sources[1],
+                                  str(self.output_path()), crop, strategy, regions, max_width)
+
+    async def crop_components(self, image1: Union[bytes, Path], image2: Union[bytes, Path],
+                              boxes1: Dict[str, List[int]], boxes2: Dict[str, List[int]],
+                              masks: List = None) -> Dict[str, Dict]:
+        """Recorte y hash de componentes en un worker (ver crop_components)"""
+        with self._shared(image1, image2) as sources:
+            return await self.run(crop_components, sources[0], sources[1], boxes1, boxes2,
+                                  str(self.output_path(suffix="")), masks)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Límite de llamadas al modelo en vuelo por host de Ollama
+Un límite fijo (p. ej. el punto de saturación medido con
+scripts/load_test_inference.py) o un controlador AIMD que lo ajusta en línea:
+sube de forma aditiva mientras la latencia por token se mantiene cerca de la
+mejor observada y baja a la mitad ante errores o latencia disparada
+"""
+
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+
+DEFAULT_LIMITS_FILE = Path(".inference_limits.json")
+DEFAULT_MAX_LIMIT = 32
+
+# Una respuesta con una latencia por token mayor que LATENCY_TOLERANCE veces la
+# referencia se considera congestión
+LATENCY_TOLERANCE = 2.0
+# Cuánto se acerca la referencia a cada muestra más lenta (para adaptarse si el host empeora)
+BASELINE_DRIFT = 0.01
+
+
+def host_key(host: str = None) -> str:
+    """Identificador estable del endpoint (el mismo que resuelve el cliente de Ollama)"""
+    host = host or os.environ.get("OLLAMA_HOST") or "127.0.0.1:11434"
+    host = host.split("://", 1)[-1].rstrip("/")
+    return host.replace("localhost", "127.0.0.1")
+
+
+class AIMDLimiter:
+    """Semáforo con límite ajustable (aditivo al crecer, multiplicativo al bajar).
+
+    Con `adaptive=False` el límite se queda fijo en `initial`.
+    """
+
+    def __init__(self, initial: int = 1, min_limit: int = 1, max_limit: int = DEFAULT_MAX_LIMIT,
+                 adaptive: bool = True, increase: float = 1.0, backoff: float = 0.5,
+                 tolerance: float = LATENCY_TOLERANCE):
+        self.initial = initial
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.adaptive = adaptive
+        self.increase = increase
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self.completions = 0
+        self.decreases = 0
+        self.baseline: Optional[float] = None
+        self._window_end = 0
+        self._conditions: Dict[int, asyncio.Condition] = {}
+
+    def _condition(self) -> asyncio.Condition:
+        # Una condición por event loop: el mismo analizador puede usarse en varios asyncio.run()
+        loop = asyncio.get_running_loop()
+        condition = self._conditions.get(id(loop))
+        if condition is None:
+            condition = self._conditions[id(loop)] = asyncio.Condition()
+        return condition
+
+    @asynccontextmanager
+    async def slot(self):
+        """Espera a que haya hueco bajo el límite actual; devuelve los ms esperados"""
+        condition = self._condition()
+        start = time.perf_counter()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        try:
+            yield round((time.perf_counter() - start) * 1000, 1)
+        finally:
+            async with condition:
+                self.in_flight -= 1
+                condition.notify_all()
+
+    def on_success(self, latency_ms: float, tokens: int = None) -> None:
+        """Registra una llamada terminada. La latencia se normaliza por token para
+        que imágenes grandes y pequeñas sean comparables."""
+        self.completions += 1
+        if not self.adaptive:
+            return
+        cost = latency_ms / tokens if tokens else latency_ms
+        if self.baseline is None or cost < self.baseline:
+            self.baseline = cost
+        else:
+            self.baseline += (cost - self.baseline) * BASELINE_DRIFT
+        if cost > self.tolerance * self.baseline:
+            self._decrease()
+        else:
+            # +increase por cada `limit` llamadas correctas (una "ventana")
+            self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+    def on_failure(self) -> None:
+        self.completions += 1
+        if self.adaptive:
+            self._decrease()
+
+    def _decrease(self) -> None:
+        # Una sola reducción por ventana: las llamadas que ya estaban en vuelo
+        # cuando se detectó la congestión no vuelven a reducir
+        if self.completions < self._window_end:
+            return
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self.decreases += 1
+        self._window_end = self.completions + self.in_flight + 1
+
+    def stats(self) -> Dict:
+        return {"limit": int(self.limit), "in_flight": self.in_flight, "adaptive": self.adaptive,
+                "completions": self.completions, "decreases": self.decreases}
+
+
+_LIMITERS: Dict[str, AIMDLimiter] = {}
+
+
+def limiter_for_host(host: str = None, initial: int = 1, adaptive: bool = True,
+                     max_limit: int = DEFAULT_MAX_LIMIT) -> AIMDLimiter:
+    """Limitador compartido por todos los analizadores del proceso que usan el mismo host.
+    Pedirlo para ese host con otra configuración es un error: el límite es uno solo."""
+    key = host_key(host)
+    limiter = _LIMITERS.get(key)
+    if limiter is None:
+        limiter = _LIMITERS[key] = AIMDLimiter(initial=initial, adaptive=adaptive, max_limit=max_limit)
+    elif (limiter.initial, limiter.adaptive, limiter.max_limit) != (initial, adaptive, max_limit):
+        raise ValueError(f"El host {key} ya tiene un limitador con initial={limiter.initial}, "
+                         f"adaptive={limiter.adaptive}, max_limit={limiter.max_limit}")
+    return limiter
+
+
+# Mediciones del harness de carga: {host: {modelo: {"knee": n, "measured_at": ..., "levels": [...]}}}
+
+def load_measurements(path: Path = DEFAULT_LIMITS_FILE) -> Dict:
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def measured_limit(path: Path, host: str, model: str) -> Optional[int]:
+    """Punto de saturación medido para `host` y `model`, si existe"""
+    entry = load_measurements(path).get(host_key(host), {}).get(model)
+    return entry.get("knee") if entry else None
+
+
+def record_measurement(path: Path, host: str, model: str, measurement: Dict) -> None:
+    path = Path(path)
+    data = load_measurements(path)
+    data.setdefault(host_key(host), {})[model] = {**measurement, "measured_at": time.time()}
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Perfiles de inferencia para Ollama
+Agrupan las opciones que más influyen en la latencia (contexto, hilos, tokens
+generados, temperatura) y la resolución de las imágenes enviadas, para no
+depender de los valores por defecto del servidor. Ver
+scripts/benchmark_profiles.py para medirlos sobre las páginas de demo
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from inference_limits import host_key
+
+
+# num_thread = AUTO_THREADS usa los núcleos de esta máquina si el host de Ollama es
+# local; con un host remoto se deja el valor del servidor
+AUTO_THREADS = -1
+_LOCAL_HOSTS = ("127.0.0.1", "0.0.0.0", "[::1]")
+
+
+@dataclass(frozen=True)
+class InferenceProfile:
+    """Opciones de generación y resolución máxima de imagen (None: valor del servidor)"""
+    name: str
+    description: str = ""
+    num_ctx: Optional[int] = None         # ventana de contexto; debe cubrir los tokens de imagen
+    num_thread: Optional[int] = None      # hilos de CPU del servidor (AUTO_THREADS: núcleos locales)
+    num_predict: Optional[int] = None     # tope de tokens generados
+    temperature: Optional[float] = None
+    max_image_width: Optional[int] = None  # ancho máximo (px) de cada captura, antes de componer
+
+    def options(self, host: str = None) -> Dict:
+        """Diccionario `options` de ollama.generate para este perfil"""
+        options = {"num_ctx": self.num_ctx, "num_predict": self.num_predict, "temperature": self.temperature}
+        if self.num_thread == AUTO_THREADS:
+            if _is_local(host):
+                options["num_thread"] = os.cpu_count()
+        else:
+            options["num_thread"] = self.num_thread
+        return {key: value for key, value in options.items() if value is not None}
+
+
+def _is_local(host: str = None) -> bool:
+    return host_key(host).rsplit(":", 1)[0] in _LOCAL_HOSTS
+
+
+PROFILES = {
+    profile.name: profile for profile in (
+        InferenceProfile("default", "Valores del servidor (comportamiento anterior)"),
+        InferenceProfile("fast-triage", "Respuesta corta y determinista para detectar si hay cambios",
+                         num_ctx=4096, num_thread=AUTO_THREADS, num_predict=256, temperature=0.0,
+                         max_image_width=1024),
+        InferenceProfile("thorough", "Imágenes completas y respuesta larga para reportes detallados",
+                         num_ctx=16384, num_predict=1024, temperature=0.1),
+        InferenceProfile("cpu-small", "Runners sin GPU: contexto e imágenes pequeños, todos los núcleos",
+                         num_ctx=2048, num_thread=AUTO_THREADS, num_predict=192, temperature=0.0,
+                         max_image_width=768),
+    )
+}
+
+
+def get_profile(name: str) -> InferenceProfile:
+    if name not in PROFILES:
+        raise ValueError(f"Perfil desconocido: {name} (opciones: {', '.join(PROFILES)})")
+    return PROFILES[name]
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Caché de red record-and-replay para capturas de URLs
+Graba las respuestas en un almacén direccionado por contenido y las sirve
+mediante interceptación de rutas de Playwright en capturas posteriores
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict
+
+
+# Cabeceras que dejan de ser válidas porque guardamos el cuerpo ya decodificado
+_DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+class NetworkCache:
+    """Almacén de respuestas HTTP direccionado por contenido"""
+
+    def __init__(self, cache_dir: Path = Path(".network_cache")):
+        self.cache_dir = Path(cache_dir)
+        self.blobs_dir = self.cache_dir / "blobs"
+        self.pages_dir = self.cache_dir / "pages"
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.pages_dir.mkdir(parents=True, exist_ok=True)
+
+    def _manifest_path(self, url: str) -> Path:
+        return self.pages_dir / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+    def has_recording(self, url: str) -> bool:
+        return self._manifest_path(url).exists()
+
+    def load_manifest(self, url: str) -> Dict:
+        path = self._manifest_path(url)
+        if not path.exists():
+            return {"url": url, "entries": {}}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest: Dict) -> None:
+        path = self._manifest_path(manifest["url"])
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def put_blob(self, body: bytes) -> str:
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self.blobs_dir / digest
+        if not blob_path.exists():
+            tmp_path = blob_path.with_suffix(".tmp")
+            tmp_path.write_bytes(body)
+            os.replace(tmp_path, blob_path)
+        return digest
+
+    def get_blob(self, digest: str) -> bytes:
+        return (self.blobs_dir / digest).read_bytes()
+
+    def session(self, url: str) -> "CacheSession":
+        """Crea una sesión de grabación/reproducción para una captura"""
+        return CacheSession(self, url)
+
+
+class CacheSession:
+    """Grabación y reproducción de la red de una captura concreta (ver RequestRouter)"""
+
+    def __init__(self, cache: NetworkCache, url: str):
+        self.cache = cache
+        self.manifest = cache.load_manifest(url)
+        self.mode = "replay" if self.manifest["entries"] else "record"
+        self.stats = {"mode": self.mode, "hits": 0, "misses": 0, "recorded": 0}
+        self._dirty = False
+
+    @staticmethod
+    def request_key(request) -> str:
+        return f"{request.method} {request.url}"
+
+    def lookup(self, request):
+        """Devuelve la entrada grabada para la petición o None"""
+        if request.method != "GET":
+            return None
+        entry = self.manifest["entries"].get(self.request_key(request))
+        if entry is not None:
+            self.stats["hits"] += 1
+        elif self.mode == "replay":
+            self.stats["misses"] += 1
+        return entry
+
+    async def fulfill_from_cache(self, route, entry: Dict) -> None:
+        await route.fulfill(
+            status=entry["status"],
+            headers=entry["headers"],
+            body=self.cache.get_blob(entry["body"])
+        )
+
+    def record(self, request, status: int, headers: Dict, body: bytes) -> Dict:
+        """Graba una respuesta real y devuelve las cabeceras a servir"""
+        headers = {k: v for k, v in headers.items() if k.lower() not in _DROPPED_HEADERS}
+        if request.method == "GET":
+            self.manifest["entries"][self.request_key(request)] = {
+                "status": status,
+                "headers": headers,
+                "body": self.cache.put_blob(body)
+            }
+            self.stats["recorded"] += 1
+            self._dirty = True
+        return headers
+
+    def save(self) -> None:
+        if self._dirty:
+            self.cache.save_manifest(self.manifest)
+            self._dirty = False
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Detección determinista de "página lista" para capturas con Playwright
+Sustituye las esperas fijas por señales reales del navegador
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+
+# Script ejecutado dentro de la página. Resuelve cuando:
+#   1. document.fonts.ready se ha cumplido
+#   2. todas las imágenes <img> han terminado de cargar (o fallado)
+#   3. no ha habido mutaciones del DOM ni layout shifts durante `stableMs`
+# Siempre resuelve antes de `timeoutMs` con el detalle de lo que se alcanzó.
+_READINESS_SCRIPT = """
+async ({stableMs, timeoutMs, waitFonts, waitImages}) => {
+    const start = performance.now();
+    const deadline = start + timeoutMs;
+    const remaining = () => Math.max(0, deadline - performance.now());
+    const withDeadline = (promise) => Promise.race([
+        promise.then(() => true),
+        new Promise(resolve => setTimeout(() => resolve(false), remaining())),
+    ]);
+    const result = {fonts: true, images: true, stable: true, pending_images: 0};
+
+    if (waitFonts && document.fonts) {
+        result.fonts = await withDeadline(document.fonts.ready);
+    }
+
+    if (waitImages) {
+        const pending = Array.from(document.images).filter(img => !img.complete);
+        result.pending_images = pending.length;
+        if (pending.length) {
+            result.images = await withDeadline(Promise.all(pending.map(img => new Promise(resolve => {
+                img.addEventListener('load', resolve, {once: true});
+                img.addEventListener('error', resolve, {once: true});
+            }))));
+        }
+    }
+
+    if (stableMs > 0) {
+        result.stable = await withDeadline(new Promise(resolve => {
+            let timer = setTimeout(done, stableMs);
+            const bump = () => { clearTimeout(timer); timer = setTimeout(done, stableMs); };
+            const mutations = new MutationObserver(bump);
+            mutations.observe(document.documentElement, {
+                subtree: true, childList: true, attributes: true, characterData: true
+            });
+            let shifts = null;
+            try {
+                shifts = new PerformanceObserver(bump);
+                shifts.observe({type: 'layout-shift', buffered: false});
+            } catch (e) {
+                shifts = null;
+            }
+            function done() {
+                mutations.disconnect();
+                if (shifts) shifts.disconnect();
+                resolve();
+            }
+        }));
+    }
+
+    result.elapsed_ms = Math.round(performance.now() - start);
+    return result;
+}
+"""
+
+
+@dataclass
+class ReadinessConfig:
+    """Configuración del motor de readiness"""
+    stable_ms: int = 300            # ventana sin mutaciones ni layout shifts
+    timeout_ms: int = 10000         # tope duro para toda la espera
+    wait_fonts: bool = True
+    wait_images: bool = True
+    selectors: List[str] = field(default_factory=list)  # selectores propios de la app
+
+
+async def wait_until_ready(page, config: ReadinessConfig = None) -> Dict:
+    """Espera a que la página esté lista para capturar, sin superar el tope duro.
+
+    Devuelve un diccionario con las señales alcanzadas y el tiempo empleado.
+    Nunca lanza por timeout: si se alcanza el tope se captura igualmente.
+    """
+    config = config or ReadinessConfig()
+    start = time.perf_counter()
+    deadline = start + config.timeout_ms / 1000
+    report = {"selectors": {}, "timed_out": False}
+
+    # Selectores específicos de la aplicación (p. ej. "#app[data-ready]")
+    # En Playwright timeout=0 desactiva el timeout: con el tope agotado no se espera
+    for selector in config.selectors:
+        remaining_ms = (deadline - time.perf_counter()) * 1000
+        if remaining_ms < 1:
+            report["selectors"][selector] = False
+            report["timed_out"] = True
+            continue
+        try:
+            await page.wait_for_selector(selector, state="visible", timeout=remaining_ms)
+            report["selectors"][selector] = True
+        except Exception:
+            report["selectors"][selector] = False
+            report["timed_out"] = True
+
+    remaining_ms = (deadline - time.perf_counter()) * 1000
+    if remaining_ms < 1:
+        report["timed_out"] = True
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000)
+        return report
+    try:
+        signals = await asyncio.wait_for(
+            page.evaluate(_READINESS_SCRIPT, {
+                "stableMs": config.stable_ms,
+                "timeoutMs": remaining_ms,
+                "waitFonts": config.wait_fonts,
+                "waitImages": config.wait_images,
+            }),
+            timeout=remaining_ms / 1000 + 1,
+        )
+        report.update(signals)
+        if not (signals["fonts"] and signals["images"] and signals["stable"]):
+            report["timed_out"] = True
+    except asyncio.TimeoutError:
+        report["timed_out"] = True
+
+    report["elapsed_ms"] = round((time.perf_counter() - start) * 1000)
+    return report
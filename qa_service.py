@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Servicio HTTP de comparaciones
+Mantiene un SmartVisionQA caliente (navegador arrancado y modelo cargado) detrás
+de una API local, para que varios pipelines de CI no paguen cada uno el
+arranque en frío. Las comparaciones entran en una cola con prioridad acotada,
+cada cliente tiene un límite de comparaciones en ejecución y /metrics expone
+el estado en formato de texto de Prometheus
+
+    POST   /comparisons                    {"v1", "v2"} o {"url1", "url2"}, "priority" opcional
+    GET    /comparisons/<id>               estado (y posición en la cola)
+    GET    /comparisons/<id>/events        estado en streaming (server-sent events)
+    DELETE /comparisons/<id>               cancelar una comparación aún en cola
+    GET    /results/<fichero>              artefactos (reportes JSON/HTML, capturas, previews)
+    GET    /metrics, GET /healthz
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import unquote, urlsplit
+
+from generate_html_report import report_stem
+
+
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_PER_CLIENT = 2
+# Comparaciones terminadas que se conservan para consultar su estado
+FINISHED_JOBS_KEPT = 1000
+# Intervalo de los comentarios keep-alive del stream de eventos
+EVENTS_HEARTBEAT_SECONDS = 15
+MAX_BODY_BYTES = 64 * 1024
+
+URL_SCHEMES = ("http", "https", "file")
+FINAL_STATUSES = ("ok", "skipped", "error", "cancelled")
+
+
+class ServiceError(Exception):
+    """Petición rechazada; `status` es el código HTTP de la respuesta"""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Job:
+    """Una comparación enviada al servicio: queued -> running -> ok | skipped | error | cancelled"""
+    id: str
+    spec: Dict
+    client: str
+    priority: int
+    seq: int
+    status: str = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    outcome: Optional[Dict] = None
+    artifacts: Dict = field(default_factory=dict)
+
+    def to_dict(self, position: int = None) -> Dict:
+        data = {"id": self.id, "status": self.status, "spec": self.spec, "client": self.client,
+                "priority": self.priority, "submitted_at": self.submitted_at,
+                "started_at": self.started_at, "finished_at": self.finished_at}
+        if position is not None:
+            data["position"] = position
+        if self.error:
+            data["error"] = self.error
+        if self.outcome:
+            data["differences"] = self.outcome.get("differences")
+            data["timings"] = self.outcome.get("timings")
+        if self.artifacts:
+            data["artifacts"] = self.artifacts
+        return data
+
+
+def validate_spec(payload: Dict, demo_dir: Path) -> Dict:
+    """Comparación de ficheros (relativos a `demo_dir`, sin salir de él) o de URLs http/https/file"""
+    if 'url1' in payload or 'url2' in payload:
+        spec = {"url1": payload.get('url1'), "url2": payload.get('url2')}
+        for url in spec.values():
+            if not isinstance(url, str) or urlsplit(url).scheme not in URL_SCHEMES:
+                raise ServiceError(HTTPStatus.BAD_REQUEST, f"URL inválida: {url!r} ({', '.join(URL_SCHEMES)})")
+        return spec
+    spec = {"v1": payload.get('v1'), "v2": payload.get('v2')}
+    base = Path(demo_dir).resolve()
+    for name in spec.values():
+        if not isinstance(name, str) or not name:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "Se esperaba {\"v1\", \"v2\"} o {\"url1\", \"url2\"}")
+        path = (base / name).resolve()
+        if base not in path.parents or not path.is_file():
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"Fichero no encontrado en {demo_dir}: {name}")
+    return spec
+
+
+class ComparisonService:
+    """Cola con prioridad y planificador sobre un SmartVisionQA compartido.
+
+    El estado de los trabajos se protege con un lock: lo leen los hilos del
+    servidor HTTP y lo actualizan los workers, que corren en el event loop del
+    servicio (el único que toca `qa`).
+    """
+
+    def __init__(self, qa, workers: int = 1, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 per_client: int = DEFAULT_PER_CLIENT):
+        self.qa = qa
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.per_client = per_client
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._pending: List[Job] = []
+        self._running: Dict[str, int] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)  # despierta a los streams de eventos
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.started_at = time.time()
+        self.warm_up_ms: Optional[float] = None
+        self.counters = {"submitted": 0, "rejected": 0, "cancelled": 0, "ok": 0, "skipped": 0, "error": 0}
+        self.wait_ms_total = 0.0
+        self.run_ms_total = 0.0
+
+    # --- API usada por los hilos HTTP ---
+
+    def submit(self, payload: Dict, client: str) -> Dict:
+        spec = validate_spec(payload, self.qa.demo_dir)
+        try:
+            priority = int(payload.get('priority', 0))
+        except (TypeError, ValueError):
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "priority debe ser un entero")
+        with self._lock:
+            if len(self._pending) >= self.queue_size:
+                self.counters["rejected"] += 1
+                raise ServiceError(HTTPStatus.TOO_MANY_REQUESTS, f"Cola llena ({self.queue_size} en espera)")
+            self._seq += 1
+            job = Job(id=uuid.uuid4().hex[:12], spec=spec, client=client, priority=priority, seq=self._seq)
+            self.jobs[job.id] = job
+            self._pending.append(job)
+            self.counters["submitted"] += 1
+            data = job.to_dict(self._position(job))
+        self._notify_workers()
+        return data
+
+    def status(self, job_id: str) -> Dict:
+        with self._lock:
+            job = self._get(job_id)
+            return job.to_dict(self._position(job))
+
+    def cancel(self, job_id: str) -> Dict:
+        with self._changed:
+            job = self._get(job_id)
+            if job.status != "queued":
+                raise ServiceError(HTTPStatus.CONFLICT, f"La comparación ya está {job.status}")
+            self._pending.remove(job)
+            self._finish(job, "cancelled")
+            self.counters["cancelled"] += 1
+            return job.to_dict()
+
+    def wait_for_change(self, job_id: str, last: Dict, timeout: float) -> Dict:
+        """Estado del trabajo en cuanto difiera de `last` (o el mismo tras `timeout`)"""
+        with self._changed:
+            job = self._get(job_id)
+            self._changed.wait_for(lambda: job.to_dict(self._position(job)) != last, timeout)
+            return job.to_dict(self._position(job))
+
+    def metrics(self) -> str:
+        """Métricas en formato de texto de Prometheus"""
+        with self._lock:
+            running = sum(self._running.values())
+            finished = self.counters["ok"] + self.counters["skipped"] + self.counters["error"]
+            lines = [
+                "# TYPE svqa_queue_depth gauge", f"svqa_queue_depth {len(self._pending)}",
+                f"svqa_queue_capacity {self.queue_size}",
+                "# TYPE svqa_jobs_running gauge", f"svqa_jobs_running {running}",
+                f"svqa_workers {self.workers}",
+                "# TYPE svqa_jobs_total counter",
+            ]
+            lines += [f'svqa_jobs_total{{status="{status}"}} {count}' for status, count in self.counters.items()
+                      if status not in ("submitted", "rejected")]
+            lines += ["# TYPE svqa_submitted_total counter", f"svqa_submitted_total {self.counters['submitted']}",
+                      "# TYPE svqa_rejected_total counter", f"svqa_rejected_total {self.counters['rejected']}"]
+            lines += [
+                "# TYPE svqa_job_wait_ms summary",
+                f"svqa_job_wait_ms_sum {self.wait_ms_total:.1f}", f"svqa_job_wait_ms_count {running + finished}",
+                "# TYPE svqa_job_run_ms summary",
+                f"svqa_job_run_ms_sum {self.run_ms_total:.1f}", f"svqa_job_run_ms_count {finished}",
+            ]
+            clients = {job.client for job in self._pending} | set(self._running)
+            for client in sorted(clients):
+                label = client.replace("\\", "\\\\").replace('"', '\\"')
+                queued = sum(1 for job in self._pending if job.client == client)
+                lines.append(f'svqa_client_jobs{{client="{label}",state="queued"}} {queued}')
+                lines.append(f'svqa_client_jobs{{client="{label}",state="running"}} {self._running.get(client, 0)}')
+        lines.append("# TYPE svqa_single_flight_total counter")
+        for kind, counts in self.qa.single_flight_stats().items():
+            lines += [f'svqa_single_flight_total{{kind="{kind}",result="{result}"}} {n}' for result, n in counts.items()]
+        limiter = self.qa.analyzer.limiter
+        if limiter:
+            stats = limiter.stats()
+            lines += [f"svqa_model_in_flight {stats['in_flight']}", f"svqa_model_in_flight_limit {stats['limit']}"]
+        if self.warm_up_ms is not None:
+            lines.append(f"svqa_model_warm_up_ms {self.warm_up_ms:.1f}")
+        lines.append(f"svqa_uptime_seconds {time.time() - self.started_at:.0f}")
+        return "\n".join(lines) + "\n"
+
+    # --- Planificación (event loop del servicio) ---
+
+    def _get(self, job_id: str) -> Job:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"Comparación desconocida: {job_id}")
+        return job
+
+    @staticmethod
+    def _order(job: Job):
+        # Mayor prioridad primero; a igual prioridad, por orden de llegada
+        return (-job.priority, job.seq)
+
+    def _position(self, job: Job) -> Optional[int]:
+        if job.status != "queued":
+            return None
+        return sum(1 for other in self._pending if self._order(other) < self._order(job))
+
+    def _notify_workers(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _next_job(self) -> Optional[Job]:
+        """Trabajo más prioritario de un cliente por debajo de su límite"""
+        with self._changed:
+            eligible = [job for job in self._pending if self._running.get(job.client, 0) < self.per_client]
+            if not eligible:
+                return None
+            job = min(eligible, key=self._order)
+            self._pending.remove(job)
+            self._running[job.client] = self._running.get(job.client, 0) + 1
+            job.status = "running"
+            job.started_at = time.time()
+            self.wait_ms_total += (job.started_at - job.submitted_at) * 1000
+            self._changed.notify_all()
+            return job
+
+    def _finish(self, job: Job, status: str) -> None:
+        # Llamado con el lock tomado
+        job.status = status
+        job.finished_at = time.time()
+        self._changed.notify_all()
+        finished = [key for key, other in self.jobs.items() if other.status in FINAL_STATUSES]
+        for key in finished[:max(0, len(finished) - FINISHED_JOBS_KEPT)]:
+            del self.jobs[key]
+
+    def _artifacts(self, outcome: Dict) -> Dict:
+        stem = report_stem(outcome['file1'], outcome['file2'])
+        artifacts = {"json": f"/results/comparison_{stem}.json", "html": f"/results/visual_report_{stem}.html"}
+        artifacts["screenshots"] = [f"/results/{name}" for name in outcome.get('screenshots', [])]
+        return artifacts
+
+    async def _worker(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            print(f"[servicio] {job.id} ({job.client}, prioridad {job.priority}): "
+                  f"{' vs '.join(str(value) for value in job.spec.values())}")
+            outcome = await self.qa.run_spec(job.spec)
+            with self._changed:
+                self._running[job.client] -= 1
+                if not self._running[job.client]:
+                    del self._running[job.client]
+                job.outcome = outcome if outcome['status'] == 'ok' else None
+                job.error = outcome.get('error')
+                if outcome['status'] == 'ok':
+                    job.artifacts = self._artifacts(outcome)
+                self.counters[outcome['status']] += 1
+                self.run_ms_total += (time.time() - job.started_at) * 1000
+                self._finish(job, outcome['status'])
+            # Un hueco liberado puede desbloquear trabajos de este cliente
+            self._wakeup.set()
+
+    async def run(self, server: ThreadingHTTPServer, warm_up: bool = True) -> None:
+        """Calienta navegador y modelo, atiende peticiones y ejecuta la cola hasta cancelarse"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await self.qa.renderer.start()
+        try:
+            if warm_up:
+                try:
+                    print(f"Cargando {self.qa.analyzer.model}...")
+                    self.warm_up_ms = await asyncio.to_thread(self.qa.analyzer.warm_up)
+                    print(f"Modelo listo en {self.warm_up_ms / 1000:.1f} s")
+                except Exception as e:
+                    print(f"No se pudo precargar el modelo: {e}")
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            host, port = server.server_address[:2]
+            print(f"[servicio] Escuchando en http://{host}:{port} ({self.workers} workers, "
+                  f"cola de {self.queue_size}, {self.per_client} por cliente)")
+            try:
+                await asyncio.gather(*(self._worker() for _ in range(self.workers)))
+            finally:
+                server.shutdown()
+        finally:
+            await self.qa.renderer.close()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """Traduce la API HTTP a ComparisonService; los artefactos se sirven desde results_dir"""
+    server_version = "SmartVisionQA"
+
+    @property
+    def service(self) -> ComparisonService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        pass  # el servicio ya imprime cada comparación
+
+    def _client(self) -> str:
+        # Los pipelines se identifican con X-Client-Id; si no, cuenta la dirección de origen
+        return (self.headers.get("X-Client-Id") or self.client_address[0])[:64]
+
+    def _send(self, status: HTTPStatus, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, status: HTTPStatus, data: Dict) -> None:
+        self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'), "application/json; charset=utf-8")
+
+    def _route(self, method: str) -> None:
+        parts = [unquote(part) for part in urlsplit(self.path).path.strip("/").split("/") if part]
+        try:
+            if method == "POST" and parts == ["comparisons"]:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY_BYTES:
+                    raise ServiceError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Cuerpo demasiado grande")
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    raise ServiceError(HTTPStatus.BAD_REQUEST, "El cuerpo debe ser JSON")
+                if not isinstance(payload, dict):
+                    raise ServiceError(HTTPStatus.BAD_REQUEST, "El cuerpo debe ser un objeto JSON")
+                self._json(HTTPStatus.ACCEPTED, self.service.submit(payload, self._client()))
+            elif method == "GET" and len(parts) == 2 and parts[0] == "comparisons":
+                self._json(HTTPStatus.OK, self.service.status(parts[1]))
+            elif method == "DELETE" and len(parts) == 2 and parts[0] == "comparisons":
+                self._json(HTTPStatus.OK, self.service.cancel(parts[1]))
+            elif method == "GET" and len(parts) == 3 and parts[0] == "comparisons" and parts[2] == "events":
+                self._events(parts[1])
+            elif method == "GET" and parts[:1] == ["results"] and len(parts) > 1:
+                self._artifact(parts[1:])
+            elif method == "GET" and parts == ["metrics"]:
+                self._send(HTTPStatus.OK, self.service.metrics().encode('utf-8'), "text/plain; version=0.0.4")
+            elif method == "GET" and parts == ["healthz"]:
+                self._json(HTTPStatus.OK, {"status": "ok"})
+            else:
+                raise ServiceError(HTTPStatus.NOT_FOUND, f"Ruta desconocida: {method} {self.path}")
+        except ServiceError as e:
+            self._json(e.status, {"error": str(e)})
+
+    def _events(self, job_id: str) -> None:
+        """Server-sent events: un evento `status` por cambio, hasta un estado final"""
+        data = self.service.status(job_id)
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                self.wfile.write(f"event: status\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                if data['status'] in FINAL_STATUSES:
+                    return
+                current = self.service.wait_for_change(job_id, data, EVENTS_HEARTBEAT_SECONDS)
+                if current == data:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                data = current
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except ServiceError:
+            pass  # el trabajo se descartó de la memoria durante el stream
+
+    def _artifact(self, parts: List[str]) -> None:
+        base = self.service.qa.results_dir.resolve()
+        path = base.joinpath(*parts).resolve()
+        if base not in path.parents or not path.is_file() or any(part.startswith(".") for part in parts):
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"Artefacto no encontrado: {'/'.join(parts)}")
+        content_type = {".json": "application/json", ".html": "text/html; charset=utf-8", ".png": "image/png",
+                        ".webp": "image/webp", ".css": "text/css", ".js": "text/javascript"}
+        self._send(HTTPStatus.OK, path.read_bytes(),
+                   content_type.get(path.suffix.lower(), "application/octet-stream"))
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+
+def create_server(service: ComparisonService, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(qa, host: str = "127.0.0.1", port: int = DEFAULT_PORT, workers: int = 1,
+          queue_size: int = DEFAULT_QUEUE_SIZE, per_client: int = DEFAULT_PER_CLIENT) -> None:
+    """Arranca el servicio en primer plano hasta Ctrl+C"""
+    service = ComparisonService(qa, workers=workers, queue_size=queue_size, per_client=per_client)
+    server = create_server(service, host, port)
+    try:
+        asyncio.run(service.run(server))
+    except KeyboardInterrupt:
+        print("\n[servicio] Fin")
+    finally:
+        server.server_close()
@@ -0,0 +1,1034 @@
+#!/usr/bin/env python3
+"""
+Plantillas precompiladas para los reportes HTML de SmartVisionQA
+Las plantillas se compilan una vez por proceso y el CSS se escribe una sola
+vez como asset compartido en results/assets
+"""
+
+import os
+from pathlib import Path
+from string import Template
+from typing import Dict
+
+
+ASSETS_DIRNAME = "assets"
+
+REPORT_CSS = """\
+* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+
+body {
+    font-family: 'Segoe UI', system-ui, sans-serif;
+    background: #f8fafc;
+    padding: 20px;
+    line-height: 1.6;
+}
+
+.container {
+    max-width: 1400px;
+    margin: 0 auto;
+}
+
+.header {
+    background: white;
+    border-radius: 12px;
+    padding: 30px;
+    margin-bottom: 30px;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.05);
+}
+
+.header h1 {
+    color: #1e293b;
+    font-size: 2.5rem;
+    margin-bottom: 10px;
+}
+
+.comparison-info {
+    color: #64748b;
+    font-size: 1.1rem;
+}
+
+.comparison-grid {
+    display: grid;
+    grid-template-columns: 1fr 1fr;
+    gap: 20px;
+    margin-bottom: 30px;
+}
+
+.screenshot-panel {
+    background: white;
+    border-radius: 12px;
+    padding: 20px;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.05);
+}
+
+.screenshot-panel h3 {
+    color: #1e293b;
+    margin-bottom: 15px;
+    font-size: 1.3rem;
+}
+
+.screenshot-panel img {
+    width: 100%;
+    height: auto;
+    border-radius: 8px;
+    border: 1px solid #e2e8f0;
+}
+
+.screenshot-panel .zoomable {
+    display: block;
+    cursor: zoom-in;
+}
+
+.zoom-hint {
+    color: #64748b;
+    font-size: 0.85rem;
+    margin-top: 8px;
+}
+
+/* Visor de teselas a resolución completa */
+.tile-viewer {
+    position: fixed;
+    inset: 0;
+    background: rgba(15, 23, 42, 0.92);
+    display: flex;
+    flex-direction: column;
+    z-index: 1000;
+}
+
+.tile-viewer-toolbar {
+    display: flex;
+    gap: 10px;
+    align-items: center;
+    padding: 12px 20px;
+    color: white;
+}
+
+.tile-viewer-toolbar button {
+    padding: 6px 14px;
+    border: none;
+    border-radius: 6px;
+    background: #e2e8f0;
+    color: #1e293b;
+    font-weight: 600;
+    cursor: pointer;
+}
+
+.tile-viewer-toolbar .level-label {
+    flex: 1;
+    font-size: 0.9rem;
+}
+
+.tile-viewer-scroll {
+    flex: 1;
+    overflow: auto;
+    padding: 0 20px 20px;
+}
+
+.tile-grid {
+    display: grid;
+    margin: 0 auto;
+    line-height: 0;
+}
+
+.tile-grid img {
+    display: block;
+    border: none;
+    border-radius: 0;
+}
+
+.analysis-section {
+    background: white;
+    border-radius: 12px;
+    padding: 30px;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.05);
+}
+
+.analysis-section h2 {
+    color: #1e293b;
+    margin-bottom: 25px;
+    font-size: 1.8rem;
+}
+
+.change-category {
+    margin-bottom: 25px;
+    padding: 20px;
+    border-radius: 8px;
+    border-left: 4px solid #e2e8f0;
+}
+
+.change-category.layout {
+    background: #fef3f2;
+    border-color: #ef4444;
+}
+
+.change-category.text {
+    background: #fff7ed;
+    border-color: #f97316;
+}
+
+.change-category.style {
+    background: #f0f9ff;
+    border-color: #3b82f6;
+}
+
+.change-category.element {
+    background: #f0fdf4;
+    border-color: #22c55e;
+}
+
+.change-category h3 {
+    color: #1e293b;
+    margin-bottom: 10px;
+    font-size: 1.2rem;
+}
+
+.change-list {
+    list-style: none;
+}
+
+.change-list li {
+    padding: 8px 0;
+    border-bottom: 1px solid rgba(0,0,0,0.05);
+}
+
+.change-list li:last-child {
+    border-bottom: none;
+}
+
+.raw-analysis {
+    background: #f8fafc;
+    border-radius: 8px;
+    padding: 20px;
+    margin-top: 20px;
+    font-family: 'Courier New', monospace;
+    white-space: pre-wrap;
+    border: 1px solid #e2e8f0;
+}
+
+.timestamp {
+    text-align: center;
+    color: #64748b;
+    margin-top: 30px;
+    font-size: 0.9rem;
+}
+
+.no-changes {
+    text-align: center;
+    color: #22c55e;
+    font-size: 1.1rem;
+    padding: 20px;
+    background: #f0fdf4;
+    border-radius: 8px;
+    border: 1px solid #22c55e;
+}
+
+/* Dashboard Styles */
+.dashboard {
+    background: white;
+    border-radius: 12px;
+    padding: 30px;
+    margin-bottom: 20px;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.05);
+}
+
+.dashboard-header {
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    margin-bottom: 25px;
+    border-bottom: 2px solid #f1f5f9;
+    padding-bottom: 15px;
+}
+
+.dashboard-header h3 {
+    color: #1e293b;
+    font-size: 1.5rem;
+    margin: 0;
+}
+
+.severity-badge {
+    padding: 8px 16px;
+    border-radius: 20px;
+    font-weight: 600;
+    font-size: 0.9rem;
+}
+
+.severity-badge.low {
+    background: #dcfce7;
+    color: #166534;
+}
+
+.severity-badge.medium {
+    background: #fef3c7;
+    color: #92400e;
+}
+
+.severity-badge.high {
+    background: #fecaca;
+    color: #991b1b;
+}
+
+.metrics-grid {
+    display: grid;
+    grid-template-columns: repeat(auto-fit, minmax(150px, 1fr));
+    gap: 20px;
+    margin-bottom: 30px;
+}
+
+.metric-card {
+    text-align: center;
+    padding: 20px;
+    background: #f8fafc;
+    border-radius: 8px;
+    border: 1px solid #e2e8f0;
+}
+
+.metric-number {
+    font-size: 2rem;
+    font-weight: bold;
+    color: #3b82f6;
+    margin-bottom: 5px;
+}
+
+.metric-label {
+    color: #64748b;
+    font-size: 0.9rem;
+    font-weight: 500;
+}
+
+.distribution-chart {
+    margin-bottom: 30px;
+}
+
+.distribution-chart h4 {
+    color: #1e293b;
+    margin-bottom: 15px;
+    font-size: 1.2rem;
+}
+
+.chart-container {
+    background: #f8fafc;
+    border-radius: 8px;
+    padding: 20px;
+}
+
+.chart-item {
+    display: flex;
+    align-items: center;
+    margin-bottom: 12px;
+}
+
+.chart-bar {
+    height: 20px;
+    border-radius: 10px;
+    margin-right: 15px;
+    min-width: 20px;
+    transition: width 0.3s ease;
+}
+
+.chart-label {
+    color: #374151;
+    font-size: 0.9rem;
+    font-weight: 500;
+}
+
+.changes-grid {
+    display: grid;
+    grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
+    gap: 20px;
+}
+
+.change-card {
+    background: #f8fafc;
+    border-radius: 8px;
+    padding: 20px;
+    border-left: 4px solid #e2e8f0;
+    transition: transform 0.2s;
+}
+
+.change-card:hover {
+    transform: translateY(-2px);
+}
+
+.change-card.layout {
+    border-left-color: #ef4444;
+}
+
+.change-card.text {
+    border-left-color: #f97316;
+}
+
+.change-card.style {
+    border-left-color: #3b82f6;
+}
+
+.change-card.element {
+    border-left-color: #22c55e;
+}
+
+.card-header {
+    display: flex;
+    align-items: center;
+    justify-content: space-between;
+    margin-bottom: 15px;
+}
+
+.card-header h4 {
+    color: #1e293b;
+    margin: 0;
+    font-size: 1.1rem;
+}
+
+.card-icon {
+    font-size: 1.2rem;
+    margin-right: 10px;
+}
+
+.change-count {
+    background: #e2e8f0;
+    color: #475569;
+    padding: 4px 8px;
+    border-radius: 12px;
+    font-size: 0.8rem;
+    font-weight: 600;
+}
+
+.card-progress {
+    display: flex;
+    align-items: center;
+    gap: 10px;
+}
+
+.progress-bar {
+    flex: 1;
+    height: 8px;
+    background: #e2e8f0;
+    border-radius: 4px;
+    overflow: hidden;
+}
+
+.progress-fill {
+    height: 100%;
+    border-radius: 4px;
+    transition: width 0.3s ease;
+}
+
+.progress-fill.layout {
+    background: #ef4444;
+}
+
+.progress-fill.text {
+    background: #f97316;
+}
+
+.progress-fill.style {
+    background: #3b82f6;
+}
+
+.progress-fill.element {
+    background: #22c55e;
+}
+
+.percentage {
+    color: #64748b;
+    font-size: 0.9rem;
+    font-weight: 600;
+    min-width: 50px;
+}
+
+.status-card {
+    display: flex;
+    align-items: center;
+    padding: 25px;
+    border-radius: 12px;
+    border: 2px solid #e2e8f0;
+}
+
+.status-card.success {
+    background: #f0fdf4;
+    border-color: #22c55e;
+}
+
+.status-icon {
+    font-size: 2rem;
+    margin-right: 20px;
+}
+
+.status-content h4 {
+    color: #1e293b;
+    margin-bottom: 5px;
+    font-size: 1.3rem;
+}
+
+.status-content p {
+    color: #64748b;
+    margin: 0;
+}
+
+.detailed-analysis {
+    margin-top: 30px;
+}
+
+.detailed-analysis details {
+    background: #f8fafc;
+    border-radius: 8px;
+    border: 1px solid #e2e8f0;
+}
+
+.detailed-analysis summary {
+    padding: 15px 20px;
+    cursor: pointer;
+    font-weight: 600;
+    color: #374151;
+    border-radius: 8px;
+    transition: background 0.2s;
+}
+
+.detailed-analysis summary:hover {
+    background: #e2e8f0;
+}
+
+.detailed-analysis .raw-analysis {
+    margin: 0;
+    border-top: 1px solid #e2e8f0;
+    border-radius: 0 0 8px 8px;
+}
+"""
+
+# Visor bajo demanda: las teselas de resolución completa solo se piden al abrirlo,
+# y con loading="lazy" solo se descargan las que entran en pantalla
+REPORT_JS = """\
+(function () {
+    function openViewer(link) {
+        var pyramid = JSON.parse(link.dataset.pyramid);
+        var tilesDir = link.dataset.tiles;
+        var levels = pyramid.levels;
+        var level = 0;
+        // Empezar por el nivel más detallado que cabe en el ancho de la ventana
+        while (level < levels.length - 1 && levels[level].width > window.innerWidth - 40) {
+            level++;
+        }
+
+        var viewer = document.createElement('div');
+        viewer.className = 'tile-viewer';
+        viewer.innerHTML =
+            '<div class="tile-viewer-toolbar">' +
+            '<button data-action="in">+</button>' +
+            '<button data-action="out">&minus;</button>' +
+            '<span class="level-label"></span>' +
+            '<a href="' + link.getAttribute('href') + '" target="_blank"><button>PNG</button></a>' +
+            '<button data-action="close">&times;</button>' +
+            '</div><div class="tile-viewer-scroll"></div>';
+        var scroll = viewer.querySelector('.tile-viewer-scroll');
+        var label = viewer.querySelector('.level-label');
+
+        function render() {
+            var info = levels[level];
+            var grid = document.createElement('div');
+            grid.className = 'tile-grid';
+            grid.style.width = info.width + 'px';
+            grid.style.gridTemplateColumns = 'repeat(' + info.cols + ', auto)';
+            for (var row = 0; row < info.rows; row++) {
+                for (var col = 0; col < info.cols; col++) {
+                    var tile = document.createElement('img');
+                    tile.loading = 'lazy';
+                    tile.width = Math.min(pyramid.tile_size, info.width - col * pyramid.tile_size);
+                    tile.height = Math.min(pyramid.tile_size, info.height - row * pyramid.tile_size);
+                    tile.src = tilesDir + '/' + level + '/' + col + '_' + row + '.webp';
+                    grid.appendChild(tile);
+                }
+            }
+            scroll.replaceChildren(grid);
+            label.textContent = info.width + ' \u00d7 ' + info.height + ' px';
+        }
+
+        function close() {
+            viewer.remove();
+            document.removeEventListener('keydown', onKey);
+        }
+
+        function onKey(event) {
+            if (event.key === 'Escape') close();
+        }
+
+        viewer.addEventListener('click', function (event) {
+            var action = event.target.dataset.action;
+            if (action === 'in' && level > 0) { level--; render(); }
+            if (action === 'out' && level < levels.length - 1) { level++; render(); }
+            if (action === 'close') close();
+        });
+        document.addEventListener('keydown', onKey);
+        document.body.appendChild(viewer);
+        render();
+    }
+
+    document.addEventListener('click', function (event) {
+        var link = event.target.closest('a.zoomable');
+        if (!link || !link.dataset.pyramid) return;
+        event.preventDefault();
+        openViewer(link);
+    });
+})();
+"""
+
+INDEX_CSS = """\
+* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+
+body {
+    font-family: 'Segoe UI', system-ui, sans-serif;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    min-height: 100vh;
+    padding: 40px;
+}
+
+.container {
+    max-width: 1200px;
+    margin: 0 auto;
+}
+
+.header {
+    background: white;
+    border-radius: 20px;
+    padding: 30px;
+    box-shadow: 0 20px 40px rgba(0,0,0,0.1);
+    margin-bottom: 30px;
+    text-align: center;
+}
+
+.header h1 {
+    color: #333;
+    font-size: 2.5rem;
+    margin-bottom: 10px;
+}
+
+.subtitle {
+    color: #666;
+    font-size: 1.1rem;
+}
+
+.stats {
+    display: grid;
+    grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+    gap: 20px;
+    margin-bottom: 30px;
+}
+
+.stat-card {
+    background: white;
+    border-radius: 15px;
+    padding: 25px;
+    text-align: center;
+    box-shadow: 0 10px 25px rgba(0,0,0,0.1);
+}
+
+.stat-number {
+    font-size: 2rem;
+    font-weight: bold;
+    color: #667eea;
+    margin-bottom: 5px;
+}
+
+.stat-label {
+    color: #666;
+    font-size: 0.9rem;
+}
+
+.reports-grid {
+    display: grid;
+    grid-template-columns: repeat(auto-fit, minmax(400px, 1fr));
+    gap: 20px;
+}
+
+.report-card {
+    background: white;
+    border-radius: 15px;
+    padding: 25px;
+    box-shadow: 0 10px 25px rgba(0,0,0,0.1);
+    transition: transform 0.3s;
+}
+
+.report-card:hover {
+    transform: translateY(-5px);
+}
+
+.report-header {
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    margin-bottom: 15px;
+}
+
+.comparison-title {
+    font-size: 1.1rem;
+    font-weight: 600;
+    color: #333;
+}
+
+.changes-badge {
+    background: #667eea;
+    color: white;
+    padding: 4px 12px;
+    border-radius: 20px;
+    font-size: 0.8rem;
+    font-weight: 600;
+    white-space: nowrap;
+}
+
+.changes-badge.no-changes, .changes-badge.none {
+    background: #22c55e;
+}
+
+.changes-badge.medium {
+    background: #f97316;
+}
+
+.changes-badge.high {
+    background: #ef4444;
+}
+
+.comparison-files {
+    color: #666;
+    font-size: 0.9rem;
+    margin-bottom: 20px;
+    line-height: 1.4;
+}
+
+.actions {
+    display: flex;
+    gap: 10px;
+}
+
+.btn {
+    padding: 8px 16px;
+    border: none;
+    border-radius: 8px;
+    text-decoration: none;
+    font-size: 0.9rem;
+    font-weight: 600;
+    transition: background 0.3s;
+    cursor: pointer;
+}
+
+.btn-primary {
+    background: #667eea;
+    color: white;
+}
+
+.btn-primary:hover {
+    background: #5a6fd8;
+}
+
+.btn-secondary {
+    background: #f1f5f9;
+    color: #64748b;
+}
+
+.btn-secondary:hover {
+    background: #e2e8f0;
+}
+
+.timestamp {
+    color: #94a3b8;
+    font-size: 0.8rem;
+    margin-top: 15px;
+}
+
+.no-reports {
+    text-align: center;
+    background: white;
+    border-radius: 15px;
+    padding: 60px;
+    color: #666;
+}
+
+.pagination {
+    display: flex;
+    flex-wrap: wrap;
+    justify-content: center;
+    gap: 6px;
+    margin: 25px 0;
+}
+
+.pagination a, .pagination span {
+    background: white;
+    color: #667eea;
+    border-radius: 8px;
+    padding: 6px 12px;
+    text-decoration: none;
+    font-weight: 600;
+}
+
+.pagination .current {
+    background: #667eea;
+    color: white;
+}
+
+.index-app {
+    background: white;
+    border-radius: 15px;
+    padding: 20px;
+    box-shadow: 0 10px 25px rgba(0,0,0,0.1);
+}
+
+.index-toolbar {
+    display: flex;
+    flex-wrap: wrap;
+    gap: 10px;
+    align-items: center;
+    margin-bottom: 15px;
+}
+
+.index-toolbar input, .index-toolbar select {
+    padding: 8px 12px;
+    border: 1px solid #e2e8f0;
+    border-radius: 8px;
+    font-size: 0.9rem;
+}
+
+.index-toolbar input {
+    flex: 1;
+    min-width: 200px;
+}
+
+.vlist-count {
+    color: #94a3b8;
+    font-size: 0.9rem;
+}
+
+.vlist {
+    position: relative;
+    height: 70vh;
+    overflow-y: auto;
+}
+
+.vlist-items {
+    position: absolute;
+    top: 0;
+    left: 0;
+    right: 0;
+}
+
+.vlist-row {
+    display: flex;
+    align-items: center;
+    gap: 12px;
+    height: 56px;
+    padding: 0 10px;
+    border-bottom: 1px solid #f1f5f9;
+}
+
+.vlist-row .files {
+    flex: 1;
+    overflow: hidden;
+    white-space: nowrap;
+    text-overflow: ellipsis;
+    color: #333;
+}
+
+.vlist-row .date {
+    color: #94a3b8;
+    font-size: 0.8rem;
+}
+
+.github-info {
+    background: rgba(255, 255, 255, 0.1);
+    border-radius: 15px;
+    padding: 20px;
+    margin-top: 30px;
+    text-align: center;
+    color: white;
+}
+
+.github-info a {
+    color: white;
+    text-decoration: none;
+    font-weight: 600;
+}
+"""
+
+# Índice con JavaScript: lista virtual sobre index.json con filtro y orden. Sin
+# JavaScript, o abierto como file:// (donde fetch falla), quedan las páginas estáticas
+INDEX_JS = """\
+(function () {
+    var ROW_HEIGHT = 56;
+    var OVERSCAN = 10;
+    var app = document.getElementById('index-app');
+    if (!app || !window.fetch) return;
+
+    fetch(app.dataset.manifest)
+        .then(function (response) {
+            if (!response.ok) throw new Error(response.status);
+            return response.json();
+        })
+        .then(start)
+        .catch(function () { /* se quedan las páginas estáticas */ });
+
+    function escapeHtml(text) {
+        return String(text).replace(/[&<>"']/g, function (c) {
+            return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+        });
+    }
+
+    function start(manifest) {
+        var col = {};
+        manifest.columns.forEach(function (name, i) { col[name] = i; });
+        var rows = manifest.rows;
+        var view = rows;
+        var search = app.querySelector('[name=q]');
+        var severity = app.querySelector('[name=severity]');
+        var sort = app.querySelector('[name=sort]');
+        var scroller = app.querySelector('.vlist');
+        var spacer = app.querySelector('.vlist-spacer');
+        var items = app.querySelector('.vlist-items');
+        var count = app.querySelector('.vlist-count');
+        var comparators = {
+            recent: function (a, b) { return b[col.updated_at] - a[col.updated_at]; },
+            changes: function (a, b) {
+                return b[col.total_changes] - a[col.total_changes] || b[col.updated_at] - a[col.updated_at];
+            },
+            name: function (a, b) {
+                return (a[col.file1] + ' ' + a[col.file2]).localeCompare(b[col.file1] + ' ' + b[col.file2]);
+            }
+        };
+
+        function rowHtml(row) {
+            var changes = row[col.total_changes];
+            var date = new Date(row[col.updated_at] * 1000).toISOString().slice(0, 16).replace('T', ' ');
+            return '<div class="vlist-row">' +
+                '<span class="changes-badge ' + row[col.severity] + '">' +
+                (changes ? changes + ' Changes' : 'No Changes') + '</span>' +
+                '<span class="files"><strong>V1:</strong> ' + escapeHtml(row[col.file1]) +
+                ' &nbsp; <strong>V2:</strong> ' + escapeHtml(row[col.file2]) + '</span>' +
+                '<span class="date">' + date + '</span>' +
+                '<a class="btn btn-primary" href="' + escapeHtml(row[col.html_file]) + '">Report</a>' +
+                '<a class="btn btn-secondary" href="' + escapeHtml(row[col.json_file]) + '">JSON</a>' +
+                '</div>';
+        }
+
+        var pending = false;
+        function render() {
+            pending = false;
+            var first = Math.max(0, Math.floor(scroller.scrollTop / ROW_HEIGHT) - OVERSCAN);
+            var last = Math.min(view.length,
+                Math.ceil((scroller.scrollTop + scroller.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+            items.style.transform = 'translateY(' + first * ROW_HEIGHT + 'px)';
+            items.innerHTML = view.slice(first, last).map(rowHtml).join('');
+        }
+
+        function apply() {
+            var query = search.value.trim().toLowerCase();
+            var level = severity.value;
+            view = rows.filter(function (row) {
+                return (!level || row[col.severity] === level) &&
+                    (!query || (row[col.file1] + ' ' + row[col.file2]).toLowerCase().indexOf(query) !== -1);
+            });
+            view.sort(comparators[sort.value]);
+            spacer.style.height = view.length * ROW_HEIGHT + 'px';
+            count.textContent = view.length + ' / ' + rows.length;
+            scroller.scrollTop = 0;
+            render();
+        }
+
+        var timer = null;
+        search.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(apply, 150);
+        });
+        severity.addEventListener('change', apply);
+        sort.addEventListener('change', apply);
+        scroller.addEventListener('scroll', function () {
+            if (!pending) {
+                pending = true;
+                requestAnimationFrame(render);
+            }
+        });
+
+        document.querySelectorAll('.static-only').forEach(function (el) { el.hidden = true; });
+        app.hidden = false;
+        apply();
+    }
+})();
+"""
+
+# Assets compartidos por todos los reportes: nombre de fichero -> contenido
+ASSETS: Dict[str, str] = {
+    "report.css": REPORT_CSS,
+    "report.js": REPORT_JS,
+    "index.css": INDEX_CSS,
+    "index.js": INDEX_JS,
+}
+
+# Plantilla de la página, compilada una sola vez al importar el módulo
+REPORT_PAGE = Template("""<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Smart Vision QA Report - $file1_name vs $file2_name</title>
+    <link rel="stylesheet" href="$assets_href/report.css">
+    <script src="$assets_href/report.js" defer></script>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>Smart Vision QA Report</h1>
+            <div class="comparison-info">
+                Comparing: <strong>V1: $file1</strong> vs <strong>V2: $file2</strong>
+            </div>
+        </div>
+        
+        <div class="comparison-grid">
+            <div class="screenshot-panel">
+                <h3>Version 1: $file1_name</h3>
+                $screenshot1_html
+            </div>
+            <div class="screenshot-panel">
+                <h3>Version 2: $file2_name</h3>
+                $screenshot2_html
+            </div>
+        </div>
+        
+        <div class="analysis-section">
+            <h2>Analysis Results</h2>
+            $changes_html
+        </div>
+        
+        <div class="timestamp">
+            Report generated on $timestamp
+        </div>
+    </div>
+</body>
+</html>""")
+
+# Directorios en los que este proceso ya ha comprobado los assets
+_assets_written = set()
+
+
+def ensure_assets(results_dir: Path) -> Path:
+    """Escribe los assets compartidos si faltan o han cambiado (una vez por proceso)"""
+    assets_dir = Path(results_dir) / ASSETS_DIRNAME
+    key = str(assets_dir.resolve())
+    if key in _assets_written:
+        return assets_dir
+
+    assets_dir.mkdir(parents=True, exist_ok=True)
+    for name, content in ASSETS.items():
+        path = assets_dir / name
+        data = content.encode('utf-8')
+        if path.exists() and path.read_bytes() == data:
+            continue
+        # Nombre temporal por proceso: los workers de generate_reports_parallel escriben a la vez
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    _assets_written.add(key)
+    return assets_dir
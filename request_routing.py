@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Políticas de enrutado de peticiones para capturas de URLs
+Bloquea analítica, anuncios y widgets, sirve fixtures y limita el tamaño de recursos
+"""
+
+import fnmatch
+import mimetypes
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+
+# Dominios típicos de analítica, anuncios, chats y vídeo embebido
+NOISE_DOMAINS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googlesyndication.com", "adservice.google.com", "facebook.net",
+    "connect.facebook.net", "hotjar.com", "segment.io", "segment.com",
+    "mixpanel.com", "intercom.io", "intercomcdn.com", "drift.com",
+    "zdassets.com", "crisp.chat", "youtube.com", "youtube-nocookie.com",
+    "vimeo.com", "player.vimeo.com", "newrelic.com", "nr-data.net",
+]
+
+# Sin caché de red, max_resource_bytes solo se comprueba en estos tipos de recurso
+# (los pesados y prescindibles); el resto va directo a la red con route.continue_()
+SIZE_LIMITED_TYPES = ("image", "media", "font")
+
+# Tiempo máximo (ms) de la petición HEAD que consulta el tamaño de un recurso
+HEAD_TIMEOUT_MS = 5000
+
+
+@dataclass
+class RoutingPolicy:
+    """Política de enrutado aplicada a cada petición de una captura"""
+    block_domains: List[str] = field(default_factory=list)
+    block_resource_types: List[str] = field(default_factory=list)  # "media", "font", "websocket"...
+    stubs: Dict[str, Path] = field(default_factory=dict)  # patrón glob de URL -> fichero fixture
+    max_resource_bytes: Optional[int] = None  # desactivado por defecto; ver RequestRouter.handle
+
+    @classmethod
+    def block_noise(cls, **kwargs) -> "RoutingPolicy":
+        """Política que bloquea los dominios de NOISE_DOMAINS"""
+        return cls(block_domains=list(NOISE_DOMAINS), **kwargs)
+
+    def is_blocked(self, url: str, resource_type: str) -> bool:
+        if resource_type in self.block_resource_types:
+            return True
+        host = (urlparse(url).hostname or "").lower()
+        return any(host == domain or host.endswith("." + domain) for domain in self.block_domains)
+
+    def find_stub(self, url: str) -> Optional[Path]:
+        for pattern, fixture in self.stubs.items():
+            if fnmatch.fnmatch(url, pattern):
+                return Path(fixture)
+        return None
+
+
+class RequestRouter:
+    """Handler de rutas de Playwright que combina política y caché de red"""
+
+    def __init__(self, policy: RoutingPolicy = None, cache_session=None, request_context=None):
+        self.policy = policy or RoutingPolicy()
+        self.cache_session = cache_session
+        self.request_context = request_context  # APIRequestContext para los HEAD (page.request)
+        self.counts = {"allowed": 0, "blocked": 0, "stubbed": 0, "oversized": 0, "cached": 0}
+        self._durations_ms: List[float] = []
+        self._continued = set()
+
+    async def handle(self, route) -> None:
+        request = route.request
+
+        if self.policy.is_blocked(request.url, request.resource_type):
+            self.counts["blocked"] += 1
+            await route.abort("blockedbyclient")
+            return
+
+        fixture = self.policy.find_stub(request.url)
+        if fixture is not None:
+            self.counts["stubbed"] += 1
+            content_type = mimetypes.guess_type(fixture.name)[0] or "application/octet-stream"
+            await route.fulfill(status=200, content_type=content_type, body=fixture.read_bytes())
+            return
+
+        if self.cache_session:
+            entry = self.cache_session.lookup(request)
+            if entry is not None:
+                self.counts["cached"] += 1
+                await self.cache_session.fulfill_from_cache(route, entry)
+                return
+
+        limit = self.policy.max_resource_bytes
+        if not self.cache_session:
+            # Sin caché que necesite el cuerpo, el navegador hace la petición directamente
+            # (con su caché HTTP y sus conexiones); el tamaño se consulta con un HEAD
+            if limit is not None and request.resource_type in SIZE_LIMITED_TYPES:
+                length = await self._content_length(request)
+                if length is not None and length > limit:
+                    self.counts["oversized"] += 1
+                    await route.abort("blockedbyclient")
+                    return
+            self.counts["allowed"] += 1
+            self._continued.add(request)
+            await route.continue_()
+            return
+
+        # Con caché hace falta el cuerpo para grabarlo: route.fetch descarga la respuesta
+        # entera, así que aquí el límite solo evita que el recurso llegue a la página
+        start = time.perf_counter()
+        response = await route.fetch()
+        body = await response.body()
+        self._durations_ms.append((time.perf_counter() - start) * 1000)
+
+        if limit is not None and len(body) > limit:
+            self.counts["oversized"] += 1
+            await route.abort("blockedbyclient")
+            return
+
+        headers = self.cache_session.record(request, response.status, response.headers, body)
+        self.counts["allowed"] += 1
+        await route.fulfill(status=response.status, headers=headers, body=body)
+
+    async def _content_length(self, request) -> Optional[int]:
+        """Content-Length según un HEAD al mismo recurso, sin descargar el cuerpo.
+        None si no hay contexto de peticiones, el servidor no lo soporta o no lo indica."""
+        if self.request_context is None:
+            return None
+        try:
+            response = await self.request_context.head(
+                request.url, headers=request.headers, timeout=HEAD_TIMEOUT_MS, fail_on_status_code=False
+            )
+        except Exception:
+            return None
+        length = response.headers.get("content-length")
+        await response.dispose()
+        if response.ok and length is not None and length.isdigit():
+            return int(length)
+        return None
+
+    def on_request_finished(self, request) -> None:
+        """Registra la duración de las peticiones que fueron directas a la red"""
+        if request not in self._continued:
+            return
+        response_end = request.timing.get("responseEnd", -1)
+        if response_end > 0:
+            self._durations_ms.append(response_end)
+
+    def report(self) -> Dict:
+        """Resumen por captura. El tiempo ahorrado es una estimación:
+        peticiones evitadas por la latencia media de las que sí se sirvieron."""
+        avoided = self.counts["blocked"] + self.counts["stubbed"] + self.counts["cached"]
+        mean_ms = sum(self._durations_ms) / len(self._durations_ms) if self._durations_ms else 0.0
+        return {
+            **self.counts,
+            "mean_request_ms": round(mean_ms, 1),
+            "estimated_time_saved_ms": round(avoided * mean_ms)
+        }
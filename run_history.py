@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Historial de ejecuciones de SmartVisionQA (SQLite, solo inserciones)
+Guarda cada comparación de cada ejecución con sus cambios por categoría y
+tiempos por etapa, y ofrece consultas de tendencias por línea de comandos
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from shared_results import journal_mode
+from summary_store import CHANGE_KEYS, count_changes, severity_for
+
+
+HISTORY_DB_NAME = "history.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    model TEXT
+);
+CREATE TABLE IF NOT EXISTS comparisons (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    file1 TEXT NOT NULL,
+    file2 TEXT NOT NULL,
+    layout_changes INTEGER NOT NULL,
+    text_changes INTEGER NOT NULL,
+    style_changes INTEGER NOT NULL,
+    element_changes INTEGER NOT NULL,
+    total_changes INTEGER NOT NULL,
+    severity TEXT NOT NULL,
+    duration_ms REAL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_comparisons_pair ON comparisons(file1, file2, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_comparisons_file1 ON comparisons(file1, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_comparisons_file2 ON comparisons(file2, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_comparisons_duration ON comparisons(duration_ms DESC);
+CREATE INDEX IF NOT EXISTS idx_comparisons_run ON comparisons(run_id);
+CREATE TABLE IF NOT EXISTS changes (
+    comparison_id INTEGER NOT NULL REFERENCES comparisons(id),
+    category TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_changes_comparison ON changes(comparison_id);
+CREATE TABLE IF NOT EXISTS stage_timings (
+    comparison_id INTEGER NOT NULL REFERENCES comparisons(id),
+    stage TEXT NOT NULL,
+    duration_ms REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stage_timings_comparison ON stage_timings(comparison_id);
+CREATE INDEX IF NOT EXISTS idx_stage_timings_stage ON stage_timings(stage, duration_ms DESC);
+"""
+
+
+class RunHistory:
+    """Base de datos de resultados de todas las ejecuciones"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # SmartVisionQA registra las comparaciones desde ArtifactWriter.run_db, en otro hilo
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(f"PRAGMA journal_mode={journal_mode(self.db_path.parent)}")
+        self.conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_results_dir(cls, results_dir: Path) -> "RunHistory":
+        return cls(Path(results_dir) / HISTORY_DB_NAME)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def start_run(self, model: str = None) -> int:
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (started_at, model) VALUES (?, ?)", (time.time(), model)
+            )
+        return cursor.lastrowid
+
+    def record_comparison(self, run_id: int, results: Dict) -> int:
+        """Añade una comparación terminada con sus cambios y tiempos por etapa"""
+        now = time.time()
+        diff = results.get('differences', {})
+        counts = count_changes(diff)
+        total = sum(counts.values())
+        timings = results.get('timings', {})
+
+        with self.conn:
+            cursor = self.conn.execute("""
+                INSERT INTO comparisons (run_id, file1, file2, layout_changes, text_changes,
+                    style_changes, element_changes, total_changes, severity, duration_ms, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (run_id, results['file1'], results['file2'],
+                  *(counts[key] for key in CHANGE_KEYS),
+                  total, severity_for(total), timings.get('total'), now))
+            comparison_id = cursor.lastrowid
+
+            self.conn.executemany(
+                "INSERT INTO changes (comparison_id, category, description) VALUES (?, ?, ?)",
+                [(comparison_id, key, str(change).strip())
+                 for key in CHANGE_KEYS
+                 for change in (diff.get(key) or [])
+                 if change and str(change).strip()]
+            )
+            self.conn.executemany(
+                "INSERT INTO stage_timings (comparison_id, stage, duration_ms) VALUES (?, ?, ?)",
+                [(comparison_id, stage, ms) for stage, ms in timings.items() if stage != 'total']
+            )
+            self.conn.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (now, run_id))
+
+        return comparison_id
+
+    # Consultas
+
+    def trend(self, file1: str, file2: str, limit: int = 50) -> List[Dict]:
+        """Evolución de un par concreto en las últimas `limit` ejecuciones"""
+        rows = self.conn.execute("""
+            SELECT run_id, created_at, layout_changes, text_changes, style_changes,
+                   element_changes, total_changes, severity, duration_ms
+            FROM comparisons WHERE file1 = ? AND file2 = ?
+            ORDER BY created_at DESC LIMIT ?
+        """, (file1, file2, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def page_history(self, page: str, limit: int = 50) -> List[Dict]:
+        """Comparaciones en las que aparece una página, como V1 o como V2"""
+        rows = self.conn.execute("""
+            SELECT * FROM (
+                SELECT * FROM (
+                    SELECT id, run_id, file1, file2, total_changes, severity, duration_ms, created_at
+                    FROM comparisons WHERE file1 = ? ORDER BY created_at DESC LIMIT ?
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT id, run_id, file1, file2, total_changes, severity, duration_ms, created_at
+                    FROM comparisons WHERE file2 = ? AND file1 != ? ORDER BY created_at DESC LIMIT ?
+                )
+            ) ORDER BY created_at DESC LIMIT ?
+        """, (page, limit, page, page, limit, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def slowest(self, limit: int = 20, stage: Optional[str] = None) -> List[Dict]:
+        """Comparaciones más lentas, en total o para una etapa concreta"""
+        if stage is None:
+            rows = self.conn.execute("""
+                SELECT id, run_id, file1, file2, duration_ms, created_at
+                FROM comparisons WHERE duration_ms IS NOT NULL
+                ORDER BY duration_ms DESC LIMIT ?
+            """, (limit,)).fetchall()
+        else:
+            rows = self.conn.execute("""
+                SELECT c.id, c.run_id, c.file1, c.file2, t.duration_ms, c.created_at
+                FROM stage_timings t JOIN comparisons c ON c.id = t.comparison_id
+                WHERE t.stage = ? ORDER BY t.duration_ms DESC LIMIT ?
+            """, (stage, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def changes(self, comparison_id: int) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT category, description FROM changes WHERE comparison_id = ?", (comparison_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def runs(self, limit: int = 20) -> List[Dict]:
+        rows = self.conn.execute("""
+            SELECT r.id, r.started_at, r.finished_at, r.model,
+                   (SELECT COUNT(*) FROM comparisons c WHERE c.run_id = r.id) AS comparisons
+            FROM runs r ORDER BY r.id DESC LIMIT ?
+        """, (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+
+def _print_table(rows: List[Dict]) -> None:
+    if not rows:
+        print("Sin resultados")
+        return
+    columns = list(rows[0].keys())
+    formatted = [[_format_value(col, row[col]) for col in columns] for row in rows]
+    widths = [max(len(col), *(len(r[i]) for r in formatted)) for i, col in enumerate(columns)]
+    print("  ".join(col.ljust(w) for col, w in zip(columns, widths)))
+    print("  ".join("-" * w for w in widths))
+    for r in formatted:
+        print("  ".join(value.ljust(w) for value, w in zip(r, widths)))
+
+
+def _format_value(column: str, value) -> str:
+    if value is None:
+        return "-"
+    if column.endswith('_at'):
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(value))
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    return str(value)
+
+
+def main():
+    """Consultas sobre el historial desde línea de comandos"""
+    parser = argparse.ArgumentParser(description="Consulta el historial de ejecuciones de SmartVisionQA")
+    parser.add_argument("--db", type=Path, default=Path("results") / HISTORY_DB_NAME)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    trend_parser = subparsers.add_parser("trend", help="Evolución de un par V1/V2")
+    trend_parser.add_argument("file1")
+    trend_parser.add_argument("file2")
+    trend_parser.add_argument("--limit", type=int, default=50)
+
+    page_parser = subparsers.add_parser("page", help="Historial de una página")
+    page_parser.add_argument("page")
+    page_parser.add_argument("--limit", type=int, default=50)
+
+    slowest_parser = subparsers.add_parser("slowest", help="Comparaciones más lentas")
+    slowest_parser.add_argument("--stage", help="Etapa concreta (render_v1, render_v2, analyze...)")
+    slowest_parser.add_argument("--limit", type=int, default=20)
+
+    changes_parser = subparsers.add_parser("changes", help="Cambios de una comparación")
+    changes_parser.add_argument("comparison_id", type=int)
+
+    runs_parser = subparsers.add_parser("runs", help="Últimas ejecuciones")
+    runs_parser.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print(f"Error: No se encontró {args.db}")
+        sys.exit(1)
+
+    history = RunHistory(args.db)
+    start = time.perf_counter()
+    if args.command == "trend":
+        rows = history.trend(args.file1, args.file2, args.limit)
+    elif args.command == "page":
+        rows = history.page_history(args.page, args.limit)
+    elif args.command == "slowest":
+        rows = history.slowest(args.limit, args.stage)
+    elif args.command == "changes":
+        rows = history.changes(args.comparison_id)
+    else:
+        rows = history.runs(args.limit)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    history.close()
+
+    _print_table(rows)
+    print(f"\n{len(rows)} filas en {elapsed_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Journal de ejecución para reanudar suites interrumpidas (SQLite)
+Registra cada etapa terminada de cada comparación (capturas, análisis del
+modelo, reporte) para que `--resume` no repita trabajo ya hecho
+"""
+
+import json
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+from shared_results import journal_mode
+
+
+JOURNAL_DB_NAME = "journal.db"
+
+# Etapas de una comparación en el orden en que se completan
+STAGES = ("render_v1", "render_v2", "analyze", "report")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal_runs (
+    run_key TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    history_run_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS journal (
+    run_key TEXT NOT NULL REFERENCES journal_runs(run_key),
+    pair_key TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    data TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (run_key, pair_key, stage)
+);
+"""
+
+
+class RunJournal:
+    """Etapas completadas por ejecución y par comparado"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Las etapas se registran desde el hilo de ArtifactWriter.run_db
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(f"PRAGMA journal_mode={journal_mode(self.db_path.parent)}")
+        self.conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_results_dir(cls, results_dir: Path) -> "RunJournal":
+        return cls(Path(results_dir) / JOURNAL_DB_NAME)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def start(self, resume: bool = False, run_key: str = None) -> str:
+        """Abre una ejecución: la indicada, la última si `resume` y no terminó, o una nueva"""
+        if run_key is None and resume:
+            # Una ejecución terminada no se reabre: se omitirían todos sus pares
+            row = self.conn.execute(
+                "SELECT run_key, finished_at FROM journal_runs ORDER BY started_at DESC LIMIT 1"
+            ).fetchone()
+            run_key = row['run_key'] if row and row['finished_at'] is None else None
+        run_key = run_key or uuid.uuid4().hex
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO journal_runs (run_key, started_at) VALUES (?, ?)
+                ON CONFLICT(run_key) DO UPDATE SET finished_at = NULL
+            """, (run_key, time.time()))
+        return run_key
+
+    def finish(self, run_key: str) -> None:
+        with self.conn:
+            self.conn.execute("UPDATE journal_runs SET finished_at = ? WHERE run_key = ?",
+                              (time.time(), run_key))
+
+    def history_run_id(self, run_key: str) -> Optional[int]:
+        row = self.conn.execute(
+            "SELECT history_run_id FROM journal_runs WHERE run_key = ?", (run_key,)
+        ).fetchone()
+        return row['history_run_id'] if row else None
+
+    def set_history_run_id(self, run_key: str, history_run_id: int) -> None:
+        """Al reanudar, las comparaciones restantes se añaden a la misma ejecución del historial"""
+        with self.conn:
+            self.conn.execute("UPDATE journal_runs SET history_run_id = ? WHERE run_key = ?",
+                              (history_run_id, run_key))
+
+    def record(self, run_key: str, pair_key: str, stage: str, data: Dict) -> None:
+        """Marca una etapa como completada; se confirma de inmediato"""
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO journal (run_key, pair_key, stage, data, recorded_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(run_key, pair_key, stage) DO UPDATE SET
+                    data = excluded.data, recorded_at = excluded.recorded_at
+            """, (run_key, pair_key, stage, json.dumps(data), time.time()))
+
+    def entries(self, run_key: str, pair_key: str) -> Dict[str, Dict]:
+        """Etapas completadas de un par: {stage: data}"""
+        return {
+            row['stage']: json.loads(row['data'])
+            for row in self.conn.execute(
+                "SELECT stage, data FROM journal WHERE run_key = ? AND pair_key = ?",
+                (run_key, pair_key)
+            )
+        }
+
+    def progress(self, run_key: str) -> Dict[str, int]:
+        """Número de pares que han completado cada etapa"""
+        counts = {stage: 0 for stage in STAGES}
+        for row in self.conn.execute(
+            "SELECT stage, COUNT(*) AS n FROM journal WHERE run_key = ? GROUP BY stage", (run_key,)
+        ):
+            counts[row['stage']] = row['n']
+        return counts
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark del clasificador de cambios sobre respuestas sintéticas grandes
+Compara el bucle original (línea x categoría x palabra clave) con el
+clasificador compilado y comprueba que ambos producen el mismo resultado
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from change_classifier import CATEGORY_KEYWORDS, ChangeClassifier
+
+
+FILLER = ["the", "page", "version", "now", "shows", "a", "different", "V1", "V2", "has",
+          "while", "and", "instead", "of", "main", "top", "hero", "area", "new", "larger"]
+
+
+def naive_categorize(raw_text: str) -> dict:
+    """Implementación original de HTMLReportGenerator._parse_raw_analysis"""
+    categories = {name: {'keywords': keywords, 'changes': []} for name, keywords in CATEGORY_KEYWORDS.items()}
+    lines = raw_text.replace('. ', '.\n').split('\n')
+    for line in lines:
+        line_clean = line.strip()
+        if (not line_clean or
+            len(line_clean) < 10 or
+            line_clean in ['[', ']', '{', '}'] or
+            any(line_clean.startswith(f'"{key}_changes"') for key in categories.keys()) or
+            any(line_clean.startswith(f'{key}_changes:') for key in categories.keys())):
+            continue
+        best_match = None
+        best_score = 0
+        for cat_name, cat_data in categories.items():
+            score = sum(1 for keyword in cat_data['keywords']
+                        if keyword.lower() in line_clean.lower())
+            if score > best_score:
+                best_score = score
+                best_match = cat_name
+        if best_match and best_score > 0:
+            clean_line = line_clean.strip('.-,[]"\' ')
+            if clean_line and not clean_line[0].isupper():
+                clean_line = clean_line[0].upper() + clean_line[1:]
+            if not any(clean_line.lower().endswith('_changes') for _ in categories.keys()):
+                categories[best_match]['changes'].append(clean_line)
+    return {cat: data['changes'] for cat, data in categories.items()}
+
+
+def synthetic_response(lines: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    keywords = [k for words in CATEGORY_KEYWORDS.values() for k in words]
+    out = []
+    for i in range(lines):
+        words = rng.choices(FILLER, k=rng.randint(4, 14))
+        for _ in range(rng.randint(0, 3)):
+            word = rng.choice(keywords)
+            words.insert(rng.randrange(len(words) + 1), word.upper() if rng.random() < 0.1 else word)
+        prefix = rng.choice(["- ", "* ", "", "", '"'])
+        out.append(prefix + " ".join(words) + rng.choice([".", ". Also the " + rng.choice(keywords) + " changed", ""]))
+        if i % 50 == 0:
+            out.append('"layout_changes": [')
+    return "\n".join(out)
+
+
+def timed(func, text: str, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(text)
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del clasificador de cambios")
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = synthetic_response(args.lines)
+    classifier = ChangeClassifier()
+
+    naive_ms, expected = timed(naive_categorize, text, args.repeat)
+    compiled_ms, result = timed(classifier.categorize, text, args.repeat)
+    actual = {cat: data['changes'] for cat, data in result['categories'].items()}
+
+    if actual != expected:
+        print("ERROR: el clasificador compilado no coincide con la implementación original")
+        sys.exit(1)
+
+    print(f"Respuesta sintética: {args.lines} líneas, {len(text) / 1024:.0f} KB")
+    print(f"Bucle original:        {naive_ms:8.1f} ms")
+    print(f"Clasificador compilado:{compiled_ms:8.1f} ms  ({naive_ms / compiled_ms:.1f}x)")
+    print(f"Cambios detectados: {result['detected_changes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las consultas del historial de ejecuciones
+Rellena una base de datos temporal con cientos de miles de comparaciones y
+mide el tiempo de cada consulta
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from run_history import RunHistory
+
+
+def populate(history: RunHistory, comparisons: int, pages: int) -> None:
+    """Inserta comparaciones sintéticas repartidas en ejecuciones de 50"""
+    rng = random.Random(42)
+    page_names = [f"page_{i}.html" for i in range(pages)]
+    for start in range(0, comparisons, 50):
+        run_id = history.start_run("bench")
+        for _ in range(min(50, comparisons - start)):
+            file1, file2 = rng.sample(page_names, 2)
+            history.record_comparison(run_id, {
+                "file1": file1,
+                "file2": file2,
+                "differences": {
+                    "layout_changes": ["layout change"] * rng.randint(0, 2),
+                    "text_changes": ["text change"] * rng.randint(0, 3),
+                    "style_changes": [],
+                    "element_changes": ["element change"] * rng.randint(0, 1),
+                },
+                "timings": {
+                    "render_v1": rng.uniform(200, 2000),
+                    "render_v2": rng.uniform(200, 2000),
+                    "analyze": rng.uniform(5000, 60000),
+                    "total": rng.uniform(6000, 64000),
+                },
+            })
+
+
+def timed(label: str, func, repeat: int = 20) -> None:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows = func()
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+    print(f"{label:<32} {elapsed_ms:8.2f} ms  ({len(rows)} filas)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de consultas de run_history")
+    parser.add_argument("--comparisons", type=int, default=200_000)
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = RunHistory(Path(tmp) / "history.db")
+        start = time.perf_counter()
+        history.conn.execute("PRAGMA synchronous=OFF")
+        populate(history, args.comparisons, args.pages)
+        print(f"Insertadas {args.comparisons} comparaciones en {time.perf_counter() - start:.1f} s\n")
+
+        timed("trend(page_1, page_2)", lambda: history.trend("page_1.html", "page_2.html", 50))
+        timed("page_history(page_3)", lambda: history.page_history("page_3.html", 50))
+        timed("slowest()", lambda: history.slowest(20))
+        timed("slowest(stage=analyze)", lambda: history.slowest(20, "analyze"))
+        timed("runs()", lambda: history.runs(20))
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark del tiempo de importación con `python -X importtime`
+Mide las rutas de arranque de SmartVisionQA y falla si la ruta de solo
+reportes importa el navegador o el modelo, o si se supera el presupuesto
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (nombre, código, presupuesto en ms por defecto, módulos prohibidos)
+HEAVY_MODULES = ("ollama", "playwright", "PIL", "httpx", "pydantic")
+TARGETS = [
+    ("report-only",
+     "import cli, generate_html_report, summary_store, sys; "
+     "sys.path.insert(0, 'scripts'); import generate_index",
+     150, HEAVY_MODULES),
+    ("smartVisionQA", "import smartVisionQA", 250, HEAVY_MODULES),
+    ("full-stack",
+     "import smartVisionQA, ollama, playwright.async_api, PIL.Image",
+     None, ()),
+]
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """Líneas de -X importtime como (módulo con sangría, self_us, cumulative_us)"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Se quita solo el espacio tras el separador: el resto de sangría indica el nivel
+        entries.append((name.rstrip()[1:], int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure(code: str) -> Tuple[float, Dict[str, int]]:
+    """Tiempo total de importación (ms) excluyendo el arranque del intérprete,
+    y coste acumulado de cada import de primer nivel"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    baseline = _top_level(parse_importtime(
+        subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"],
+                       cwd=ROOT, capture_output=True, text=True).stderr
+    ))
+    top = {name: us for name, us in _top_level(parse_importtime(proc.stderr)).items() if name not in baseline}
+    return sum(top.values()) / 1000, top
+
+
+def _top_level(entries: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    # Los imports de primer nivel no llevan sangría tras el separador
+    return {name.strip(): cumulative for name, _, cumulative in entries if not name.startswith("  ")}
+
+
+def imported_modules(code: str) -> set:
+    proc = subprocess.run([sys.executable, "-c", f"{code}\nimport sys\nprint('\\n'.join(sys.modules))"],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    return {name.split(".")[0] for name in proc.stdout.split()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del tiempo de importación")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-scale", type=float, default=1.0,
+                        help="Multiplica los presupuestos (p. ej. 2 en máquinas lentas de CI)")
+    args = parser.parse_args()
+
+    failures = []
+    for name, code, budget_ms, forbidden in TARGETS:
+        try:
+            runs = [measure(code) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{name:14s} no disponible: {e}")
+            continue
+        median_ms = statistics.median(ms for ms, _ in runs)
+        heaviest = sorted(runs[-1][1].items(), key=lambda item: -item[1])[:4]
+        detail = ", ".join(f"{module} {us / 1000:.0f}" for module, us in heaviest)
+        line = f"{name:14s} {median_ms:7.1f} ms  ({detail})"
+
+        if budget_ms is not None:
+            budget = budget_ms * args.budget_scale
+            line += f"  presupuesto {budget:.0f} ms"
+            if median_ms > budget:
+                failures.append(f"{name}: {median_ms:.1f} ms > {budget:.0f} ms")
+        print(line)
+
+        loaded = imported_modules(code) & set(forbidden)
+        if loaded:
+            failures.append(f"{name}: importa {', '.join(sorted(loaded))}")
+
+    if failures:
+        print("\nERROR:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
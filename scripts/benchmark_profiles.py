@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los perfiles de inferencia sobre las páginas de demo
+Para cada perfil mide la latencia de compare_images (total y del modelo), los
+tokens, y la calidad de la salida: cambios conocidos detectados y respuestas
+con JSON válido
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmark_strategies import EXPECTED_CHANGES, detection_rate, load_screenshots
+from cli import DEFAULT_MODEL, DEMO_TEST_CASES
+from inference_profiles import PROFILES
+from smartVisionQA import VisionAnalyzer
+
+
+def _mean(values):
+    return statistics.mean(values) if values else None
+
+
+def _fmt(value, spec: str, width: int) -> str:
+    return f"{value:{width}{spec}}" if value is not None else f"{'-':>{width}s}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de perfiles de inferencia")
+    parser.add_argument("--demo-dir", type=Path, default=Path("demo"))
+    parser.add_argument("--screenshots", type=Path, default=None,
+                        help="Directorio con <pagina>_screenshot.png ya generadas (p. ej. results)")
+    parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES))
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--strategy", default="stack")
+    parser.add_argument("--repeat", type=int, default=1, help="Llamadas por par y perfil")
+    args = parser.parse_args()
+
+    try:
+        VisionAnalyzer(model=args.model, host=args.host).client.show(args.model)
+    except Exception as e:
+        print(f"Ollama no disponible: {e}")
+        sys.exit(1)
+
+    names = sorted({name for pair in DEMO_TEST_CASES for name in pair})
+    shots = load_screenshots(names, args.demo_dir, args.screenshots)
+
+    print(f"{'perfil':12s} {'total ms':>9s} {'modelo ms':>10s} {'tok in':>7s} {'tok out':>8s} "
+          f"{'detección':>10s} {'JSON ok':>8s} {'cambios':>8s}")
+    for name in args.profiles:
+        analyzer = VisionAnalyzer(model=args.model, host=args.host, strategy=args.strategy, profile=name)
+        # La primera llamada con unas opciones nuevas puede recargar el modelo (p. ej. otro num_ctx)
+        analyzer.compare_images_detailed(shots[DEMO_TEST_CASES[0][0]], shots[DEMO_TEST_CASES[0][1]])
+
+        total_ms, model_ms, tokens_in, tokens_out, detection, valid, changes = [], [], [], [], [], [], []
+        for v1, v2 in DEMO_TEST_CASES:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                result, analysis = analyzer.compare_images_detailed(shots[v1], shots[v2])
+                total_ms.append((time.perf_counter() - start) * 1000)
+                if analysis.get('identical'):
+                    continue
+                model_ms.append(analysis['model_ms'])
+                if analysis.get('prompt_tokens') is not None:
+                    tokens_in.append(analysis['prompt_tokens'])
+                if analysis.get('output_tokens') is not None:
+                    tokens_out.append(analysis['output_tokens'])
+                detection.append(detection_rate(result, EXPECTED_CHANGES.get((v1, v2), [])))
+                valid.append(0 if 'raw_response' in result else 1)
+                changes.append(sum(len(value) for key, value in result.items() if key.endswith('_changes')))
+
+        rate = _mean(detection)
+        ok = _mean(valid)
+        print(f"{name:12s} {_fmt(_mean(total_ms), '.0f', 9)} {_fmt(_mean(model_ms), '.0f', 10)} "
+              f"{_fmt(_mean(tokens_in), '.0f', 7)} {_fmt(_mean(tokens_out), '.0f', 8)} "
+              f"{_fmt(rate * 100 if rate is not None else None, '.0f', 9)}% "
+              f"{_fmt(ok * 100 if ok is not None else None, '.0f', 7)}% {_fmt(_mean(changes), '.1f', 8)}")
+        options = PROFILES[name].options(args.host)
+        if options or PROFILES[name].max_image_width:
+            print(f"{'':12s} options={options} max_image_width={PROFILES[name].max_image_width}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las estrategias de composición de V1/V2 sobre las páginas de demo
+Compara tamaño de imagen, tokens, latencia del modelo y cambios detectados de
+stack, side_by_side, separate y overlay para elegir la más barata que siga
+siendo precisa. Sin Ollama disponible solo mide la parte local.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image
+
+from cli import DEFAULT_MODEL, DEMO_TEST_CASES
+from generate_html_report import safe_name
+from image_ops import STRATEGIES, compose, crop_band, diff_bbox
+
+
+# Cambios reales entre las páginas de demo: cada grupo cuenta como detectado si
+# alguna de sus variantes aparece en la respuesta del modelo
+EXPECTED_CHANGES = {
+    ("page_v1.html", "page_v2.html"): [
+        ("QA Pro",), ("NEW 2.0", "badge"), ("Free Trial",), ("View Demo",), ("99.9",),
+        ("50x",), ("Real-Time Monitoring", "fourth card", "four cards", "4 cards"),
+        ("Intelligent Visual Testing",), ("dark", "gradient", "background"),
+    ],
+    ("page_v1.html", "page_v3.html"): [
+        ("banner", "Real-time collaboration"), ("Advanced Visual Testing",),
+        ("98%",), ("15x",), ("750",),
+    ],
+    ("page_v2.html", "page_v3.html"): [
+        ("banner", "Real-time collaboration"), ("QA Pro", "QA Platform"), ("NEW 2.0", "badge"),
+        ("Get Started", "Free Trial"), ("98%", "99.9"),
+        ("Advanced Visual Testing", "Intelligent Visual Testing"),
+    ],
+}
+
+# Parches de 28x28 px por token de imagen (Qwen2.5-VL); solo orientativo para otros modelos
+PATCH_PX = 28
+
+
+def estimate_image_tokens(sizes: List[Tuple[int, int]]) -> int:
+    return sum(math.ceil(width / PATCH_PX) * math.ceil(height / PATCH_PX) for width, height in sizes)
+
+
+def detection_rate(result: Dict, expected: List[Tuple[str, ...]]) -> float:
+    text = json.dumps(result).lower()
+    found = sum(1 for variants in expected if any(v.lower() in text for v in variants))
+    return found / len(expected) if expected else 1.0
+
+
+def load_screenshots(names: List[str], demo_dir: Path, screenshots_dir: Path = None) -> Dict[str, bytes]:
+    """Capturas existentes (p. ej. results/) o renderizadas con Playwright"""
+    if screenshots_dir:
+        return {name: (screenshots_dir / f"{safe_name(name)}_screenshot.png").read_bytes() for name in names}
+
+    from smartVisionQA import HTMLRenderer
+
+    async def render_all():
+        renderer = HTMLRenderer()
+        return {name: await renderer.html_to_image(demo_dir / name) for name in names}
+
+    return asyncio.run(render_all())
+
+
+def prepare_local(img1_bytes: bytes, img2_bytes: bytes, strategy: str, crop: bool) -> Tuple[float, List]:
+    """Preparación en este proceso: (ms, tamaños de las imágenes enviadas)"""
+    start = time.perf_counter()
+    img1 = Image.open(io.BytesIO(img1_bytes)).convert('RGB')
+    img2 = Image.open(io.BytesIO(img2_bytes)).convert('RGB')
+    bbox = diff_bbox(img1, img2)
+    if bbox is None:
+        return (time.perf_counter() - start) * 1000, []
+    if crop:
+        img1, img2, _ = crop_band(img1, img2, bbox)
+    sizes = []
+    for image in compose(img1, img2, strategy):
+        image.save(io.BytesIO(), format='PNG')
+        sizes.append(image.size)
+    return (time.perf_counter() - start) * 1000, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de estrategias de composición")
+    parser.add_argument("--demo-dir", type=Path, default=Path("demo"))
+    parser.add_argument("--screenshots", type=Path, default=None,
+                        help="Directorio con <pagina>_screenshot.png ya generadas (p. ej. results)")
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=list(STRATEGIES))
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--repeat", type=int, default=1, help="Llamadas al modelo por par y estrategia")
+    parser.add_argument("--no-crop", action="store_true", help="Enviar las capturas completas")
+    parser.add_argument("--offline", action="store_true", help="No llamar al modelo")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Pérdida de detección aceptable frente a la mejor estrategia")
+    args = parser.parse_args()
+
+    names = sorted({name for pair in DEMO_TEST_CASES for name in pair})
+    shots = load_screenshots(names, args.demo_dir, args.screenshots)
+
+    analyzers = {}
+    if not args.offline:
+        from smartVisionQA import VisionAnalyzer
+        try:
+            probe = VisionAnalyzer(model=args.model, host=args.host)
+            probe.client.show(args.model)
+            analyzers = {strategy: VisionAnalyzer(model=args.model, host=args.host,
+                                                  crop_to_changes=not args.no_crop, strategy=strategy)
+                         for strategy in args.strategies}
+        except Exception as e:
+            print(f"Ollama no disponible ({e}); solo se mide la preparación local\n")
+
+    rows = []
+    for strategy in args.strategies:
+        prep_ms, pixels, est_tokens, prompt_tokens, model_ms, detection = [], [], [], [], [], []
+        for v1, v2 in DEMO_TEST_CASES:
+            ms, sizes = prepare_local(shots[v1], shots[v2], strategy, not args.no_crop)
+            prep_ms.append(ms)
+            pixels.append(sum(w * h for w, h in sizes))
+            est_tokens.append(estimate_image_tokens(sizes))
+            analyzer = analyzers.get(strategy)
+            for _ in range(args.repeat if analyzer else 0):
+                result, analysis = analyzer.compare_images_detailed(shots[v1], shots[v2])
+                model_ms.append(analysis.get('model_ms', 0))
+                if analysis.get('prompt_tokens') is not None:
+                    prompt_tokens.append(analysis['prompt_tokens'])
+                detection.append(detection_rate(result, EXPECTED_CHANGES.get((v1, v2), [])))
+        rows.append({
+            "strategy": strategy,
+            "prep_ms": statistics.mean(prep_ms),
+            "megapixels": statistics.mean(pixels) / 1e6,
+            "est_tokens": statistics.mean(est_tokens),
+            "prompt_tokens": statistics.mean(prompt_tokens) if prompt_tokens else None,
+            "model_ms": statistics.mean(model_ms) if model_ms else None,
+            "detection": statistics.mean(detection) if detection else None,
+        })
+
+    print(f"{'estrategia':14s} {'prep ms':>8s} {'Mpx':>6s} {'tok est':>8s} {'tok real':>9s} "
+          f"{'modelo ms':>10s} {'detección':>10s}")
+    for row in rows:
+        real = f"{row['prompt_tokens']:.0f}" if row['prompt_tokens'] is not None else "-"
+        model = f"{row['model_ms']:.0f}" if row['model_ms'] is not None else "-"
+        detection = f"{row['detection'] * 100:.0f}%" if row['detection'] is not None else "-"
+        print(f"{row['strategy']:14s} {row['prep_ms']:8.1f} {row['megapixels']:6.2f} {row['est_tokens']:8.0f} "
+              f"{real:>9s} {model:>10s} {detection:>10s}")
+
+    measured = [row for row in rows if row['detection'] is not None]
+    if measured:
+        best = max(row['detection'] for row in measured)
+        candidates = [row for row in measured if row['detection'] >= best - args.tolerance]
+        pick = min(candidates, key=lambda row: row['model_ms'])
+        print(f"\nRecomendada: {pick['strategy']} (la más rápida con detección >= {best - args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,252 +1,44 @@
 #!/usr/bin/env python3
 """
 Genera índice HTML para todos los reportes generados
+Las filas del almacén se recorren una sola vez (cursor, memoria constante): en
+esa misma pasada se acumulan las estadísticas, se escriben las páginas
+(index.html, index-2.html, ...) y el manifiesto compacto index.json que usa
+assets/index.js para la lista virtual con filtro y orden
 """
 
+import argparse
 import json
+import math
+import os
+import sys
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict
+from string import Template
+from typing import Dict, Iterable, Iterator
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-def generate_index_html(results_dir: Path) -> None:
-    """Genera página de índice con todos los reportes"""
-    
-    reports = []
-    
-    # Buscar todos los reportes JSON
-    for json_file in results_dir.glob("comparison_*.json"):
-        try:
-            with open(json_file, 'r') as f:
-                data = json.load(f)
-            
-            # Buscar HTML correspondiente
-            html_file = json_file.with_name(
-                json_file.name.replace("comparison_", "visual_report_").replace(".json", ".html")
-            )
-            
-            if html_file.exists():
-                # Contar cambios
-                diff = data.get('differences', {})
-                total_changes = 0
-                
-                if isinstance(diff, dict):
-                    for key in ['layout_changes', 'text_changes', 'style_changes', 'element_changes']:
-                        changes = diff.get(key, [])
-                        if isinstance(changes, list):
-                            total_changes += len([c for c in changes if c and str(c).strip()])
-                
-                reports.append({
-                    'json_file': json_file.name,
-                    'html_file': html_file.name,
-                    'file1': data.get('file1', 'Unknown'),
-                    'file2': data.get('file2', 'Unknown'),
-                    'total_changes': total_changes,
-                    'timestamp': json_file.stat().st_mtime
-                })
-        
-        except Exception as e:
-            print(f"Error procesando {json_file}: {e}")
-    
-    # Ordenar por timestamp (más reciente primero)
-    reports.sort(key=lambda x: x['timestamp'], reverse=True)
-    
-    # Generar HTML
-    html_content = f"""
-<!DOCTYPE html>
+from report_templates import ensure_assets
+from summary_store import SummaryStore
+
+
+PAGE_SIZE = 100
+MANIFEST_NAME = "index.json"
+# Columnas de cada fila del manifiesto (las filas son listas, no objetos)
+MANIFEST_COLUMNS = ("file1", "file2", "total_changes", "severity", "html_file", "json_file", "updated_at")
+_COMPACT = (",", ":")
+
+INDEX_HEAD = Template("""<!DOCTYPE html>
 <html lang="es">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>SmartVisionQA - Reports Dashboard</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: 'Segoe UI', system-ui, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 40px;
-        }}
-        
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-        }}
-        
-        .header {{
-            background: white;
-            border-radius: 20px;
-            padding: 30px;
-            box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-            margin-bottom: 30px;
-            text-align: center;
-        }}
-        
-        .header h1 {{
-            color: #333;
-            font-size: 2.5rem;
-            margin-bottom: 10px;
-        }}
-        
-        .subtitle {{
-            color: #666;
-            font-size: 1.1rem;
-        }}
-        
-        .stats {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 20px;
-            margin-bottom: 30px;
-        }}
-        
-        .stat-card {{
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            text-align: center;
-            box-shadow: 0 10px 25px rgba(0,0,0,0.1);
-        }}
-        
-        .stat-number {{
-            font-size: 2rem;
-            font-weight: bold;
-            color: #667eea;
-            margin-bottom: 5px;
-        }}
-        
-        .stat-label {{
-            color: #666;
-            font-size: 0.9rem;
-        }}
-        
-        .reports-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(400px, 1fr));
-            gap: 20px;
-        }}
-        
-        .report-card {{
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            box-shadow: 0 10px 25px rgba(0,0,0,0.1);
-            transition: transform 0.3s;
-        }}
-        
-        .report-card:hover {{
-            transform: translateY(-5px);
-        }}
-        
-        .report-header {{
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 15px;
-        }}
-        
-        .comparison-title {{
-            font-size: 1.1rem;
-            font-weight: 600;
-            color: #333;
-        }}
-        
-        .changes-badge {{
-            background: #667eea;
-            color: white;
-            padding: 4px 12px;
-            border-radius: 20px;
-            font-size: 0.8rem;
-            font-weight: 600;
-        }}
-        
-        .changes-badge.no-changes {{
-            background: #22c55e;
-        }}
-        
-        .changes-badge.medium {{
-            background: #f97316;
-        }}
-        
-        .changes-badge.high {{
-            background: #ef4444;
-        }}
-        
-        .comparison-files {{
-            color: #666;
-            font-size: 0.9rem;
-            margin-bottom: 20px;
-            line-height: 1.4;
-        }}
-        
-        .actions {{
-            display: flex;
-            gap: 10px;
-        }}
-        
-        .btn {{
-            padding: 8px 16px;
-            border: none;
-            border-radius: 8px;
-            text-decoration: none;
-            font-size: 0.9rem;
-            font-weight: 600;
-            transition: background 0.3s;
-            cursor: pointer;
-        }}
-        
-        .btn-primary {{
-            background: #667eea;
-            color: white;
-        }}
-        
-        .btn-primary:hover {{
-            background: #5a6fd8;
-        }}
-        
-        .btn-secondary {{
-            background: #f1f5f9;
-            color: #64748b;
-        }}
-        
-        .btn-secondary:hover {{
-            background: #e2e8f0;
-        }}
-        
-        .timestamp {{
-            color: #94a3b8;
-            font-size: 0.8rem;
-            margin-top: 15px;
-        }}
-        
-        .no-reports {{
-            text-align: center;
-            background: white;
-            border-radius: 15px;
-            padding: 60px;
-            color: #666;
-        }}
-        
-        .github-info {{
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 15px;
-            padding: 20px;
-            margin-top: 30px;
-            text-align: center;
-            color: white;
-        }}
-        
-        .github-info a {{
-            color: white;
-            text-decoration: none;
-            font-weight: 600;
-        }}
-    </style>
+    <title>$title</title>
+    <link rel="stylesheet" href="assets/index.css">
+    <script src="assets/index.js" defer></script>
 </head>
 <body>
     <div class="container">
@@ -254,76 +46,281 @@ def generate_index_html(results_dir: Path) -> None:
             <h1>SmartVisionQA Dashboard</h1>
             <p class="subtitle">Visual Regression Testing Reports</p>
         </div>
-        
+        $stats
+        $app
+        <div class="static-only">
+        $nav
+""")
+
+INDEX_TAIL = Template("""
+        $nav
+        </div>
+
+        <div class="github-info">
+            <p>Generated by SmartVisionQA Pipeline • 
+            <a href="https://github.com/{}/smartVisionQA">View on GitHub</a> • 
+            Updated: $updated</p>
+        </div>
+    </div>
+</body>
+</html>""")
+
+STATS_HTML = Template("""
         <div class="stats">
             <div class="stat-card">
-                <div class="stat-number">{len(reports)}</div>
+                <div class="stat-number">$total_reports</div>
                 <div class="stat-label">Total Reports</div>
             </div>
             <div class="stat-card">
-                <div class="stat-number">{sum(r['total_changes'] for r in reports)}</div>
+                <div class="stat-number">$total_changes</div>
                 <div class="stat-label">Total Changes</div>
             </div>
             <div class="stat-card">
-                <div class="stat-number">{len([r for r in reports if r['total_changes'] == 0])}</div>
+                <div class="stat-number">$identical</div>
                 <div class="stat-label">Identical Pages</div>
             </div>
             <div class="stat-card">
-                <div class="stat-number">{len([r for r in reports if r['total_changes'] > 5])}</div>
+                <div class="stat-number">$high_impact</div>
                 <div class="stat-label">High Impact</div>
             </div>
         </div>
-        
-        {_generate_reports_html(reports)}
-        
-        <div class="github-info">
-            <p>Generated by SmartVisionQA Pipeline • 
-            <a href="https://github.com/{{}}/smartVisionQA">View on GitHub</a> • 
-            Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}</p>
+""")
+
+# Lista virtual (oculta hasta que index.js carga el manifiesto)
+APP_HTML = Template("""
+        <div id="index-app" class="index-app" data-manifest="$manifest" hidden>
+            <div class="index-toolbar">
+                <input type="search" name="q" placeholder="Filter by page name...">
+                <select name="severity">
+                    <option value="">All severities</option>
+                    <option value="none">No changes</option>
+                    <option value="low">Low</option>
+                    <option value="medium">Medium</option>
+                    <option value="high">High</option>
+                </select>
+                <select name="sort">
+                    <option value="recent">Most recent</option>
+                    <option value="changes">Most changes</option>
+                    <option value="name">Name</option>
+                </select>
+                <span class="vlist-count"></span>
+            </div>
+            <div class="vlist">
+                <div class="vlist-spacer"></div>
+                <div class="vlist-items"></div>
+            </div>
         </div>
-    </div>
-</body>
-</html>"""
+""")
+
+NO_REPORTS_HTML = """
+        <div class="no-reports">
+            <h3>No reports available</h3>
+            <p>Run the pipeline to generate visual comparison reports</p>
+        </div>
+"""
+
+
+def page_filename(page: int) -> str:
+    """index.html, index-2.html, ... (junto a los reportes: los enlaces relativos valen igual)"""
+    return "index.html" if page == 1 else f"index-{page}.html"
+
+
+def generate_index_html(results_dir: Path, rebuild: bool = False, page_size: int = PAGE_SIZE) -> None:
+    """Genera las páginas del índice y index.json a partir del almacén de resúmenes"""
     
+    store = SummaryStore.for_results_dir(results_dir)
     index_path = results_dir / "index.html"
-    with open(index_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
     
-    print(f"Índice generado: {index_path}")
+    try:
+        # Primera ejecución (o --rebuild): importar los JSON existentes una sola vez
+        if rebuild or store.count() == 0:
+            _backfill_from_json(store, results_dir)
+        
+        # Con otro tamaño de página hay que repaginar aunque no haya filas nuevas
+        state = f"{store.revision()}:{page_size}"
+        if not rebuild and index_path.exists() and store.get_meta('index_revision') == state:
+            print(f"Índice al día: {index_path}")
+            return
+        
+        ensure_assets(results_dir)
+        pages, new_cards = _write_index(results_dir, store, page_size, state)
+        
+        # Solo se renderizaron las tarjetas de comparaciones nuevas o actualizadas
+        if new_cards:
+            store.set_card_html(new_cards)
+        store.set_meta('index_revision', state)
+    finally:
+        store.close()
+    
+    print(f"Índice generado: {index_path} ({pages} páginas, {len(new_cards)} tarjetas actualizadas)")
 
 
-def _generate_reports_html(reports: List[Dict]) -> str:
-    """Genera HTML para la lista de reportes"""
+def _backfill_from_json(store: SummaryStore, results_dir: Path) -> None:
+    """Importa al almacén los reportes JSON generados antes de existir el almacén"""
     
-    if not reports:
-        return """
-        <div class="no-reports">
-            <h3>No reports available</h3>
-            <p>Run the pipeline to generate visual comparison reports</p>
-        </div>
-        """
+    for json_file in results_dir.glob("comparison_*.json"):
+        try:
+            with open(json_file, 'r') as f:
+                data = json.load(f)
+            
+            # Buscar HTML correspondiente
+            html_file = json_file.with_name(
+                json_file.name.replace("comparison_", "visual_report_").replace(".json", ".html")
+            )
+            
+            store.upsert(
+                data,
+                json_file,
+                html_file if html_file.exists() else None,
+                timestamp=json_file.stat().st_mtime
+            )
+        
+        except Exception as e:
+            print(f"Error procesando {json_file}: {e}")
+
+
+@contextmanager
+def _atomic_open(path: Path) -> Iterator:
+    """Escribe en un temporal y lo mueve a `path` solo si todo fue bien"""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+class _IndexPass:
+    """Pasada única por las filas: tarjetas, estadísticas y manifiesto a la vez"""
+    
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self.stats = {"total_reports": 0, "total_changes": 0, "identical": 0, "high_impact": 0}
+        self.new_cards: Dict[str, str] = {}
+    
+    def cards(self, rows: Iterable) -> Iterator[str]:
+        for row in rows:
+            card = row['card_html']
+            if card is None:
+                card = self.new_cards[row['report_key']] = _generate_report_card(row)
+            
+            changes = row['total_changes']
+            self.stats["total_reports"] += 1
+            self.stats["total_changes"] += changes
+            self.stats["identical"] += changes == 0
+            self.stats["high_impact"] += changes > 5
+            
+            values = [row[column] for column in MANIFEST_COLUMNS]
+            values[-1] = int(values[-1])  # updated_at: el segundo basta para ordenar
+            self.manifest.write(("," if self.stats["total_reports"] > 1 else "")
+                                + json.dumps(values, ensure_ascii=False, separators=_COMPACT))
+            yield card
+
+
+def _write_index(results_dir: Path, store: SummaryStore, page_size: int, version: str):
+    """Escribe las páginas y el manifiesto en streaming. Devuelve (páginas, tarjetas nuevas)"""
     
-    reports_html = """<div class="reports-grid">"""
+    pages = max(1, math.ceil(store.report_count() / page_size))
+    updated = datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')
+    rows = store.iter_rows()
     
-    for report in reports:
-        # Determinar severidad
-        changes = report['total_changes']
-        if changes == 0:
-            badge_class = "no-changes"
-            badge_text = "No Changes"
-        elif changes <= 2:
-            badge_class = ""
-            badge_text = f"{changes} Changes"
-        elif changes <= 5:
-            badge_class = "medium"
-            badge_text = f"{changes} Changes"
+    def chunk(page: int):
+        # La última página se lleva lo que quede por si entraron filas tras el COUNT
+        return islice(rows, page_size) if page < pages else rows
+    
+    with _atomic_open(results_dir / MANIFEST_NAME) as manifest:
+        manifest.write(f'{{"version":1,"columns":{json.dumps(MANIFEST_COLUMNS, separators=_COMPACT)},"rows":[')
+        index_pass = _IndexPass(manifest)
+        
+        # La primera página lleva las estadísticas: se escribe al final
+        first_page = list(index_pass.cards(chunk(1)))
+        for page in range(2, pages + 1):
+            with _atomic_open(results_dir / page_filename(page)) as f:
+                nav = _pagination_html(page, pages)
+                f.write(INDEX_HEAD.substitute(title=f"SmartVisionQA - Reports ({page}/{pages})",
+                                              stats="", app="", nav=nav))
+                f.write('<div class="reports-grid">')
+                for card in index_pass.cards(chunk(page)):
+                    f.write(card)
+                f.write('</div>')
+                f.write(INDEX_TAIL.substitute(nav=nav, updated=updated))
+        
+        stats = index_pass.stats
+        manifest.write(f'],"stats":{json.dumps(stats, separators=_COMPACT)},"pages":{pages},"page_size":{page_size},'
+                       f'"generated_at":{json.dumps(updated)}}}')
+    
+    with _atomic_open(results_dir / page_filename(1)) as f:
+        nav = _pagination_html(1, pages)
+        f.write(INDEX_HEAD.substitute(
+            title="SmartVisionQA - Reports Dashboard",
+            stats=STATS_HTML.substitute(stats),
+            app=APP_HTML.substitute(manifest=f"{MANIFEST_NAME}?v={version}") if first_page else "",
+            nav=nav,
+        ))
+        if first_page:
+            f.write('<div class="reports-grid">' + "".join(first_page) + '</div>')
         else:
-            badge_class = "high"
-            badge_text = f"{changes} Changes"
-        
-        timestamp = datetime.fromtimestamp(report['timestamp']).strftime('%Y-%m-%d %H:%M')
-        
-        reports_html += f"""
+            f.write(NO_REPORTS_HTML)
+        f.write(INDEX_TAIL.substitute(nav=nav, updated=updated))
+    
+    _remove_stale_pages(results_dir, pages)
+    return pages, index_pass.new_cards
+
+
+def _remove_stale_pages(results_dir: Path, pages: int) -> None:
+    """Borra las páginas sobrantes de un índice anterior con más páginas"""
+    for path in results_dir.glob("index-*.html"):
+        number = path.stem[len("index-"):]
+        if number.isdigit() and int(number) > pages:
+            path.unlink(missing_ok=True)
+
+
+def _pagination_html(page: int, pages: int) -> str:
+    """Anterior / siguiente y los números cercanos (más la primera y la última)"""
+    
+    if pages <= 1:
+        return ""
+    
+    links = []
+    if page > 1:
+        links.append(f'<a href="{page_filename(page - 1)}">&laquo; Prev</a>')
+    shown = sorted({1, pages, *range(max(1, page - 2), min(pages, page + 2) + 1)})
+    previous = 0
+    for number in shown:
+        if number > previous + 1:
+            links.append('<span>&hellip;</span>')
+        if number == page:
+            links.append(f'<span class="current">{number}</span>')
+        else:
+            links.append(f'<a href="{page_filename(number)}">{number}</a>')
+        previous = number
+    if page < pages:
+        links.append(f'<a href="{page_filename(page + 1)}">Next &raquo;</a>')
+    return f'<nav class="pagination">{"".join(links)}</nav>'
+
+
+def _generate_report_card(report) -> str:
+    """Genera HTML para la tarjeta de un reporte"""
+    
+    # Determinar severidad
+    changes = report['total_changes']
+    if changes == 0:
+        badge_class = "no-changes"
+        badge_text = "No Changes"
+    elif changes <= 2:
+        badge_class = ""
+        badge_text = f"{changes} Changes"
+    elif changes <= 5:
+        badge_class = "medium"
+        badge_text = f"{changes} Changes"
+    else:
+        badge_class = "high"
+        badge_text = f"{changes} Changes"
+    
+    timestamp = datetime.fromtimestamp(report['updated_at']).strftime('%Y-%m-%d %H:%M')
+    
+    return f"""
         <div class="report-card">
             <div class="report-header">
                 <div class="comparison-title">Visual Comparison</div>
@@ -340,15 +337,18 @@ def _generate_reports_html(reports: List[Dict]) -> str:
             <div class="timestamp">Generated: {timestamp}</div>
         </div>
         """
-    
-    reports_html += """</div>"""
-    return reports_html
 
 
 def main():
-    results_dir = Path("results")
-    results_dir.mkdir(exist_ok=True)
-    generate_index_html(results_dir)
+    parser = argparse.ArgumentParser(description="Genera results/index.html desde el almacén de resúmenes")
+    parser.add_argument("--results-dir", type=Path, default=Path("results"))
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Reimportar todos los comparison_*.json y regenerar todas las tarjetas")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="Tarjetas por página del índice")
+    args = parser.parse_args()
+    
+    args.results_dir.mkdir(exist_ok=True)
+    generate_index_html(args.results_dir, rebuild=args.rebuild, page_size=args.page_size)
 
 
 if __name__ == "__main__":
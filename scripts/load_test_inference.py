@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del backend de inferencia (Ollama)
+Reproduce las peticiones reales de compare_images (capturas de demo preparadas
+igual que VisionAnalyzer) contra un endpoint con concurrencia creciente, mide
+throughput y percentiles de latencia, dibuja las curvas y registra el punto de
+saturación (knee) que usan --max-in-flight y --autotune
+"""
+
+import argparse
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image
+
+from benchmark_strategies import load_screenshots
+from cli import DEFAULT_MODEL, DEMO_TEST_CASES
+from image_ops import STRATEGIES, compose, crop_band, diff_bbox
+from inference_limits import DEFAULT_LIMITS_FILE, host_key, record_measurement
+from smartVisionQA import comparison_prompt
+
+# Mejora mínima de throughput para que un nivel de concurrencia merezca la pena
+KNEE_GAIN = 0.10
+
+
+def build_payloads(shots: Dict[str, bytes], strategy: str) -> List[List[bytes]]:
+    """Imágenes de cada par de demo tal como las envía compare_images"""
+    payloads = []
+    for v1, v2 in DEMO_TEST_CASES:
+        img1 = Image.open(io.BytesIO(shots[v1])).convert('RGB')
+        img2 = Image.open(io.BytesIO(shots[v2])).convert('RGB')
+        bbox = diff_bbox(img1, img2)
+        if bbox is None:
+            continue
+        img1, img2, _ = crop_band(img1, img2, bbox)
+        images = []
+        for image in compose(img1, img2, strategy):
+            buffer = io.BytesIO()
+            image.save(buffer, format='PNG')
+            images.append(buffer.getvalue())
+        payloads.append(images)
+    return payloads
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_level(client, model: str, prompt: str, payloads: List[List[bytes]],
+              concurrency: int, requests: int, num_predict: int) -> Dict:
+    """Bucle cerrado: `concurrency` clientes lanzan peticiones hasta completar `requests`"""
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        nonlocal errors
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            start = time.perf_counter()
+            try:
+                client.generate(model=model, prompt=prompt, images=payloads[index % len(payloads)],
+                                stream=False, options={"num_predict": num_predict})
+            except Exception:
+                with lock:
+                    errors += 1
+                continue
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    wall = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rpm": len(latencies) / wall * 60 if wall else 0.0,
+        "p50_ms": percentile(latencies, 0.50) if latencies else None,
+        "p95_ms": percentile(latencies, 0.95) if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) if latencies else None,
+    }
+
+
+def find_knee(levels: List[Dict], gain: float = KNEE_GAIN) -> int:
+    """Mayor concurrencia sin errores cuyo throughput aún mejoró al menos `gain`
+    respecto al nivel anterior; a partir de ahí solo crece la latencia"""
+    knee = levels[0]["concurrency"]
+    for previous, current in zip(levels, levels[1:]):
+        if current["errors"] or current["throughput_rpm"] < previous["throughput_rpm"] * (1 + gain):
+            break
+        knee = current["concurrency"]
+    return knee
+
+
+def _ms(value: float) -> str:
+    return f"{value:9.0f}" if value is not None else f"{'-':>9s}"
+
+
+def write_svg(levels: List[Dict], knee: int, path: Path) -> None:
+    """Throughput (eje izquierdo) y p50/p95/p99 (eje derecho) frente a la concurrencia"""
+    width, height, pad = 720, 360, 56
+    xs = [level["concurrency"] for level in levels]
+    max_rpm = max(level["throughput_rpm"] for level in levels) or 1
+    max_ms = max((level["p99_ms"] or 0) for level in levels) or 1
+
+    def x(value):
+        return pad + (xs.index(value) / max(1, len(xs) - 1)) * (width - 2 * pad)
+
+    def y(value, top):
+        return height - pad - (value / top) * (height - 2 * pad)
+
+    lines = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'font-family="sans-serif" font-size="12">',
+             f'<rect width="{width}" height="{height}" fill="white"/>',
+             f'<line x1="{pad}" y1="{height - pad}" x2="{width - pad}" y2="{height - pad}" stroke="#999"/>']
+    series = [("throughput_rpm", "#2563eb", max_rpm, "req/min"), ("p50_ms", "#16a34a", max_ms, "p50 ms"),
+              ("p95_ms", "#f59e0b", max_ms, "p95 ms"), ("p99_ms", "#dc2626", max_ms, "p99 ms")]
+    for index, (key, color, top, label) in enumerate(series):
+        points = " ".join(f"{x(level['concurrency']):.1f},{y(level[key] or 0, top):.1f}" for level in levels)
+        lines.append(f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="2"/>')
+        lines.append(f'<text x="{pad + index * 110}" y="20" fill="{color}">{label}</text>')
+    for value in xs:
+        lines.append(f'<text x="{x(value):.1f}" y="{height - pad + 18}" text-anchor="middle">{value}</text>')
+    lines.append(f'<line x1="{x(knee):.1f}" y1="{pad}" x2="{x(knee):.1f}" y2="{height - pad}" '
+                 f'stroke="#111" stroke-dasharray="4 4"/>')
+    lines.append(f'<text x="{x(knee) + 4:.1f}" y="{pad + 12}">knee = {knee}</text>')
+    lines.append(f'<text x="{pad}" y="{height - 12}">max {max_rpm:.1f} req/min, max p99 {max_ms:.0f} ms</text>')
+    lines.append('</svg>')
+    path.write_text("\n".join(lines), encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del backend de inferencia")
+    parser.add_argument("--demo-dir", type=Path, default=Path("demo"))
+    parser.add_argument("--screenshots", type=Path, default=None,
+                        help="Directorio con <pagina>_screenshot.png ya generadas (p. ej. results)")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--strategy", choices=STRATEGIES, default="stack")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="Concurrencias a probar, en orden creciente")
+    parser.add_argument("--requests", type=int, default=None,
+                        help="Peticiones por nivel (por defecto: max(6, 3 x concurrencia))")
+    parser.add_argument("--num-predict", type=int, default=256, help="Límite de tokens generados por petición")
+    parser.add_argument("--plot", type=Path, default=Path("load_test.svg"), help="Gráfica SVG de salida")
+    parser.add_argument("--limits-file", type=Path, default=DEFAULT_LIMITS_FILE,
+                        help="Donde se registra el knee por host y modelo")
+    parser.add_argument("--no-record", action="store_true", help="No actualizar --limits-file")
+    args = parser.parse_args()
+
+    import ollama
+    client = ollama.Client(host=args.host)
+    try:
+        client.show(args.model)
+    except Exception as e:
+        print(f"Ollama no disponible en {host_key(args.host)}: {e}")
+        sys.exit(1)
+
+    names = sorted({name for pair in DEMO_TEST_CASES for name in pair})
+    payloads = build_payloads(load_screenshots(names, args.demo_dir, args.screenshots), args.strategy)
+    prompt = comparison_prompt(args.strategy)
+
+    # Calentamiento: la primera petición incluye la carga del modelo
+    client.generate(model=args.model, prompt=prompt, images=payloads[0], stream=False,
+                    options={"num_predict": args.num_predict})
+
+    print(f"{'conc':>5s} {'req':>5s} {'err':>4s} {'req/min':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    levels = []
+    for concurrency in sorted(set(args.levels)):
+        requests = args.requests or max(6, 3 * concurrency)
+        level = run_level(client, args.model, prompt, payloads, concurrency, requests, args.num_predict)
+        levels.append(level)
+        print(f"{concurrency:5d} {requests:5d} {level['errors']:4d} {level['throughput_rpm']:9.2f} "
+              f"{_ms(level['p50_ms'])} {_ms(level['p95_ms'])} {_ms(level['p99_ms'])}")
+        if level['errors'] == requests:
+            break
+
+    knee = find_knee(levels)
+    knee_level = next(level for level in levels if level["concurrency"] == knee)
+    print(f"\nKnee: {knee} en vuelo ({knee_level['throughput_rpm']:.2f} req/min, p95 {_ms(knee_level['p95_ms']).strip()} ms)")
+
+    write_svg(levels, knee, args.plot)
+    print(f"Gráfica: {args.plot}")
+    if not args.no_record:
+        record_measurement(args.limits_file, args.host, args.model,
+                           {"knee": knee, "strategy": args.strategy, "levels": levels})
+        print(f"Registrado en {args.limits_file} para {host_key(args.host)} / {args.model}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Servidor Ollama simulado para pruebas locales
+Responde /api/generate, /api/show y /api/tags con respuestas fijas (un JSON de
+cambios con las claves que pide COMPARISON_PROMPT), con latencia y tasa de
+errores configurables. Permite probar el servicio (cli.py serve), el modo watch
+o la prueba de carga sin GPU ni modelo:
+
+    python scripts/mock_ollama.py --port 11435 --latency 0.5
+    OLLAMA_HOST=http://127.0.0.1:11435 python cli.py serve --demo-dir demo
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_PORT = 11435
+
+MOCK_RESPONSE = {
+    "layout_changes": [],
+    "text_changes": ["V1 has the original title, V2 has a different title (mock)"],
+    "style_changes": ["V1 has a blue header, V2 has a purple header (mock)"],
+    "element_changes": [],
+}
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    server_version = "MockOllama"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status: int, data: dict) -> None:
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _show_response(self) -> dict:
+        """Todos los campos de ShowResponse: los clientes recientes exigen model_info"""
+        return {
+            "modified_at": datetime.now(timezone.utc).isoformat(),
+            "modelfile": f"FROM {self.server.model}\n",
+            "parameters": "",
+            "template": "{{ .Prompt }}",
+            "license": "",
+            "details": {
+                "parent_model": "",
+                "format": "gguf",
+                "family": "mock",
+                "families": ["mock", "clip"],
+                "parameter_size": "0B",
+                "quantization_level": "F16",
+            },
+            "model_info": {},
+            "capabilities": ["completion", "vision"],
+        }
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._json(200, {"models": [{"name": self.server.model, "model": self.server.model}]})
+        elif self.path in ("/", "/api/version"):
+            self._json(200, {"version": "mock"})
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if self.path == "/api/show":
+            self._json(200, self._show_response())
+            return
+        if self.path != "/api/generate":
+            self._json(404, {"error": "not found"})
+            return
+
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            images = request.get("images") or []
+            # Un prompt vacío solo carga el modelo (ver VisionAnalyzer.warm_up)
+            if request.get("prompt"):
+                time.sleep(self.server.latency * (1 + 0.5 * len(images)))
+            if random.random() < self.server.fail_rate:
+                self._json(500, {"error": "mock: fallo simulado"})
+                return
+            response = json.dumps(MOCK_RESPONSE, ensure_ascii=False) if request.get("prompt") else ""
+            self._json(200, {
+                "model": request.get("model", self.server.model),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "response": response,
+                "done": True,
+                "done_reason": "stop",
+                "prompt_eval_count": 64 + 256 * len(images),
+                "eval_count": len(response) // 4,
+                "total_duration": int(self.server.latency * 1e9),
+            })
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+
+def create_server(host: str = "127.0.0.1", port: int = DEFAULT_PORT, latency: float = 0.2,
+                  fail_rate: float = 0.0, model: str = "mock") -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), MockOllamaHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.fail_rate = fail_rate
+    server.model = model
+    server.lock = threading.Lock()
+    server.requests = server.in_flight = server.max_in_flight = 0
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Ollama simulado")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.2,
+                        help="Segundos por petición (más un 50%% por imagen)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fracción de peticiones que devuelven 500")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.latency, args.fail_rate)
+    print(f"Ollama simulado en http://{args.host}:{args.port} (latencia {args.latency}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{server.requests} peticiones, máximo {server.max_in_flight} en vuelo")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
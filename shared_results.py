@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Directorios de resultados compartidos entre máquinas
+Con la cola distribuida (work_queue.py) los workers de varios hosts escriben en
+el mismo results_dir. WAL necesita memoria compartida entre todos los procesos
+que abren la base, y eso no existe entre máquinas: las bases SQLite de un
+results_dir marcado como compartido usan el journal de rollback, igual que la
+propia cola
+"""
+
+from pathlib import Path
+
+
+# Fichero que marca un results_dir como compartido (lo crean los comandos `queue`)
+SHARED_MARKER = ".shared-results"
+
+
+def mark_shared(results_dir: Path) -> None:
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    (results_dir / SHARED_MARKER).touch()
+
+
+def journal_mode(results_dir: Path) -> str:
+    """Modo de journal para las bases de `results_dir`: WAL en local, DELETE si es compartido.
+    El modo queda guardado en la base, así que cualquier proceso que la abra debe elegir el mismo."""
+    return "DELETE" if (Path(results_dir) / SHARED_MARKER).exists() else "WAL"
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Agrupación de peticiones idénticas en vuelo (single-flight)
+Si varias comparaciones (o clientes del servicio) piden a la vez la misma
+captura o el mismo análisis, solo la primera hace el trabajo: las demás esperan
+a esa misma tarea. No es una caché: al terminar la tarea la clave se olvida
+"""
+
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """Una tarea en vuelo por (tipo, clave). `stats()` cuenta las ejecutadas y las agrupadas."""
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple, asyncio.Future] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    async def do(self, kind: str, key: str, factory: Callable[[], Awaitable],
+                 share: Callable[[Any], Any] = copy.deepcopy) -> Any:
+        """Resultado de `factory()`, o el de la tarea idéntica ya en vuelo.
+
+        Cada llamante recibe `share(resultado)` (por defecto una copia profunda)
+        para que nadie modifique el resultado de otro. Cancelar a un llamante no
+        cancela la tarea compartida.
+        """
+        # Las futures pertenecen a un event loop: el mismo objeto puede usarse en varios asyncio.run()
+        flight = (id(asyncio.get_running_loop()), kind, key)
+        counts = self._counts.setdefault(kind, {"executed": 0, "coalesced": 0})
+        future = self._in_flight.get(flight)
+        if future is None:
+            counts["executed"] += 1
+            future = self._in_flight[flight] = asyncio.ensure_future(factory())
+            future.add_done_callback(lambda done: self._forget(flight, done))
+        else:
+            counts["coalesced"] += 1
+        return share(await asyncio.shield(future))
+
+    def _forget(self, flight: Tuple, future: asyncio.Future) -> None:
+        if self._in_flight.get(flight) is future:
+            del self._in_flight[flight]
+        if not future.cancelled():
+            future.exception()  # recuperada aquí si ningún llamante la espera ya
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {kind: dict(counts) for kind, counts in self._counts.items()}
@@ -5,81 +5,188 @@ smartVisionQA - Visual QA Testing with Ollama
 
 import asyncio
 import base64
+import hashlib
 import json
 import os
+import sys
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 
-import ollama
-from playwright.async_api import async_playwright
-from PIL import Image
 import io
-from generate_html_report import generate_from_json
+from artifact_store import ArtifactStore
+from artifact_writer import ArtifactWriter
+from component_cache import ComponentCache, capture_component_boxes
+from dom_snapshot import capture_dom_snapshot, diff_snapshots, merge_differences
+from dynamic_masks import capture_mask_boxes, unmasked_snapshot, varying_regions
+from generate_html_report import render_from_results, report_stem, safe_name
+from inference_limits import limiter_for_host
+from inference_profiles import InferenceProfile, get_profile
+from network_cache import NetworkCache
+from page_readiness import ReadinessConfig, wait_until_ready
+from request_routing import RequestRouter, RoutingPolicy
+from run_history import RunHistory
+from run_journal import RunJournal
+from single_flight import SingleFlight
+from summary_store import SummaryStore
+from watch_mode import page_version
+
+# ollama, playwright y PIL (y image_ops/thumbnails, que dependen de PIL) se importan
+# en las clases que los usan: regenerar reportes o el índice no carga esas pilas.
+if TYPE_CHECKING:
+    from image_ops import ImageWorkPool
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _json_bytes(obj) -> bytes:
+    return json.dumps(obj, indent=2).encode('utf-8')
+
+
+def _share_capture(result: Tuple[bytes, Dict]) -> Tuple[bytes, Dict]:
+    # Los bytes de la captura son inmutables; el diccionario se copia para cada comparación
+    screenshot, capture = result
+    return screenshot, dict(capture)
 
 
 class HTMLRenderer:
     """Renderiza HTML a imágenes usando Playwright"""
     
-    async def html_to_image(self, html_path: Path, output_path: Path = None) -> bytes:
+    def __init__(self, readiness: ReadinessConfig = None, network_cache: NetworkCache = None,
+                 routing: RoutingPolicy = None, dom_snapshot: bool = False,
+                 components: Dict[str, str] = None, masks: List[str] = None, auto_mask: int = 0):
+        self.readiness = readiness or ReadinessConfig()
+        self.network_cache = network_cache  # opcional: record-and-replay de la red
+        self.routing = routing  # opcional: bloqueo, stubs y límite de tamaño
+        self.dom_snapshot = dom_snapshot  # opcional: snapshot del DOM en last_capture["dom"]
+        self.components = components  # opcional: {nombre: selector}; cajas en last_capture["components"]
+        # Zonas dinámicas: selectores CSS y/o K renders de la misma página; cajas en last_capture["masks"]
+        self.masks = masks
+        self.auto_mask = auto_mask
+        self.last_capture: Dict = {}
+        self._playwright = None
+        self._browser = None  # navegador caliente; ver start()
+    
+    async def start(self) -> "HTMLRenderer":
+        """Arranca un navegador que se reutiliza en todas las capturas hasta close().
+        Cada captura usa su propio contexto (cookies, caché y almacenamiento aislados)."""
+        if self._browser is None:
+            from playwright.async_api import async_playwright
+            
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+        return self
+    
+    async def close(self) -> None:
+        if self._browser is not None:
+            await self._browser.close()
+            await self._playwright.stop()
+            self._browser = self._playwright = None
+    
+    @asynccontextmanager
+    async def _page(self):
+        """Página nueva en el navegador caliente o, sin start(), en un navegador propio"""
+        if self._browser is not None:
+            context = await self._browser.new_context()
+            try:
+                yield await context.new_page()
+            finally:
+                await context.close()
+            return
+        
+        from playwright.async_api import async_playwright
+        
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
+            try:
+                yield await browser.new_page()
+            finally:
+                await browser.close()
+    
+    async def _inspect(self, page, capture: Dict) -> None:
+        """Snapshot del DOM y cajas de componentes y máscaras, si están activados"""
+        if self.dom_snapshot:
+            capture["dom"] = await capture_dom_snapshot(page)
+        if self.components:
+            capture["components"] = await capture_component_boxes(page, self.components)
+        if self.masks:
+            capture["masks"] = await capture_mask_boxes(page, self.masks)
+    
+    async def _auto_mask(self, page, screenshot: bytes, capture: Dict, settle) -> None:
+        """Auto-máscara: recarga la página hasta tener `auto_mask` capturas y añade a
+        capture["masks"] las zonas que varían entre ellas. `settle()` espera a que
+        la página recargada esté lista, como en la primera captura."""
+        if self.auto_mask < 2:
+            return
+        start = time.perf_counter()
+        screenshots = [screenshot]
+        for _ in range(self.auto_mask - 1):
+            await page.reload(wait_until="load")
+            await settle()
+            screenshots.append(await page.screenshot(full_page=True))
+        regions = await asyncio.to_thread(varying_regions, screenshots)
+        capture["masks"] = [*capture.get("masks", []), *regions]
+        capture["auto_mask"] = {"renders": len(screenshots), "regions": len(regions), "ms": _elapsed_ms(start)}
+    
+    async def html_to_image(self, html_path: Path, output_path: Path = None) -> bytes:
+        async with self._page() as page:
             file_url = f"file://{html_path.absolute()}"
             await page.goto(file_url)
             await page.wait_for_load_state("networkidle")
             
+            capture = {}
+            await self._inspect(page, capture)
             screenshot = await page.screenshot(full_page=True)
-            await browser.close()
-            
-            if output_path:
-                output_path.write_bytes(screenshot)
-            
-            return screenshot
+            await self._auto_mask(page, screenshot, capture, lambda: page.wait_for_load_state("networkidle"))
+        
+        if output_path:
+            await asyncio.to_thread(output_path.write_bytes, screenshot)
+        
+        self.last_capture = capture
+        return screenshot
     
     async def url_to_image(self, url: str, output_path: Path = None) -> bytes:
         """Captura una URL como imagen"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+        async with self._page() as page:
+            cache_session = self.network_cache.session(url) if self.network_cache else None
+            router = None
+            if self.routing or cache_session:
+                router = RequestRouter(self.routing, cache_session, page.request)
+                await page.route("**/*", router.handle)
+                page.on("requestfinished", router.on_request_finished)
             
-            await page.goto(url, wait_until="networkidle")
-            await page.wait_for_timeout(2000)
+            # Esperar señales reales (fuentes, imágenes, layout estable) en lugar de un sleep fijo
+            await page.goto(url, wait_until="load")
+            capture = {"url": url, "readiness": await wait_until_ready(page, self.readiness)}
+            await self._inspect(page, capture)
             
             screenshot = await page.screenshot(full_page=True)
-            await browser.close()
-            
-            if output_path:
-                output_path.write_bytes(screenshot)
-            
-            return screenshot
-
-class VisionAnalyzer:
-    """Analiza y compara imágenes usando Ollama. El modelo más eficaz de los que he probado para imagenes es qwen2.5vl:7b"""
-    # tested models: gemma3:4b | gemma3:12b | llava:7b | qwen2.5vl:7b
-    def __init__(self, model: str = "qwen2.5vl:7b"):
-        self.model = model
-        self.client = ollama.Client()
+            await self._auto_mask(page, screenshot, capture, lambda: wait_until_ready(page, self.readiness))
         
-    def encode_image(self, image_bytes: bytes) -> str:
-        return base64.b64encode(image_bytes).decode('utf-8')
-    
-    def analyze_single(self, image_bytes: bytes) -> str:
-        prompt = "Describe the visual elements in this webpage: layout, colors, text, and components."
+        if router:
+            capture["routing"] = router.report()
+        if cache_session:
+            cache_session.save()
+            capture["network_cache"] = cache_session.stats
         
-        response = self.client.generate(
-            model=self.model,
-            prompt=prompt,
-            images=[image_bytes],
-            stream=False
-        )
+        if output_path:
+            await asyncio.to_thread(output_path.write_bytes, screenshot)
         
-        return response['response']
-    
-    def compare_images(self, img1_bytes: bytes, img2_bytes: bytes) -> Dict:
-        prompt = """You are analyzing two versions of a webpage: VERSION 1 (V1) vs VERSION 2 (V2).
+        # Asignado sin awaits posteriores: el llamador lo lee antes de que otra tarea lo cambie
+        self.last_capture = capture
+        return screenshot
+
+COMPARISON_PROMPT = """You are analyzing two versions of a webpage: VERSION 1 (V1) vs VERSION 2 (V2).
 
         V1 is the FIRST/ORIGINAL version, V2 is the SECOND/UPDATED version.
+        {layout}
         
         Compare V1 against V2 and identify ONLY actual visual differences. Be precise and specific.
         
@@ -98,30 +205,202 @@ class VisionAnalyzer:
         
         Format response as valid JSON with keys: layout_changes, text_changes, style_changes, element_changes
         Each should contain an array of specific change descriptions."""
+
+# Cómo se presentan V1 y V2 en cada estrategia de composición (ver image_ops.compose)
+STRATEGY_LAYOUTS = {
+    "stack": "The image shows V1 on top and V2 below it.",
+    "side_by_side": "The image shows V1 on the left and V2 on the right, separated by a gray bar.",
+    "separate": "The first image is V1 and the second image is V2.",
+    "overlay": "The image shows V2. Regions tinted red are the pixels that differ from V1; "
+               "infer what V1 had there from context.",
+}
+
+
+# Se añade cuando las imágenes llevan zonas enmascaradas (ver dynamic_masks.py)
+MASKED_NOTE = "Solid gray rectangles are masked dynamic content (dates, ads, carousels); ignore them."
+
+
+def comparison_prompt(strategy: str = "stack", masked: bool = False) -> str:
+    layout = STRATEGY_LAYOUTS[strategy]
+    return COMPARISON_PROMPT.replace("{layout}", f"{layout} {MASKED_NOTE}" if masked else layout)
+
+
+class VisionAnalyzer:
+    """Analiza y compara imágenes usando Ollama. El modelo más eficaz de los que he probado para imagenes es qwen2.5vl:7b"""
+    # tested models: gemma3:4b | gemma3:12b | llava:7b | qwen2.5vl:7b
+    def __init__(self, model: str = "qwen2.5vl:7b", host: str = None,
+                 image_pool: "ImageWorkPool" = None, crop_to_changes: bool = True,
+                 strategy: str = "stack", max_in_flight: int = None, autotune: bool = False,
+                 profile: Union[str, InferenceProfile] = "default", keep_alive: Union[str, float] = None):
+        import ollama
         
-        # Crear imagen combinada para comparación
-        img1 = Image.open(io.BytesIO(img1_bytes))
-        img2 = Image.open(io.BytesIO(img2_bytes))
-        
-        # Redimensionar si es necesario
-        max_width = max(img1.width, img2.width)
-        total_height = img1.height + img2.height
+        if strategy not in STRATEGY_LAYOUTS:
+            raise ValueError(f"Estrategia desconocida: {strategy} (opciones: {', '.join(STRATEGY_LAYOUTS)})")
+        self.model = model
+        self.host = host  # endpoint de Ollama; None usa OLLAMA_HOST o localhost
+        self.client = ollama.Client(host=host)
+        self.image_pool = image_pool  # opcional: preparación de imágenes en otro proceso
+        self.crop_to_changes = crop_to_changes
+        self.strategy = strategy  # composición de V1/V2 enviada al modelo
+        # Opciones de generación y resolución de imagen (ver inference_profiles.py)
+        self.profile = get_profile(profile) if isinstance(profile, str) else profile
+        self.options = self.profile.options(host)
+        self.keep_alive = keep_alive  # cuánto mantiene Ollama el modelo cargado (p. ej. "30m"); None: servidor
+        # Llamadas en vuelo contra el host: límite fijo, AIMD (autotune) o sin límite.
+        # El limitador se comparte entre los analizadores del proceso con el mismo host.
+        self.limiter = None
+        if max_in_flight or autotune:
+            self.limiter = limiter_for_host(host, initial=max_in_flight or 1, adaptive=autotune)
+        # Análisis idénticos simultáneos (mismas imágenes y opciones) comparten una llamada
+        self.single_flight = SingleFlight()
         
-        combined = Image.new('RGB', (max_width, total_height))
-        combined.paste(img1, (0, 0))
-        combined.paste(img2, (0, img1.height))
+    def warm_up(self) -> float:
+        """Carga el modelo en Ollama sin generar nada (prompt vacío). Devuelve los ms empleados."""
+        start = time.perf_counter()
+        self.client.generate(model=self.model, prompt="", options=self.options or None, keep_alive=self.keep_alive)
+        return _elapsed_ms(start)
+    
+    def encode_image(self, image_bytes: bytes) -> str:
+        return base64.b64encode(image_bytes).decode('utf-8')
+    
+    def analyze_single(self, image_bytes: bytes) -> str:
+        prompt = "Describe the visual elements in this webpage: layout, colors, text, and components."
         
-        # Convertir a bytes
-        buffer = io.BytesIO()
-        combined.save(buffer, format='PNG')
-        combined_bytes = buffer.getvalue()
+        if self.profile.max_image_width:
+            from PIL import Image
+            from image_ops import limit_width
+            
+            image = Image.open(io.BytesIO(image_bytes))
+            if image.width > self.profile.max_image_width:
+                buffer = io.BytesIO()
+                limit_width(image.convert('RGB'), self.profile.max_image_width).save(buffer, format='PNG')
+                image_bytes = buffer.getvalue()
         
         response = self.client.generate(
             model=self.model,
             prompt=prompt,
-            images=[combined_bytes],
-            stream=False
+            images=[image_bytes],
+            stream=False,
+            options=self.options or None,
+            keep_alive=self.keep_alive
+        )
+        
+        return response['response']
+    
+    def compare_images(self, img1_bytes: bytes, img2_bytes: bytes) -> Dict:
+        return self.compare_images_detailed(img1_bytes, img2_bytes)[0]
+    
+    def compare_images_detailed(self, img1_bytes: bytes, img2_bytes: bytes,
+                                regions: Dict = None) -> Tuple[Dict, Dict]:
+        """Compara en este proceso. Devuelve (diferencias, métricas del análisis).
+        Con `regions` solo se consideran los píxeles que el diff estructural no explica
+        y que no están enmascarados ("masked")."""
+        from PIL import Image
+        from image_ops import compose, crop_band, diff_bbox, limit_width, mask_regions
+        
+        img1 = Image.open(io.BytesIO(img1_bytes)).convert('RGB')
+        img2 = Image.open(io.BytesIO(img2_bytes)).convert('RGB')
+        masked = bool(regions and regions.get("masked"))
+        if masked:
+            mask_regions(img1, img2, regions["masked"])
+        
+        # Sin píxeles distintos (o sin diferencias residuales) no hace falta consultar al modelo
+        bbox = diff_bbox(img1, img2, regions)
+        if bbox is None:
+            return self._no_changes(), {"strategy": self.strategy, "identical": True}
+        
+        cropped = False
+        if self.crop_to_changes:
+            img1, img2, cropped = crop_band(img1, img2, bbox)
+        max_width = self.profile.max_image_width
+        img1, img2 = limit_width(img1, max_width), limit_width(img2, max_width)
+        
+        images = []
+        for image in compose(img1, img2, self.strategy):
+            buffer = io.BytesIO()
+            image.save(buffer, format='PNG')
+            images.append((buffer.getvalue(), image.size))
+        
+        result, usage = self._generate_comparison([data for data, _ in images], masked)
+        return result, {"strategy": self.strategy, "profile": self.profile.name, "identical": False,
+                        "cropped": cropped, "bbox": list(bbox), "sizes": [list(size) for _, size in images],
+                        **usage}
+    
+    async def compare_images_async(self, image1: Union[bytes, Path], image2: Union[bytes, Path]) -> Dict:
+        return (await self.compare_images_async_detailed(image1, image2))[0]
+    
+    async def compare_images_async_detailed(self, image1: Union[bytes, Path], image2: Union[bytes, Path],
+                                            regions: Dict = None) -> Tuple[Dict, Dict]:
+        """Como compare_images_detailed, pero la preparación de la imagen se hace en el
+        pool de procesos y la llamada al modelo en un hilo, sin bloquear el event loop.
+        Las llamadas simultáneas con el mismo contenido y opciones se agrupan en una."""
+        digests = [_sha256(img.read_bytes() if isinstance(img, Path) else img) for img in (image1, image2)]
+        key = json.dumps([self.model, self.strategy, self.profile.name, self.crop_to_changes, regions, digests])
+        return await self.single_flight.do("analysis", key,
+                                           lambda: self._compare_images_async(image1, image2, regions))
+    
+    async def _compare_images_async(self, image1: Union[bytes, Path], image2: Union[bytes, Path],
+                                    regions: Dict = None) -> Tuple[Dict, Dict]:
+        if self.image_pool is None:
+            image1, image2 = [Path(img).read_bytes() if isinstance(img, Path) else img for img in (image1, image2)]
+            return await self._run_model(self.compare_images_detailed, image1, image2, regions)
+        
+        prepared = await self.image_pool.prepare_comparison(image1, image2, crop=self.crop_to_changes,
+                                                            strategy=self.strategy, regions=regions,
+                                                            max_width=self.profile.max_image_width)
+        if prepared["identical"]:
+            return self._no_changes(), {"strategy": self.strategy, "identical": True}
+        
+        paths = [Path(path) for path in prepared["paths"]]
+        try:
+            # Ollama acepta rutas: las imágenes compuestas no pasan por la memoria de este proceso
+            result, usage = await self._run_model(self._generate_comparison, paths,
+                                                  bool(regions and regions.get("masked")))
+        finally:
+            for path in paths:
+                path.unlink(missing_ok=True)
+        return result, {"strategy": self.strategy, "profile": self.profile.name, "identical": False,
+                        "cropped": prepared["cropped"],
+                        "bbox": prepared["bbox"], "sizes": prepared["sizes"], **usage}
+    
+    async def _run_model(self, func, *args) -> Tuple[Dict, Dict]:
+        """Ejecuta en un hilo una llamada que consulta al modelo, dentro del límite
+        de llamadas en vuelo del host. Añade la espera y el límite a las métricas."""
+        loop = asyncio.get_running_loop()
+        if self.limiter is None:
+            return await loop.run_in_executor(None, func, *args)
+        async with self.limiter.slot() as queue_ms:
+            try:
+                result, usage = await loop.run_in_executor(None, func, *args)
+            except Exception:
+                self.limiter.on_failure()
+                raise
+            if usage.get('model_ms') is not None:
+                tokens = (usage.get('prompt_tokens') or 0) + (usage.get('output_tokens') or 0)
+                self.limiter.on_success(usage['model_ms'], tokens or None)
+        return result, {**usage, "queue_ms": queue_ms, "in_flight_limit": int(self.limiter.limit)}
+    
+    @staticmethod
+    def _no_changes() -> Dict:
+        return {key: [] for key in ['layout_changes', 'text_changes', 'style_changes', 'element_changes']}
+    
+    def _generate_comparison(self, images: List[Union[bytes, Path]], masked: bool = False) -> Tuple[Dict, Dict]:
+        """Envía las imágenes compuestas al modelo y parsea la respuesta.
+        Devuelve (diferencias, uso: tokens de entrada/salida y latencia del modelo)."""
+        start = time.perf_counter()
+        response = self.client.generate(
+            model=self.model,
+            prompt=comparison_prompt(self.strategy, masked),
+            images=images,
+            stream=False,
+            options=self.options or None,
+            keep_alive=self.keep_alive
         )
+        usage = {
+            "prompt_tokens": response.get('prompt_eval_count'),
+            "output_tokens": response.get('eval_count'),
+            "model_ms": _elapsed_ms(start),
+        }
         
         # Intentar parsear como JSON
         try:
@@ -155,71 +434,461 @@ class VisionAnalyzer:
                 "element_changes": []
             }
         
-        return result
+        return result, usage
 
 
 class SmartVisionQA:
     """Orquestador principal de pruebas visuales"""
     
-    def __init__(self, demo_dir: Path = Path("demo")):
-        self.demo_dir = demo_dir
-        self.renderer = HTMLRenderer()
-        self.analyzer = VisionAnalyzer()
-        self.results_dir = Path("results").resolve()
+    def __init__(self, demo_dir: Path = Path("demo"), results_dir: Path = Path("results"),
+                 renderer: HTMLRenderer = None, analyzer: VisionAnalyzer = None,
+                 writer: ArtifactWriter = None, store: ArtifactStore = None):
+        self.demo_dir = Path(demo_dir)
+        self.renderer = renderer or HTMLRenderer()
+        self.analyzer = analyzer or VisionAnalyzer()
+        self.results_dir = Path(results_dir).resolve()
         self.results_dir.mkdir(exist_ok=True)
+        self.summary_store = SummaryStore.for_results_dir(self.results_dir)
+        self.history = RunHistory.for_results_dir(self.results_dir)
+        self.run_id = None  # se crea al registrar la primera comparación
+        self.journal = RunJournal.for_results_dir(self.results_dir)
+        self.journal_run = None  # ejecución del journal activa; ver start_journal()
+        self.component_cache = ComponentCache.for_results_dir(self.results_dir)
+        # Capturas, JSON y HTML se escriben en segundo plano desde memoria
+        self.writer = writer or ArtifactWriter()
+        # Capturas y reportes JSON por contenido; los nombres fijos son enlaces a la última versión
+        self.store = store or ArtifactStore.for_results_dir(self.results_dir, self.writer)
+        self._fingerprints: Dict[Tuple, str] = {}
+        # Capturas simultáneas de la misma página (o URL) comparten un render
+        self.single_flight = SingleFlight()
+        # Modo watch: {ruta: (versión de la página, tarea de render)}; None desactiva la caché
+        self.render_cache: Optional[Dict[str, Tuple[str, "asyncio.Future"]]] = None
+        
+        # Un solo pool de procesos para todo el trabajo de imagen (composición y miniaturas)
+        from image_ops import ImageWorkPool
+        self.image_pool = ImageWorkPool(work_dir=self.results_dir / ".work")
+        if self.analyzer.image_pool is None:
+            self.analyzer.image_pool = self.image_pool
+    
+    def close(self):
+        """Termina las escrituras pendientes y libera pools y conexiones"""
+        self.writer.close()
+        self.image_pool.shutdown()
+        self.summary_store.close()
+        self.history.close()
+        self.journal.close()
+        self.component_cache.close()
+        self.store.close()
+    
+    def single_flight_stats(self) -> Dict[str, Dict[str, int]]:
+        """Capturas y análisis ejecutados frente a los agrupados con uno idéntico en vuelo"""
+        return {**self.single_flight.stats(), **self.analyzer.single_flight.stats()}
+    
+    def start_journal(self, resume: bool = False, run_key: str = None) -> str:
+        """Activa el journal de etapas. Con `resume` continúa la última ejecución:
+        los pares terminados se omiten y las capturas y análisis ya hechos se reutilizan."""
+        self.journal_run = self.journal.start(resume=resume, run_key=run_key)
+        if resume or run_key:
+            self.run_id = self.journal.history_run_id(self.journal_run) or self.run_id
+        return self.journal_run
+    
+    def pair_key(self, first: str, second: str, is_url: bool = False) -> str:
+        """Clave del par en el journal. En ficheros incluye la huella de las entradas
+        para no reutilizar capturas de un HTML que ha cambiado."""
+        stem = report_stem(first, second)
+        return stem if is_url else f"{stem}:{self.fingerprint(first, second)[:16]}"
+    
+    async def _journal_entries(self, pair_key: str) -> Dict[str, Dict]:
+        if not self.journal_run:
+            return {}
+        return await self.writer.run_db(self.journal.entries, self.journal_run, pair_key)
+    
+    async def _journal_record(self, pair_key: str, stage: str, data: Dict) -> None:
+        if self.journal_run:
+            await self.writer.run_db(self.journal.record, self.journal_run, pair_key, stage, data)
+    
+    async def _render_stage(self, pair_key: str, stage: str, entries: Dict, shot_path: Path,
+                            render, tag: str) -> Tuple[bytes, Dict, str]:
+        """Espera `render()` salvo que el journal tenga ya la captura intacta en disco.
+        La captura nueva se guarda en el almacén en segundo plano y `shot_path` pasa a
+        apuntar a ella; devuelve (bytes, captura, ruta del blob relativa a results_dir)."""
+        entry = entries.get(stage)
+        if entry:
+            try:
+                screenshot = await asyncio.to_thread(self.writer.read_bytes, self.results_dir / entry['screenshot'], tag)
+            except FileNotFoundError:
+                screenshot = None
+            if screenshot is not None and _sha256(screenshot) == entry['sha256']:
+                print(f"Reutilizando {Path(entry['screenshot']).name} (journal)")
+                return screenshot, entry.get('capture') or {}, entry['screenshot']
+        screenshot, capture = await render()
+        sha256 = _sha256(screenshot)
+        # En el hilo de base de datos: el INSERT y, si el blob ya existía, el enlace del alias
+        blob = await self.writer.run_db(self.store.put, screenshot, ".png", "screenshot", tag,
+                                        alias=shot_path, key=sha256)
+        # El snapshot del DOM no se guarda en el journal: al reutilizar la captura
+        # el análisis se hace solo con el modelo
+        await self._journal_record(pair_key, stage, {
+            "screenshot": blob, "sha256": sha256,
+            "capture": {key: value for key, value in capture.items() if key != "dom"}
+        })
+        return screenshot, capture, blob
+    
+    async def _analyze_stage(self, pair_key: str, entries: Dict, shot1: bytes, shot2: bytes,
+                             capture1: Dict, capture2: Dict) -> Tuple[Dict, Dict]:
+        # El análisis solo se reutiliza si se hizo sobre exactamente las mismas capturas
+        inputs = [_sha256(shot1), _sha256(shot2)] if pair_key else []
+        entry = entries.get("analyze")
+        if entry and entry.get('inputs') == inputs:
+            print("Reutilizando análisis del modelo (journal)")
+            return entry['differences'], entry.get('analysis', {})
+        differences, analysis = await self._analyze(shot1, shot2, capture1, capture2)
+        await self._journal_record(pair_key, "analyze", {"differences": differences, "analysis": analysis,
+                                                         "inputs": inputs})
+        return differences, analysis
+    
+    async def _analyze(self, shot1: bytes, shot2: bytes,
+                       capture1: Dict = None, capture2: Dict = None) -> Tuple[Dict, Dict]:
+        """Preparación de imagen en el pool de procesos y modelo en un hilo.
+        Las capturas viajan al pool por memoria compartida, sin esperar a que estén en disco.
+        
+        Con los snapshots del DOM de ambas versiones, el diff estructural reporta
+        los cambios de texto, elementos, estilos y posición. Con las cajas de los
+        componentes, cada componente se analiza por separado (o se reutiliza de la
+        caché). El modelo solo recibe la página completa si quedan píxeles
+        distintos que nada de lo anterior explica.
+        
+        Las máscaras de ambas capturas (zonas dinámicas) se pintan en las dos
+        imágenes antes de todo lo anterior, y sus elementos salen del diff estructural."""
+        capture1, capture2 = capture1 or {}, capture2 or {}
+        dom1, dom2 = capture1.get("dom"), capture2.get("dom")
+        boxes1, boxes2 = capture1.get("components"), capture2.get("components")
+        masks = [list(box) for box in sorted({tuple(box) for capture in (capture1, capture2)
+                                              for box in capture.get("masks", [])})]
+        if (dom1 is None or dom2 is None) and (boxes1 is None or boxes2 is None):
+            visual, analysis = await self.analyzer.compare_images_async_detailed(
+                shot1, shot2, regions={"masked": masks} if masks else None)
+            if masks:
+                analysis["masked_regions"] = len(masks)
+            return visual, analysis
+        
+        found = VisionAnalyzer._no_changes()
+        regions = {"explained": [], "moved": []}
+        extra = {}
+        if dom1 is not None and dom2 is not None:
+            start = time.perf_counter()
+            if masks:
+                dom1, dom2 = unmasked_snapshot(dom1, masks), unmasked_snapshot(dom2, masks)
+            structural, regions = diff_snapshots(dom1, dom2)
+            found = merge_differences(found, structural)
+            extra["structural"] = {
+                "ms": _elapsed_ms(start),
+                "changes": sum(len(changes) for changes in structural.values()),
+                "explained_regions": len(regions["explained"]),
+                "moved_regions": len(regions["moved"]),
+            }
+        if boxes1 is not None and boxes2 is not None:
+            by_component, extra["components"] = await self._analyze_components(shot1, shot2, boxes1, boxes2,
+                                                                               masks)
+            found = merge_differences(found, by_component)
+            # Los componentes presentes en ambas versiones ya están analizados;
+            # los añadidos o eliminados quedan para el análisis de la página
+            regions["explained"] += [tuple(boxes[name]) for name in set(boxes1) & set(boxes2)
+                                     for boxes in (boxes1, boxes2)]
+        
+        if masks:
+            regions["masked"] = masks
+        visual, analysis = await self.analyzer.compare_images_async_detailed(shot1, shot2, regions=regions)
+        for key, value in extra.items():
+            analysis[key] = {**value, "model_skipped": analysis["identical"]}
+        if masks:
+            analysis["masked_regions"] = len(masks)
+        return merge_differences(found, visual), analysis
+    
+    async def _analyze_components(self, shot1: bytes, shot2: bytes, boxes1: Dict[str, List[int]],
+                                  boxes2: Dict[str, List[int]], masks: List = None) -> Tuple[Dict, Dict]:
+        """Analiza solo los componentes cuyos píxeles cambiaron, reutilizando la caché.
+        Devuelve (diferencias con el nombre del componente como prefijo, contadores)."""
+        start = time.perf_counter()
+        crops = await self.image_pool.crop_components(shot1, shot2, boxes1, boxes2, masks)
+        differences = VisionAnalyzer._no_changes()
+        stats = dict.fromkeys(("total", "unchanged", "cached", "analyzed", "added", "removed"), 0)
+        stats["total"] = len(crops)
+        
+        def add(name: str, result: Dict) -> None:
+            for key in differences:
+                differences[key] += [f"{name}: {change}" for change in result.get(key, [])]
+        
+        pending = []
+        try:
+            for name, crop in crops.items():
+                if crop["sha1"] is None:
+                    stats["added"] += 1
+                    differences["element_changes"].append(f"V2 adds component {name}")
+                elif crop["sha2"] is None:
+                    stats["removed"] += 1
+                    differences["element_changes"].append(f"V1 has component {name}, missing in V2")
+                elif crop["sha1"] == crop["sha2"]:
+                    stats["unchanged"] += 1
+                else:
+                    key = ComponentCache.cache_key(crop["sha1"], crop["sha2"], self.analyzer.model,
+                                                   self.analyzer.strategy, self.analyzer.profile.name)
+                    cached = await self.writer.run_db(self.component_cache.get, key)
+                    if cached is not None:
+                        stats["cached"] += 1
+                        add(name, cached[0])
+                    else:
+                        pending.append((name, key, crop))
+            
+            outcomes = await asyncio.gather(*(
+                self.analyzer.compare_images_async_detailed(Path(crop["path1"]), Path(crop["path2"]))
+                for _, _, crop in pending
+            ))
+            for (name, key, _), (result, analysis) in zip(pending, outcomes):
+                stats["analyzed"] += 1
+                if 'raw_response' not in result:
+                    await self.writer.run_db(self.component_cache.put, key, result, analysis)
+                add(name, result)
+        finally:
+            for crop in crops.values():
+                for path in (crop.get("path1"), crop.get("path2")):
+                    if path:
+                        Path(path).unlink(missing_ok=True)
+        stats["ms"] = _elapsed_ms(start)
+        return differences, stats
+    
+    def fingerprint(self, html1: str, html2: str) -> str:
+        """Huella de las entradas de una comparación de ficheros (contenido + modelo y perfil).
+        Se memoriza por tamaño y mtime para no releer los HTML varias veces por comparación."""
+        paths = [self.demo_dir / html1, self.demo_dir / html2]
+        model = self.analyzer.model
+        if self.analyzer.profile.name != "default":
+            # Sin perfil la huella no cambia respecto a la de reportes anteriores
+            model += f"\0{self.analyzer.profile.name}"
+        if self.renderer.masks or self.renderer.auto_mask > 1:
+            # Con otras máscaras el mismo par puede dar otro resultado
+            model += f"\0masks={json.dumps([self.renderer.masks or [], self.renderer.auto_mask])}"
+        key = (model, *((str(p), p.stat().st_mtime_ns, p.stat().st_size) for p in paths))
+        if key not in self._fingerprints:
+            digest = hashlib.sha256(model.encode('utf-8'))
+            for path in paths:
+                data = path.read_bytes()
+                self.writer.count_read(report_stem(html1, html2), len(data))
+                digest.update(b'\0' + data)
+            self._fingerprints[key] = digest.hexdigest()
+        return self._fingerprints[key]
+    
+    def report_path(self, file1: str, file2: str) -> Path:
+        return self.results_dir / f"comparison_{report_stem(file1, file2)}.json"
+    
+    def is_unchanged(self, html1: str, html2: str) -> bool:
+        """True si el último reporte del par se generó con las mismas entradas"""
+        report_path = self.report_path(html1, html2)
+        if not report_path.exists():
+            return False
+        try:
+            data = self.writer.read_bytes(report_path, report_stem(html1, html2))
+            previous = json.loads(data)
+            return previous.get('fingerprint') == self.fingerprint(html1, html2)
+        except (OSError, ValueError):
+            return False
+    
+    async def run_spec(self, spec: Dict, only_changed: bool = False) -> Dict:
+        """Ejecuta una comparación descrita como {"v1", "v2"} o {"url1", "url2"}
+        y genera su reporte. Nunca lanza: los fallos se devuelven con "status": "error"."""
+        is_url = 'url1' in spec
+        first, second = (spec['url1'], spec['url2']) if is_url else (spec['v1'], spec['v2'])
+        try:
+            # La huella y el reporte anterior se leen de disco: fuera del event loop
+            if not is_url and only_changed and await asyncio.to_thread(self.is_unchanged, first, second):
+                print(f"Sin cambios en las entradas, se omite {first} vs {second}")
+                return {"file1": first, "file2": second, "status": "skipped"}
+            pair_key = await asyncio.to_thread(self.pair_key, first, second, is_url) if self.journal_run else None
+            if pair_key and "report" in await self._journal_entries(pair_key):
+                print(f"Ya completada en el journal, se omite {first} vs {second}")
+                return {"file1": first, "file2": second, "status": "skipped", "resumed": True}
+            if is_url:
+                results = await self.run_url_comparison(first, second)
+            else:
+                results = await self.run_comparison(first, second)
+            report_path = await self.generate_report(results)
+            if pair_key:
+                await self._journal_record(pair_key, "report", {"json": report_path.name})
+            return {**results, "status": "ok", "io": self.writer.pop_stats(report_stem(first, second))}
+        except Exception as e:
+            print(f"Error en comparación {first} vs {second}: {e}")
+            return {"file1": first, "file2": second, "status": "error", "error": str(e)}
+        finally:
+            # Los contadores de un par omitido o fallido no se arrastran a la siguiente ejecución
+            self.writer.pop_stats(report_stem(first, second))
+    
+    async def run_suite(self, comparisons: List[Dict], jobs: int = 1, only_changed: bool = False,
+                        resume: bool = False) -> List[Dict]:
+        """Ejecuta varias comparaciones con hasta `jobs` en paralelo.
+        
+        Cada comparación es {"v1": ..., "v2": ...} (ficheros en demo_dir) o
+        {"url1": ..., "url2": ...}. Devuelve un resultado por comparación con
+        "status": "ok", "skipped" o "error". Con `resume` se continúa la última
+        ejecución registrada en el journal.
+        """
+        if self.journal_run is None:
+            await self.writer.run_db(self.start_journal, resume=resume)
+        semaphore = asyncio.Semaphore(max(1, jobs))
+        
+        async def run_one(spec: Dict) -> Dict:
+            async with semaphore:
+                return await self.run_spec(spec, only_changed)
+        
+        outcomes = await asyncio.gather(*(run_one(spec) for spec in comparisons))
+        if not any(outcome['status'] == 'error' for outcome in outcomes):
+            await self.writer.run_db(self.journal.finish, self.journal_run)
+        return outcomes
     
     async def run_comparison(self, html1: str, html2: str) -> Dict:
         html1_path = self.demo_dir / html1
         html2_path = self.demo_dir / html2
         
-        if not html1_path.exists() or not html2_path.exists():
+        if not await asyncio.to_thread(lambda: html1_path.exists() and html2_path.exists()):
             raise FileNotFoundError(f"HTML files not found in {self.demo_dir}")
         
+        shot1_path = self.results_dir / f"{safe_name(html1)}_screenshot.png"
+        shot2_path = self.results_dir / f"{safe_name(html2)}_screenshot.png"
+        fingerprint = await asyncio.to_thread(self.fingerprint, html1, html2)
+        pair_key = await asyncio.to_thread(self.pair_key, html1, html2) if self.journal_run else None
+        entries = await self._journal_entries(pair_key) if pair_key else {}
+        tag = report_stem(html1, html2)
+        timings = {}
+        start = time.perf_counter()
+        
         print(f"Renderizando {html1}...")
-        img1 = await self.renderer.html_to_image(
-            html1_path, 
-            self.results_dir / f"{html1.replace('.html', '')}_screenshot.png"
-        )
+        shot1, capture1, blob1 = await self._render_stage(pair_key, "render_v1", entries, shot1_path,
+                                                   lambda: self._render_file(html1_path), tag)
+        timings["render_v1"] = _elapsed_ms(start)
         
         print(f"Renderizando {html2}...")
-        img2 = await self.renderer.html_to_image(
-            html2_path,
-            self.results_dir / f"{html2.replace('.html', '')}_screenshot.png"
-        )
+        stage_start = time.perf_counter()
+        shot2, capture2, blob2 = await self._render_stage(pair_key, "render_v2", entries, shot2_path,
+                                                   lambda: self._render_file(html2_path), tag)
+        timings["render_v2"] = _elapsed_ms(stage_start)
         
         print("Analizando diferencias con Ollama...")
-        differences = self.analyzer.compare_images(img1, img2)
+        stage_start = time.perf_counter()
+        differences, analysis = await self._analyze_stage(pair_key, entries, shot1, shot2, capture1, capture2)
+        timings["analyze"] = _elapsed_ms(stage_start)
+        timings["total"] = _elapsed_ms(start)
         
         return {
             "file1": html1,
             "file2": html2,
-            "differences": differences
+            "fingerprint": fingerprint,
+            "differences": differences,
+            "analysis": analysis,
+            "screenshots": [blob1, blob2],
+            "timings": timings
         }
     
+    async def _render_file(self, html_path: Path) -> Tuple[bytes, Dict]:
+        # La versión (la página y sus ficheros locales) identifica la captura:
+        # las peticiones simultáneas de la misma versión comparten un render
+        version = await asyncio.to_thread(page_version, html_path)
+        if self.render_cache is None:
+            return await self.single_flight.do("render", version, lambda: self._render_file_uncached(html_path),
+                                               share=_share_capture)
+        
+        # Modo watch: además se reutiliza la captura de una página sin cambios
+        key = str(html_path)
+        entry = self.render_cache.get(key)
+        if entry is not None and entry[0] == version:
+            if entry[1].done():
+                print(f"Reutilizando captura de {html_path.name} (sin cambios)")
+        else:
+            entry = (version, asyncio.ensure_future(self._render_file_uncached(html_path)))
+            self.render_cache[key] = entry
+        try:
+            screenshot, capture = await asyncio.shield(entry[1])
+        except Exception:
+            if self.render_cache.get(key) is entry:
+                del self.render_cache[key]
+            raise
+        return screenshot, dict(capture)
+    
+    async def _render_file_uncached(self, html_path: Path) -> Tuple[bytes, Dict]:
+        screenshot = await self.renderer.html_to_image(html_path)
+        return screenshot, self.renderer.last_capture
+    
+    async def _capture_url(self, url: str) -> Tuple[bytes, Dict]:
+        return await self.single_flight.do("render", url, lambda: self._capture_url_uncached(url),
+                                           share=_share_capture)
+    
+    async def _capture_url_uncached(self, url: str) -> Tuple[bytes, Dict]:
+        screenshot = await self.renderer.url_to_image(url)
+        # Leído sin ningún await intermedio: no lo pisa otra captura concurrente
+        return screenshot, self.renderer.last_capture
+    
     async def run_url_comparison(self, url1: str, url2: str) -> Dict:
         """Compara dos URLs capturando sus páginas web"""
+        shot1_path = self.results_dir / f"{safe_name(url1)}_screenshot.png"
+        shot2_path = self.results_dir / f"{safe_name(url2)}_screenshot.png"
+        pair_key = self.pair_key(url1, url2, is_url=True) if self.journal_run else None
+        entries = await self._journal_entries(pair_key) if pair_key else {}
+        tag = report_stem(url1, url2)
+        timings = {}
+        start = time.perf_counter()
+        
         print(f"Capturando {url1}...")
-        img1 = await self.renderer.url_to_image(
-            url1,
-            self.results_dir / f"url1_screenshot.png"
-        )
+        shot1, capture1, blob1 = await self._render_stage(pair_key, "render_v1", entries, shot1_path,
+                                                   lambda: self._capture_url(url1), tag)
+        timings["render_v1"] = _elapsed_ms(start)
         
         print(f"Capturando {url2}...")
-        img2 = await self.renderer.url_to_image(
-            url2,
-            self.results_dir / f"url2_screenshot.png"
-        )
+        stage_start = time.perf_counter()
+        shot2, capture2, blob2 = await self._render_stage(pair_key, "render_v2", entries, shot2_path,
+                                                   lambda: self._capture_url(url2), tag)
+        timings["render_v2"] = _elapsed_ms(stage_start)
+        
+        for capture in (capture1, capture2):
+            routing = capture.get("routing")
+            if routing:
+                print(f"  {capture['url']}: {routing['blocked']} bloqueadas, {routing['stubbed']} stubs, "
+                      f"~{routing['estimated_time_saved_ms']} ms ahorrados")
         
         print("Analizando diferencias con Ollama...")
-        differences = self.analyzer.compare_images(img1, img2)
+        stage_start = time.perf_counter()
+        differences, analysis = await self._analyze_stage(pair_key, entries, shot1, shot2, capture1, capture2)
+        timings["analyze"] = _elapsed_ms(stage_start)
+        timings["total"] = _elapsed_ms(start)
         
         return {
             "file1": url1,
             "file2": url2,
-            "differences": differences
+            "differences": differences,
+            "analysis": analysis,
+            "screenshots": [blob1, blob2],
+            # El snapshot del DOM solo se usa para el análisis; no va al reporte
+            "captures": [{key: value for key, value in capture.items() if key != "dom"}
+                         for capture in (capture1, capture2)],
+            "timings": timings
         }
     
-    def generate_report(self, results: Dict):
+    def _record_report(self, results: Dict, tag: str, report_path: Path, html_report_path: Path,
+                       report_blob: str) -> None:
+        """Resumen, historial y manifiesto de una comparación (en el hilo de base de datos)"""
+        # Resumen compacto para que el índice no tenga que releer todos los JSON
+        self.summary_store.upsert(results, report_path, html_report_path)
+        
+        # Historial de solo inserciones para consultas de tendencias
+        if self.run_id is None:
+            self.run_id = self.history.start_run(self.analyzer.model)
+            if self.journal_run:
+                self.journal.set_history_run_id(self.journal_run, self.run_id)
+        self.history.record_comparison(self.run_id, results)
+        # Manifiesto de la ejecución: blobs que usa esta comparación
+        refs = {f"screenshot{n}": blob for n, blob in enumerate(results.get('screenshots', []), start=1)}
+        self.store.record_refs(self.run_id, tag, {**refs, "report": report_blob})
+    
+    async def generate_report(self, results: Dict) -> Path:
+        """Imprime el resumen y escribe JSON y HTML en segundo plano desde memoria.
+        Vuelve cuando ambos están en disco (el journal no marca el reporte antes)."""
         print("\n" + "="*50)
         print("REPORTE DE DIFERENCIAS VISUALES")
         print("="*50)
@@ -240,16 +909,29 @@ class SmartVisionQA:
                     else:
                         print(f"  {changes}")
         
-        # Guardar reporte JSON único para cada comparación
-        file1_name = results['file1'].replace('.html', '')
-        file2_name = results['file2'].replace('.html', '')
-        report_filename = f"comparison_{file1_name}_vs_{file2_name}.json"
-        report_path = self.results_dir / report_filename
-        with open(report_path, 'w') as f:
-            json.dump(results, f, indent=2)
+        tag = report_stem(results['file1'], results['file2'])
+        
+        # Miniaturas y teselas en el pool de procesos, antes de escribir los reportes.
+        # Las capturas pueden estar aún escribiéndose en segundo plano.
+        screenshot_paths = [self.results_dir / name for name in results.get('screenshots', [])]
+        await self.writer.wait_for(screenshot_paths)
+        if screenshot_paths and await asyncio.to_thread(lambda: all(path.exists() for path in screenshot_paths)):
+            from thumbnails import generate_previews_async
+            previews = await generate_previews_async(screenshot_paths, self.results_dir, self.image_pool.executor)
+            for preview in previews:
+                self.writer.add_stats(tag, preview.pop('io', {}))
+            results['previews'] = previews
         
-        # Generar reporte HTML visual
-        html_report_path = generate_from_json(report_path, self.results_dir)
+        # Reporte JSON en el almacén (comparison_*.json enlaza a él) y HTML, en segundo plano
+        report_path = self.report_path(results['file1'], results['file2'])
+        loop = asyncio.get_running_loop()
+        report_json = await loop.run_in_executor(self.writer.executor, _json_bytes, results)
+        report_blob = await self.writer.run_db(self.store.put, report_json, ".json", "report", tag, alias=report_path)
+        # La primera vez en el proceso escribe los assets compartidos
+        html_report_path, html_content = await loop.run_in_executor(
+            self.writer.executor, render_from_results, results, self.results_dir)
+        html_write = self.writer.write(html_report_path, html_content, tag)
+        await self.writer.run_db(self._record_report, results, tag, report_path, html_report_path, report_blob)
         
         print(f"\nReporte JSON guardado en: {report_path}")
         print(f"Reporte HTML guardado en: {html_report_path}")
@@ -257,37 +939,12 @@ class SmartVisionQA:
         print(f"- JSON: {report_path.relative_to(Path.cwd())}")
         print(f"- HTML: {html_report_path.relative_to(Path.cwd())}")
         print(f"- Screenshots: {self.results_dir.name}/*_screenshot.png")
-
-
-async def main():
-    qa = SmartVisionQA()
-    
-    # Casos de prueba con archivos locales
-    test_cases = [
-        ("page_v1.html", "page_v2.html"),
-        ("page_v1.html", "page_v3.html"),
-        ("page_v2.html", "page_v3.html"),
-    ]
-    
-    for html1, html2 in test_cases:
-        try:
-            results = await qa.run_comparison(html1, html2)
-            qa.generate_report(results)
-        except Exception as e:
-            print(f"Error en comparación {html1} vs {html2}: {e}")
-    
-    # EJEMPLO: Comparar URLs reales (descomentar para usar)
-    # url_tests = [
-    #     ("https://example.com", "https://example.org"),
-    # ]
-    # 
-    # for url1, url2 in url_tests:
-    #     try:
-    #         results = await qa.run_url_comparison(url1, url2)
-    #         qa.generate_report(results)
-    #     except Exception as e:
-    #         print(f"Error en comparación {url1} vs {url2}: {e}")
+        
+        await asyncio.gather(self.writer.wait_for([self.results_dir / report_blob]), asyncio.wrap_future(html_write))
+        return report_path
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # Sin argumentos ejecuta los casos de demo; ver `python smartVisionQA.py --help`
+    from cli import main
+    sys.exit(main())
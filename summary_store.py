@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Almacén persistente de resúmenes de comparaciones (SQLite)
+Cada comparación terminada inserta o actualiza una fila compacta, de modo que
+el índice no necesita leer todos los comparison_*.json
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from change_classifier import get_classifier
+from shared_results import journal_mode
+
+
+CHANGE_KEYS = ['layout_changes', 'text_changes', 'style_changes', 'element_changes']
+
+SUMMARY_DB_NAME = "summary.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS comparisons (
+    report_key TEXT PRIMARY KEY,
+    file1 TEXT NOT NULL,
+    file2 TEXT NOT NULL,
+    layout_changes INTEGER NOT NULL DEFAULT 0,
+    text_changes INTEGER NOT NULL DEFAULT 0,
+    style_changes INTEGER NOT NULL DEFAULT 0,
+    element_changes INTEGER NOT NULL DEFAULT 0,
+    total_changes INTEGER NOT NULL DEFAULT 0,
+    severity TEXT NOT NULL,
+    json_file TEXT NOT NULL,
+    html_file TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    card_html TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_comparisons_updated ON comparisons(updated_at DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def count_changes(diff: Dict) -> Dict[str, int]:
+    """Cuenta los cambios no vacíos de cada categoría.
+
+    Si el modelo no devolvió JSON estructurado se categoriza la respuesta en
+    texto libre con el mismo clasificador que usa el reporte HTML.
+    """
+    counts = {}
+    for key in CHANGE_KEYS:
+        changes = diff.get(key, []) if isinstance(diff, dict) else []
+        counts[key] = len([c for c in changes if c and str(c).strip()]) if isinstance(changes, list) else 0
+
+    if not any(counts.values()) and isinstance(diff, dict) and diff.get('raw_response'):
+        detected = get_classifier().categorize(str(diff['raw_response']))['detected_changes']
+        counts = {key: detected.get(key.replace('_changes', ''), 0) for key in CHANGE_KEYS}
+    return counts
+
+
+def severity_for(total_changes: int) -> str:
+    """Mismos umbrales que el dashboard del reporte HTML"""
+    if total_changes == 0:
+        return "none"
+    if total_changes <= 2:
+        return "low"
+    if total_changes <= 5:
+        return "medium"
+    return "high"
+
+
+class SummaryStore:
+    """Tabla de resúmenes con una fila por par comparado"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # upsert() llega desde el hilo de base de datos del ArtifactWriter (run_db)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(f"PRAGMA journal_mode={journal_mode(self.db_path.parent)}")
+        self.conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_results_dir(cls, results_dir: Path) -> "SummaryStore":
+        return cls(Path(results_dir) / SUMMARY_DB_NAME)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def upsert(self, results: Dict, json_path: Path, html_path: Optional[Path] = None,
+               timestamp: float = None) -> Dict:
+        """Inserta o actualiza el resumen de una comparación terminada"""
+        timestamp = timestamp or time.time()
+        counts = count_changes(results.get('differences', {}))
+        total = sum(counts.values())
+        row = {
+            'report_key': Path(json_path).name,
+            'file1': results.get('file1', 'Unknown'),
+            'file2': results.get('file2', 'Unknown'),
+            **counts,
+            'total_changes': total,
+            'severity': severity_for(total),
+            'json_file': Path(json_path).name,
+            'html_file': Path(html_path).name if html_path else None,
+            'created_at': timestamp,
+            'updated_at': timestamp,
+        }
+        with self.conn:
+            # card_html se invalida para que el índice regenere solo esta tarjeta
+            self.conn.execute("""
+                INSERT INTO comparisons (report_key, file1, file2, layout_changes, text_changes,
+                    style_changes, element_changes, total_changes, severity, json_file, html_file,
+                    created_at, updated_at, card_html)
+                VALUES (:report_key, :file1, :file2, :layout_changes, :text_changes,
+                    :style_changes, :element_changes, :total_changes, :severity, :json_file, :html_file,
+                    :created_at, :updated_at, NULL)
+                ON CONFLICT(report_key) DO UPDATE SET
+                    file1 = excluded.file1, file2 = excluded.file2,
+                    layout_changes = excluded.layout_changes, text_changes = excluded.text_changes,
+                    style_changes = excluded.style_changes, element_changes = excluded.element_changes,
+                    total_changes = excluded.total_changes, severity = excluded.severity,
+                    json_file = excluded.json_file, html_file = excluded.html_file,
+                    updated_at = excluded.updated_at, card_html = NULL
+            """, row)
+            self._bump_revision()
+        return row
+
+    def _bump_revision(self) -> None:
+        self.conn.execute("""
+            INSERT INTO meta (key, value) VALUES ('revision', '1')
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+        """)
+
+    def revision(self) -> int:
+        return int(self.get_meta('revision', '0'))
+
+    def get_meta(self, key: str, default: str = None) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else default
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO meta (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """, (key, value))
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM comparisons").fetchone()[0]
+
+    def report_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM comparisons WHERE html_file IS NOT NULL").fetchone()[0]
+
+    def iter_rows(self) -> Iterator[sqlite3.Row]:
+        """Como rows(), pero leyendo del cursor fila a fila (memoria constante)"""
+        return self.conn.execute("""
+            SELECT * FROM comparisons WHERE html_file IS NOT NULL ORDER BY updated_at DESC
+        """)
+
+    def rows(self) -> List[sqlite3.Row]:
+        """Resúmenes con HTML asociado, del más reciente al más antiguo"""
+        return self.conn.execute("""
+            SELECT * FROM comparisons WHERE html_file IS NOT NULL ORDER BY updated_at DESC
+        """).fetchall()
+
+    def stats(self) -> Dict[str, int]:
+        """Estadísticas agregadas calculadas por SQLite en una sola consulta"""
+        row = self.conn.execute("""
+            SELECT COUNT(*) AS total_reports,
+                   COALESCE(SUM(total_changes), 0) AS total_changes,
+                   COALESCE(SUM(total_changes = 0), 0) AS identical,
+                   COALESCE(SUM(total_changes > 5), 0) AS high_impact
+            FROM comparisons WHERE html_file IS NOT NULL
+        """).fetchone()
+        return dict(row)
+
+    def set_card_html(self, cards: Dict[str, str]) -> None:
+        """Guarda las tarjetas del índice ya renderizadas"""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE comparisons SET card_html = ? WHERE report_key = ?",
+                [(html, key) for key, html in cards.items()]
+            )
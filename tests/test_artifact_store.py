@@ -0,0 +1,92 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from artifact_store import ArtifactStore
+from artifact_writer import ArtifactWriter
+
+DAY = 86400
+
+
+def test_same_content_twice_leaves_no_hidden_files(tmp_path):
+    writer = ArtifactWriter()
+    store = ArtifactStore.for_results_dir(tmp_path, writer)
+    alias = tmp_path / "page_v1_screenshot.png"
+    try:
+        for _ in range(3):
+            relpath = store.put(b"\x89PNG same content", ".png", "screenshot", alias=alias)
+            writer.flush()
+    finally:
+        writer.close()
+        store.close()
+
+    assert (tmp_path / relpath).samefile(alias)
+    assert [path.name for path in tmp_path.rglob(".*")] == []
+
+
+@pytest.fixture
+def store(tmp_path):
+    writer = ArtifactWriter()
+    store = ArtifactStore.for_results_dir(tmp_path, writer)
+    yield store
+    writer.close()
+    store.close()
+
+
+def record_run(store, run_id, age_days, comparisons):
+    """Una ejecución de hace `age_days` días: {comparación: contenido de su captura (100 bytes)}"""
+    blobs = {}
+    for comparison, content in comparisons.items():
+        blobs[comparison] = store.put(content.encode().ljust(100, b"."), ".png", "screenshot")
+        store.record_refs(run_id, comparison, {"screenshot1": blobs[comparison]})
+    store.writer.flush()
+    created_at = time.time() - age_days * DAY
+    with store.conn:
+        store.conn.execute("UPDATE refs SET created_at = ? WHERE run_id = ?", (created_at, run_id))
+    return blobs
+
+
+def exists(store, relpath):
+    return (store.results_dir / relpath).exists()
+
+
+def test_max_age_drops_old_runs_but_keeps_the_latest_version(store):
+    old = record_run(store, "r1", 10, {"home": "home-v1", "about": "about-v1"})
+    new = record_run(store, "r2", 1, {"home": "home-v2"})
+
+    result = store.gc(max_age_days=7)
+
+    assert result["runs_dropped"] == 1
+    assert result["blobs_deleted"] == 1
+    assert not exists(store, old["home"])
+    # "about" no se ha vuelto a ejecutar: su última versión sigue en r1 y se conserva
+    assert exists(store, old["about"])
+    assert exists(store, new["home"])
+    assert store.manifest("r1") == {"about": {"screenshot1": old["about"]}}
+
+
+def test_max_bytes_drops_the_oldest_runs_first(store):
+    first = record_run(store, "r1", 3, {"home": "home-v1"})
+    second = record_run(store, "r2", 2, {"home": "home-v2"})
+    third = record_run(store, "r3", 1, {"home": "home-v3"})
+
+    result = store.gc(max_bytes=150)
+
+    assert result["runs_dropped"] == 2
+    assert result["bytes_kept"] == 100
+    assert [exists(store, blobs["home"]) for blobs in (first, second, third)] == [False, False, True]
+
+
+def test_dry_run_deletes_nothing(store):
+    old = record_run(store, "r1", 10, {"home": "home-v1"})
+    record_run(store, "r2", 1, {"home": "home-v2"})
+
+    result = store.gc(max_age_days=7, dry_run=True)
+
+    assert result["blobs_deleted"] == 1 and result["dry_run"]
+    assert exists(store, old["home"])
+    assert store.manifest("r1") == {"home": {"screenshot1": old["home"]}}
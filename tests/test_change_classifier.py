@@ -0,0 +1,39 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from change_classifier import CATEGORY_KEYWORDS, ChangeClassifier
+
+
+def substring_classify(line):
+    """El bucle original: palabras clave contenidas en la línea, por categoría"""
+    best, best_score = None, 0
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        score = sum(1 for keyword in keywords if keyword in line.lower())
+        if score > best_score:
+            best, best_score = category, score
+    return best
+
+
+def test_matches_the_substring_loop_on_glued_keywords():
+    rng = random.Random(33)
+    keywords = [keyword for words in CATEGORY_KEYWORDS.values() for keyword in words]
+    pieces = keywords + [keyword[:n] for keyword in keywords for n in (2, 3)] + [" ", "x", "CON", "-"]
+    classifier = ChangeClassifier()
+    for _ in range(5000):
+        line = "".join(rng.choices(pieces, k=rng.randint(1, 8)))
+        assert classifier.classify(line) == substring_classify(line), line
+
+
+def test_nested_and_overlapping_keywords_count():
+    classifier = ChangeClassifier()
+    # "text" dentro de "context"; en "fon[t]ext" las dos palabras comparten la "t"
+    assert classifier.scores("the context changed")[1] == 1
+    assert classifier.scores("fontext")[1] == 2
+    assert classifier.classify("nothing relevant here") is None
+
+
+def test_ties_go_to_the_first_category():
+    assert ChangeClassifier().classify("layout color") == "layout"
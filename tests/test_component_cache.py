@@ -0,0 +1,79 @@
+import io
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from component_cache import DEFAULT_COMPONENTS, ComponentCache, parse_components
+from image_ops import crop_components
+
+
+def png(boxes=()):
+    img = Image.new('RGB', (200, 200), 'white')
+    for box in boxes:
+        ImageDraw.Draw(img).rectangle(box, fill='blue')
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def saved(data, tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_cache_round_trip_counts_hits(tmp_path):
+    cache = ComponentCache.for_results_dir(tmp_path)
+    try:
+        key = ComponentCache.cache_key("a" * 64, "b" * 64, "mock", "stack")
+        assert cache.get(key) is None
+        cache.put(key, {"text_changes": ["title"]}, {"model_ms": 12})
+
+        assert cache.get(key) == ({"text_changes": ["title"]}, {"model_ms": 12})
+        assert cache.stats() == {"entries": 1, "hits": 1}
+    finally:
+        cache.close()
+
+
+def test_cache_key_depends_on_model_strategy_and_profile():
+    keys = {ComponentCache.cache_key("a", "b", "mock", "stack"),
+            ComponentCache.cache_key("a", "b", "other", "stack"),
+            ComponentCache.cache_key("a", "b", "mock", "overlay"),
+            ComponentCache.cache_key("a", "b", "mock", "stack", "fast-triage"),
+            ComponentCache.cache_key("b", "a", "mock", "stack")}
+    assert len(keys) == 5
+
+
+def test_parse_components():
+    assert parse_components([]) == DEFAULT_COMPONENTS
+    assert parse_components(["nav = header nav", "cta=.button"]) == {"nav": "header nav", "cta": ".button"}
+    with pytest.raises(ValueError):
+        parse_components(["header"])
+
+
+def test_only_changed_components_are_written_for_analysis(tmp_path):
+    v1 = saved(png(), tmp_path, "v1.png")
+    v2 = saved(png(boxes=[(110, 10, 120, 20)]), tmp_path, "v2.png")
+    boxes1 = {"header": [0, 0, 100, 50], "card": [100, 0, 200, 50], "footer": [0, 150, 200, 200]}
+    boxes2 = {"header": [0, 0, 100, 50], "card": [100, 0, 200, 50], "banner": [0, 100, 200, 150]}
+
+    crops = crop_components(v1, v2, boxes1, boxes2, str(tmp_path / "crop"))
+
+    assert crops["header"]["sha1"] == crops["header"]["sha2"] and "path1" not in crops["header"]
+    assert crops["card"]["sha1"] != crops["card"]["sha2"]
+    assert Image.open(crops["card"]["path2"]).size == (100, 50)
+    assert crops["footer"]["sha2"] is None
+    assert crops["banner"]["sha1"] is None
+
+
+def test_masked_pixels_do_not_change_a_component(tmp_path):
+    v1 = saved(png(), tmp_path, "v1.png")
+    v2 = saved(png(boxes=[(110, 10, 120, 20)]), tmp_path, "v2.png")
+    boxes = {"card": [100, 0, 200, 50]}
+
+    crops = crop_components(v1, v2, boxes, boxes, str(tmp_path / "crop"), masks=[[105, 5, 125, 25]])
+    assert crops["card"]["sha1"] == crops["card"]["sha2"]
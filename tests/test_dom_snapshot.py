@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dom_snapshot import MAX_CHANGES_PER_CATEGORY, diff_snapshots, merge_differences
+
+
+def element(key, box, text="", tag=None, **styles):
+    return {"key": key, "tag": tag or key.rsplit(" > ", 1)[-1].split(".")[0].split("#")[0],
+            "box": box, "text": text, "styles": {"color": "black", **styles}}
+
+
+def snapshot(*elements, size=(800, 600)):
+    return {"size": list(size), "elements": list(elements)}
+
+
+BODY = element("body", [0, 0, 800, 600])
+
+
+def test_identical_snapshots_have_no_changes():
+    page = snapshot(BODY, element("body > h1", [0, 0, 800, 40], "Title"))
+    differences, regions = diff_snapshots(page, page)
+    assert not any(differences.values())
+    assert regions == {"explained": [], "moved": []}
+
+
+def test_text_change_is_reported_and_explained():
+    differences, regions = diff_snapshots(
+        snapshot(BODY, element("body > h1", [0, 0, 800, 40], "Old title")),
+        snapshot(BODY, element("body > h1", [0, 0, 800, 40], "New title")))
+
+    assert differences["text_changes"] == ['h1: V1 has "Old title", V2 has "New title"']
+    assert regions["explained"] == [(0, 0, 800, 40), (0, 0, 800, 40)]
+
+
+def test_added_subtree_is_reported_once_at_its_root():
+    differences, _ = diff_snapshots(
+        snapshot(BODY),
+        snapshot(BODY, element("body > div.banner", [0, 0, 800, 80]),
+                 element("body > div.banner > p", [10, 10, 300, 20], "Sale")))
+
+    assert differences["element_changes"] == ['V2 adds div.banner "Sale"']
+
+
+def test_style_changes_are_grouped_by_value():
+    v1 = snapshot(BODY, *[element(f"body > p[{n}]", [0, 20 * n, 800, 20], "x") for n in range(3)])
+    v2 = snapshot(BODY, *[element(f"body > p[{n}]", [0, 20 * n, 800, 20], "x", color="red") for n in range(3)])
+
+    differences, _ = diff_snapshots(v1, v2)
+    assert differences["style_changes"] == ["color: V1 has black, V2 has red (p and 2 more elements)"]
+
+
+def test_only_moves_relative_to_the_container_are_reported():
+    v1 = snapshot(BODY, element("body > main", [0, 100, 800, 200]),
+                  element("body > main > p", [0, 100, 800, 20], "Body"))
+    v2 = snapshot(BODY, element("body > main", [0, 150, 800, 200]),
+                  element("body > main > p", [0, 150, 800, 20], "Body"))
+
+    differences, regions = diff_snapshots(v1, v2)
+    assert differences["layout_changes"] == ["main moved down 50px in V2"]
+    assert regions["moved"] == [[(0, 100, 800, 300), (0, 150, 800, 350)]]
+
+
+def test_small_shifts_are_within_tolerance():
+    differences, _ = diff_snapshots(snapshot(BODY, element("body > p", [0, 100, 800, 20], "x")),
+                                    snapshot(BODY, element("body > p", [0, 103, 800, 20], "x")))
+    assert differences["layout_changes"] == []
+
+
+def test_long_lists_are_capped():
+    v1 = snapshot(BODY, *[element(f"body > p[{n}]", [0, n, 10, 1], f"a{n}") for n in range(30)])
+    v2 = snapshot(BODY, *[element(f"body > p[{n}]", [0, n, 10, 1], f"b{n}") for n in range(30)])
+
+    text_changes = diff_snapshots(v1, v2)[0]["text_changes"]
+    assert len(text_changes) == MAX_CHANGES_PER_CATEGORY + 1
+    assert text_changes[-1] == "... and 10 more text changes"
+
+
+def test_merge_keeps_structural_changes_first_without_duplicates():
+    structural = {"text_changes": ["title"], "layout_changes": [], "style_changes": [], "element_changes": []}
+    visual = {"text_changes": ["title", "logo text"], "raw_response": "..."}
+
+    merged = merge_differences(structural, visual)
+    assert merged["text_changes"] == ["title", "logo text"]
+    assert merged["raw_response"] == "..."
@@ -0,0 +1,52 @@
+import io
+import sys
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dynamic_masks import unmasked_snapshot, varying_regions
+from image_ops import diff_bbox, mask_regions
+
+
+def png(size=(64, 64), boxes=(), fill=(255, 255, 255), color=(0, 0, 0)):
+    img = Image.new('RGB', size, fill)
+    draw = ImageDraw.Draw(img)
+    for box in boxes:
+        draw.rectangle(box, fill=color)
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def test_identical_captures_have_no_varying_regions():
+    assert varying_regions([png(), png(), png()]) == []
+
+
+def test_changed_pixels_are_grouped_in_cells():
+    # Un píxel en la celda (1, 0) y un bloque que cubre las celdas (0..1, 2..3)
+    shots = [png(), png(boxes=[(20, 5, 20, 5)]), png(boxes=[(0, 32, 31, 63)])]
+    assert sorted(varying_regions(shots, cell=16)) == [[0, 32, 32, 64], [16, 0, 32, 16]]
+
+
+def test_a_one_channel_change_of_one_still_varies():
+    shots = [png(), png(boxes=[(0, 0, 0, 0)], color=(255, 254, 255))]
+    assert varying_regions(shots, cell=16) == [[0, 0, 16, 16]]
+
+
+def test_height_differences_are_masked():
+    assert varying_regions([png((64, 64)), png((64, 80))], cell=16) == [[0, 64, 64, 80]]
+
+
+def test_masked_regions_do_not_count_in_the_pre_diff():
+    img1 = Image.new('RGB', (64, 64), 'white')
+    img2 = img1.copy()
+    ImageDraw.Draw(img2).rectangle((10, 10, 20, 20), fill='red')
+    mask_regions(img1, img2, [[8, 8, 24, 24]])
+    assert diff_bbox(img1, img2) is None
+
+
+def test_unmasked_snapshot_drops_elements_fully_inside_a_mask():
+    snapshot = {"url": "page", "elements": [{"box": [10, 10, 5, 5]}, {"box": [10, 10, 50, 5]}]}
+    assert unmasked_snapshot(snapshot, [[0, 0, 20, 20]])["elements"] == [{"box": [10, 10, 50, 5]}]
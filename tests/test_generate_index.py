@@ -0,0 +1,72 @@
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from generate_index import MANIFEST_COLUMNS, MANIFEST_NAME, generate_index_html, page_filename
+from summary_store import SummaryStore
+
+
+def add_reports(results_dir, count, start=0):
+    store = SummaryStore.for_results_dir(results_dir)
+    try:
+        for n in range(start, start + count):
+            results = {"file1": f"page{n}_v1.html", "file2": f"page{n}_v2.html",
+                       "differences": {"text_changes": ["change"] * (n % 7)}}
+            store.upsert(results, results_dir / f"comparison_{n}.json",
+                         results_dir / f"visual_report_{n}.html", timestamp=1_700_000_000 + n)
+    finally:
+        store.close()
+
+
+def test_page_filenames():
+    assert page_filename(1) == "index.html"
+    assert page_filename(3) == "index-3.html"
+
+
+def test_reports_are_split_into_pages_and_a_manifest(tmp_path):
+    add_reports(tmp_path, 25)
+    generate_index_html(tmp_path, page_size=10)
+
+    assert sorted(p.name for p in tmp_path.glob("index*.html")) == ["index-2.html", "index-3.html", "index.html"]
+    assert (tmp_path / "index-3.html").read_text().count('class="report-card"') == 5
+    first = (tmp_path / "index.html").read_text()
+    assert first.count('class="report-card"') == 10
+    assert 'href="index-2.html"' in first
+
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    assert manifest["columns"] == list(MANIFEST_COLUMNS)
+    assert len(manifest["rows"]) == 25
+    assert (manifest["pages"], manifest["page_size"]) == (3, 10)
+    assert manifest["stats"]["total_reports"] == 25
+    assert manifest["stats"]["identical"] == 4
+
+
+def test_stale_pages_are_removed_when_the_index_shrinks(tmp_path):
+    add_reports(tmp_path, 25)
+    generate_index_html(tmp_path, page_size=10)
+    generate_index_html(tmp_path, page_size=20)
+
+    assert sorted(p.name for p in tmp_path.glob("index*.html")) == ["index-2.html", "index.html"]
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_only_new_rows_get_a_new_card(tmp_path, capsys):
+    add_reports(tmp_path, 3)
+    generate_index_html(tmp_path)
+    generate_index_html(tmp_path)
+    assert "Índice al día" in capsys.readouterr().out
+
+    add_reports(tmp_path, 1, start=3)
+    generate_index_html(tmp_path)
+    assert "1 tarjetas actualizadas" in capsys.readouterr().out
+
+
+def test_empty_store_writes_an_empty_dashboard(tmp_path):
+    generate_index_html(tmp_path)
+
+    assert "No reports available" in (tmp_path / "index.html").read_text()
+    assert json.loads((tmp_path / MANIFEST_NAME).read_text())["rows"] == []
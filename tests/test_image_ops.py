@@ -0,0 +1,81 @@
+import asyncio
+import io
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from image_ops import SEPARATOR_PX, ImageWorkPool, compose
+
+
+def png(size=(400, 2000), box=None):
+    img = Image.new('RGB', size, 'white')
+    if box:
+        ImageDraw.Draw(img).rectangle(box, fill='red')
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ImageWorkPool(max_workers=2, work_dir=tmp_path)
+    yield pool
+    pool.shutdown()
+
+
+def test_identical_screenshots_are_not_prepared(pool, tmp_path):
+    result = asyncio.run(pool.prepare_comparison(png(), png()))
+    assert result == {"identical": True}
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_changes_are_cropped_to_a_band_in_a_worker(pool):
+    result = asyncio.run(pool.prepare_comparison(png(), png(box=(10, 1000, 50, 1010))))
+
+    assert result["bbox"] == [10, 1000, 51, 1011]
+    assert result["cropped"]
+    # Franja de 200 px de margen por cada lado, V1 sobre V2
+    assert result["sizes"] == [[400, 2 * 411]]
+    with Image.open(result["paths"][0]) as composed:
+        assert composed.size == (400, 822)
+
+
+def test_file_paths_and_bytes_can_be_mixed(pool, tmp_path):
+    path = tmp_path / "v1.png"
+    path.write_bytes(png())
+    result = asyncio.run(pool.prepare_comparison(path, png(box=(0, 0, 399, 1999)), crop=True))
+    assert not result["cropped"]
+    assert result["sizes"] == [[400, 4000]]
+
+
+@pytest.mark.parametrize("strategy, sizes", [
+    ("stack", [(300, 300)]),
+    ("side_by_side", [(300 + SEPARATOR_PX + 300, 200)]),
+    ("separate", [(300, 100), (300, 200)]),
+    ("overlay", [(300, 200)]),
+])
+def test_each_strategy_composes_its_layout(strategy, sizes):
+    img1 = Image.new('RGB', (300, 100), 'white')
+    img2 = Image.new('RGB', (300, 200), 'white')
+    assert [image.size for image in compose(img1, img2, strategy)] == sizes
+
+
+def test_overlay_tints_only_the_changed_pixels():
+    img1 = Image.new('RGB', (100, 100), 'white')
+    img2 = img1.copy()
+    ImageDraw.Draw(img2).rectangle((40, 40, 59, 59), fill='black')
+
+    overlay, = compose(img1, img2, "overlay")
+    assert overlay.getpixel((0, 0)) == (255, 255, 255)
+    assert overlay.getpixel((50, 50)) != (0, 0, 0)
+    assert overlay.getpixel((50, 50))[0] > overlay.getpixel((50, 50))[1]
+
+
+def test_unknown_strategy_is_rejected():
+    image = Image.new('RGB', (10, 10))
+    with pytest.raises(ValueError):
+        compose(image, image, "mosaic")
@@ -0,0 +1,88 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from inference_limits import AIMDLimiter, limiter_for_host
+
+
+def test_same_settings_share_the_host_limiter():
+    first = limiter_for_host("http://shared-host:11434", initial=4, adaptive=False)
+    assert limiter_for_host("shared-host:11434", initial=4, adaptive=False) is first
+
+
+def test_conflicting_settings_for_a_host_are_rejected():
+    limiter = limiter_for_host("http://conflict-host:11434", initial=2, adaptive=False)
+
+    with pytest.raises(ValueError, match="initial=2"):
+        limiter_for_host("http://conflict-host:11434", initial=8, adaptive=False)
+    with pytest.raises(ValueError):
+        limiter_for_host("http://conflict-host:11434", initial=2, adaptive=True)
+    assert limiter.limit == 2
+
+
+def test_fixed_limit_never_adapts():
+    limiter = AIMDLimiter(initial=3, adaptive=False)
+    for _ in range(10):
+        limiter.on_success(100)
+    limiter.on_failure()
+    assert limiter.stats()["limit"] == 3 and limiter.decreases == 0
+
+
+def test_limit_grows_additively_up_to_the_maximum():
+    limiter = AIMDLimiter(initial=2, max_limit=4)
+    # +1/limit por llamada: aproximadamente +1 por ventana de `limit` llamadas
+    limiter.on_success(100)
+    limiter.on_success(100)
+    assert 2.5 < limiter.limit < 3
+    for _ in range(20):
+        limiter.on_success(100)
+    assert limiter.limit == 4
+
+
+def test_slow_calls_back_off_once_per_window():
+    limiter = AIMDLimiter(initial=8)
+    limiter.on_success(100)
+    limiter.in_flight = 3
+    # Las llamadas que ya estaban en vuelo no vuelven a reducir
+    for _ in range(4):
+        limiter.on_success(1000)
+    assert limiter.decreases == 1
+    assert int(limiter.limit) == 4
+
+    limiter.on_success(1000)
+    assert limiter.decreases == 2
+
+
+def test_latency_is_compared_per_token():
+    limiter = AIMDLimiter(initial=4)
+    limiter.on_success(100, tokens=10)
+    limiter.on_success(1000, tokens=100)
+    assert limiter.decreases == 0
+
+
+def test_failures_back_off_down_to_the_minimum():
+    limiter = AIMDLimiter(initial=4, min_limit=1)
+    for _ in range(5):
+        limiter.on_failure()
+    assert limiter.limit == 1
+
+
+def test_slots_respect_the_current_limit():
+    limiter = AIMDLimiter(initial=2, adaptive=False)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2 and limiter.in_flight == 0
@@ -0,0 +1,39 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from image_ops import limit_width
+from inference_profiles import AUTO_THREADS, PROFILES, InferenceProfile, get_profile
+
+
+def test_default_profile_sends_no_options():
+    assert get_profile("default").options() == {}
+
+
+def test_only_set_options_are_sent():
+    profile = InferenceProfile("custom", num_ctx=4096, temperature=0.0)
+    assert profile.options() == {"num_ctx": 4096, "temperature": 0.0}
+
+
+def test_auto_threads_only_apply_to_a_local_host():
+    profile = InferenceProfile("auto", num_thread=AUTO_THREADS)
+    assert profile.options("http://localhost:11434") == {"num_thread": os.cpu_count()}
+    assert profile.options("http://gpu-01:11434") == {}
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError, match="fast-triage"):
+        get_profile("turbo")
+
+
+def test_width_cap_keeps_the_aspect_ratio_of_each_screenshot():
+    tall = Image.new('RGB', (1280, 10000))
+    limited = limit_width(tall, PROFILES["cpu-small"].max_image_width)
+    assert limited.size == (768, 6000)
+    assert limit_width(tall, None) is tall
+    assert limit_width(Image.new('RGB', (500, 800)), 768).size == (500, 800)
@@ -0,0 +1,140 @@
+import asyncio
+import http.client
+import json
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import mock_ollama
+from qa_service import ComparisonService, create_server
+from smartVisionQA import SmartVisionQA, VisionAnalyzer
+
+
+def chromium_available() -> bool:
+    from playwright.sync_api import sync_playwright
+
+    try:
+        with sync_playwright() as playwright:
+            playwright.chromium.launch().close()
+        return True
+    except Exception:
+        return False
+
+
+@pytest.fixture
+def ollama_host():
+    server = mock_ollama.create_server(port=0, latency=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def qa(tmp_path, ollama_host):
+    demo_dir = tmp_path / "demo"
+    demo_dir.mkdir()
+    for name in ("page_v1.html", "page_v2.html"):
+        shutil.copy(ROOT / "demo" / name, demo_dir / name)
+    qa = SmartVisionQA(demo_dir=demo_dir, results_dir=tmp_path / "results",
+                       analyzer=VisionAnalyzer(model="mock", host=ollama_host))
+    yield qa
+    qa.close()
+
+
+def request(port, method, path, body=None, client="ci"):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    headers = {"X-Client-Id": client, "Content-Type": "application/json"}
+    connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def serve_http(service):
+    server = create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_per_client_limit_lets_other_clients_through(qa):
+    service = ComparisonService(qa, per_client=2)
+    server = serve_http(service)
+    port = server.server_address[1]
+    try:
+        pair = {"v1": "page_v1.html", "v2": "page_v2.html"}
+        submitted = [json.loads(request(port, "POST", "/comparisons", pair, client)[1])["id"]
+                     for client in ("ci-a", "ci-a", "ci-a", "ci-b")]
+
+        started = [service._next_job() for _ in range(4)]
+        assert [job.id if job else None for job in started] == submitted[:2] + [submitted[3], None]
+        assert json.loads(request(port, "GET", f"/comparisons/{submitted[2]}")[1])["status"] == "queued"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_events_stream_ends_with_the_final_status(qa):
+    service = ComparisonService(qa)
+    server = serve_http(service)
+    port = server.server_address[1]
+    try:
+        job_id = json.loads(request(port, "POST", "/comparisons", {"v1": "page_v1.html", "v2": "page_v2.html"})[1])["id"]
+        assert request(port, "DELETE", f"/comparisons/{job_id}")[0] == 200
+
+        status, stream = request(port, "GET", f"/comparisons/{job_id}/events")
+        assert status == 200
+        assert stream.decode().startswith("event: status\ndata: ")
+        assert json.loads(stream.decode().split("data: ", 1)[1])["status"] == "cancelled"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_results_do_not_leave_the_results_dir(qa, tmp_path):
+    (tmp_path / "secret.txt").write_text("secret")
+    (qa.results_dir / "report.json").write_text("{}")
+    server = serve_http(ComparisonService(qa))
+    port = server.server_address[1]
+    try:
+        assert request(port, "GET", "/results/report.json")[0] == 200
+        assert request(port, "GET", "/results/..%2Fsecret.txt")[0] == 404
+        assert request(port, "GET", "/results/../secret.txt")[0] == 404
+        assert request(port, "GET", "/results/.work")[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.skipif(not chromium_available(), reason="Chromium de Playwright no instalado")
+def test_submitted_comparison_streams_events_until_done(qa):
+    service = ComparisonService(qa)
+    server = create_server(service, port=0)
+    port = server.server_address[1]
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(service.run(server, warm_up=False))
+    thread = threading.Thread(target=lambda: loop.run_until_complete(asyncio.gather(task, return_exceptions=True)))
+    thread.start()
+    try:
+        status, body = request(port, "POST", "/comparisons", {"v1": "page_v1.html", "v2": "page_v2.html"})
+        assert status == 202
+        job_id = json.loads(body)["id"]
+
+        status, stream = request(port, "GET", f"/comparisons/{job_id}/events")
+        events = [json.loads(line[len("data: "):]) for line in stream.decode().splitlines()
+                  if line.startswith("data: ")]
+        assert status == 200
+        assert events[-1]["status"] == "ok"
+        assert request(port, "GET", events[-1]["artifacts"]["json"])[0] == 200
+    finally:
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(timeout=30)
+        loop.close()
+        server.server_close()
@@ -0,0 +1,47 @@
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import report_templates
+from generate_html_report import render_from_results
+from report_templates import ASSETS, ensure_assets
+
+RESULTS = {
+    "file1": "page_v1.html", "file2": "page_v2.html",
+    "differences": {"layout_changes": [], "text_changes": ["V1 has Old title, V2 has New title"],
+                    "style_changes": [], "element_changes": []},
+}
+
+
+def _ensure_in_fresh_process(results_dir: str) -> None:
+    for _ in range(8):
+        report_templates._assets_written.clear()
+        ensure_assets(Path(results_dir))
+
+
+def test_report_links_the_shared_assets_instead_of_inlining_them(tmp_path):
+    path, html = render_from_results(RESULTS, tmp_path)
+
+    assert path == tmp_path / "visual_report_page_v1_vs_page_v2.html"
+    assert 'href="assets/report.css"' in html
+    assert report_templates.REPORT_CSS not in html
+    assert "V1 has Old title, V2 has New title" in html
+    assert {p.name for p in (tmp_path / "assets").iterdir()} == set(ASSETS)
+
+
+def test_changed_assets_are_rewritten(tmp_path):
+    ensure_assets(tmp_path)
+    (tmp_path / "assets" / "report.css").write_text("stale")
+
+    report_templates._assets_written.clear()
+    ensure_assets(tmp_path)
+    assert (tmp_path / "assets" / "report.css").read_text() == ASSETS["report.css"]
+
+
+def test_parallel_processes_leave_no_temporary_files(tmp_path):
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_ensure_in_fresh_process, [str(tmp_path)] * 8))
+
+    assert sorted(p.name for p in (tmp_path / "assets").iterdir()) == sorted(ASSETS)
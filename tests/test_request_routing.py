@@ -0,0 +1,80 @@
+import asyncio
+import sys
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from request_routing import RequestRouter, RoutingPolicy
+
+async_api = pytest.importorskip("playwright.async_api")
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type="image"):
+        self.url = url
+        self.resource_type = resource_type
+        self.headers = {}
+
+
+class FakeRoute:
+    def __init__(self, request):
+        self.request = request
+        self.outcome = None
+
+    async def abort(self, error_code=None):
+        self.outcome = "aborted"
+
+    async def continue_(self):
+        self.outcome = "continued"
+
+
+@pytest.fixture
+def asset_server(tmp_path):
+    (tmp_path / "big.png").write_bytes(b"\0" * 50_000)
+    (tmp_path / "small.png").write_bytes(b"\0" * 500)
+    handler = partial(QuietHandler, directory=str(tmp_path))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def route_assets(base_url, names, resource_type="image"):
+    async def run():
+        async with async_api.async_playwright() as playwright:
+            request_context = await playwright.request.new_context()
+            router = RequestRouter(RoutingPolicy(max_resource_bytes=10_000), request_context=request_context)
+            routes = [FakeRoute(FakeRequest(f"{base_url}/{name}", resource_type)) for name in names]
+            for route in routes:
+                await router.handle(route)
+            await request_context.dispose()
+            return [route.outcome for route in routes], router.counts
+
+    return asyncio.run(run())
+
+
+def test_oversized_asset_is_dropped(asset_server):
+    outcomes, counts = route_assets(asset_server, ["big.png", "small.png", "missing.png"])
+
+    assert outcomes == ["aborted", "continued", "continued"]
+    assert counts["oversized"] == 1
+    assert counts["allowed"] == 2
+
+
+def test_size_limit_ignores_other_resource_types(asset_server):
+    outcomes, counts = route_assets(asset_server, ["big.png"], resource_type="script")
+
+    assert outcomes == ["continued"]
+    assert counts["oversized"] == 0
@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from run_history import RunHistory
+
+
+def results(file1, file2, text_changes, total_ms, analyze_ms):
+    return {"file1": file1, "file2": file2,
+            "differences": {"layout_changes": [], "text_changes": text_changes,
+                            "style_changes": ["V1 has a blue header, V2 has a purple header"],
+                            "element_changes": []},
+            "timings": {"render_v1": 100, "analyze": analyze_ms, "total": total_ms}}
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = RunHistory.for_results_dir(tmp_path)
+    yield history
+    history.close()
+
+
+def test_trend_lists_a_pair_newest_first(history):
+    for n in range(3):
+        run_id = history.start_run("mock")
+        history.record_comparison(run_id, results("a.html", "b.html", ["change"] * n, 1000 + n, 500))
+
+    trend = history.trend("a.html", "b.html")
+    assert [row["text_changes"] for row in trend] == [2, 1, 0]
+    assert [row["total_changes"] for row in trend] == [3, 2, 1]
+    assert history.runs()[0]["comparisons"] == 1
+
+
+def test_page_history_finds_the_page_as_v1_or_v2(history):
+    run_id = history.start_run("mock")
+    history.record_comparison(run_id, results("a.html", "b.html", [], 1000, 500))
+    history.record_comparison(run_id, results("b.html", "c.html", [], 1000, 500))
+    history.record_comparison(run_id, results("c.html", "d.html", [], 1000, 500))
+
+    pairs = [(row["file1"], row["file2"]) for row in history.page_history("b.html")]
+    assert sorted(pairs) == [("a.html", "b.html"), ("b.html", "c.html")]
+
+
+def test_slowest_by_total_and_by_stage(history):
+    run_id = history.start_run("mock")
+    history.record_comparison(run_id, results("a.html", "b.html", [], 3000, 200))
+    history.record_comparison(run_id, results("b.html", "c.html", [], 1000, 900))
+
+    assert history.slowest(1)[0]["file1"] == "a.html"
+    assert history.slowest(1, stage="analyze")[0]["file1"] == "b.html"
+
+
+def test_changes_are_stored_per_category(history):
+    run_id = history.start_run("mock")
+    comparison_id = history.record_comparison(run_id, results("a.html", "b.html", ["title"], 1000, 500))
+
+    assert history.changes(comparison_id) == [
+        {"category": "text_changes", "description": "title"},
+        {"category": "style_changes", "description": "V1 has a blue header, V2 has a purple header"},
+    ]
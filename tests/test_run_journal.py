@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from run_journal import RunJournal
+
+
+def test_resume_continues_an_unfinished_run(tmp_path):
+    journal = RunJournal.for_results_dir(tmp_path)
+    try:
+        run_key = journal.start()
+        journal.record(run_key, "pair", "report", {"json": "comparison_pair.json"})
+        assert journal.start(resume=True) == run_key
+    finally:
+        journal.close()
+
+
+def test_resume_after_a_completed_run_starts_a_new_one(tmp_path):
+    journal = RunJournal.for_results_dir(tmp_path)
+    try:
+        run_key = journal.start()
+        journal.record(run_key, "pair", "report", {"json": "comparison_pair.json"})
+        journal.finish(run_key)
+
+        resumed = journal.start(resume=True)
+        assert resumed != run_key
+        assert journal.entries(resumed, "pair") == {}
+    finally:
+        journal.close()
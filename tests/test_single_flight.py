@@ -0,0 +1,83 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from single_flight import SingleFlight
+
+
+def test_identical_calls_share_one_execution_and_get_their_own_copy():
+    flight = SingleFlight()
+    calls = []
+
+    async def render():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"boxes": [1, 2]}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("render", "page", render) for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert flight.stats() == {"render": {"executed": 1, "coalesced": 2}}
+    results[0]["boxes"].append(3)
+    assert results[1] == {"boxes": [1, 2]}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    async def run():
+        return await asyncio.gather(flight.do("render", "a", lambda: asyncio.sleep(0, "a")),
+                                    flight.do("render", "b", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(run()) == ["a", "b"]
+    assert flight.stats()["render"]["executed"] == 2
+
+
+def test_cancelling_one_caller_does_not_cancel_the_shared_task():
+    flight = SingleFlight()
+    release = None
+
+    async def analyze():
+        await release.wait()
+        return "done"
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.ensure_future(flight.do("analyze", "pair", analyze))
+        second = asyncio.ensure_future(flight.do("analyze", "pair", analyze))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_an_exception_reaches_every_caller_and_the_key_is_retried():
+    flight = SingleFlight()
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("ollama down")
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("analyze", "pair", failing) for _ in range(2)),
+                                       return_exceptions=True)
+        retry = await flight.do("analyze", "pair", lambda: asyncio.sleep(0, "ok"))
+        return results, retry
+
+    results, retry = asyncio.run(run())
+    assert [str(error) for error in results] == ["ollama down", "ollama down"]
+    assert len(attempts) == 1
+    assert retry == "ok"
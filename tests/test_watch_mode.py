@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from watch_mode import affected_comparisons, changed_files, page_version, scan
+
+
+def write_site(demo_dir):
+    (demo_dir / "css").mkdir(parents=True)
+    (demo_dir / "css" / "shared.css").write_text("body { color: black }")
+    (demo_dir / "a.html").write_text('<link rel="stylesheet" href="css/shared.css"><h1>A</h1>')
+    (demo_dir / "b.html").write_text('<img src="https://example.com/logo.png"><h1>B</h1>')
+    (demo_dir / "c.html").write_text("<h1>C</h1>")
+
+
+def test_changed_files_reports_created_modified_and_deleted():
+    before = {Path("kept"): (1, 10), Path("edited"): (1, 10), Path("deleted"): (1, 10)}
+    after = {Path("kept"): (1, 10), Path("edited"): (2, 10), Path("created"): (3, 5)}
+    assert changed_files(before, after) == {Path("edited"), Path("deleted"), Path("created")}
+
+
+def test_scan_skips_hidden_and_excluded_paths(tmp_path):
+    write_site(tmp_path)
+    (tmp_path / ".cache").mkdir()
+    (tmp_path / ".cache" / "x").write_text("x")
+    (tmp_path / "results").mkdir()
+    (tmp_path / "results" / "report.json").write_text("{}")
+
+    files = scan([tmp_path], exclude=[tmp_path / "results"])
+    assert {path.relative_to(tmp_path.resolve()).as_posix() for path in files} == {
+        "css/shared.css", "a.html", "b.html", "c.html"}
+
+
+def test_shared_stylesheet_affects_only_the_pages_that_use_it(tmp_path):
+    write_site(tmp_path)
+    comparisons = [{"v1": "a.html", "v2": "b.html"}, {"v1": "b.html", "v2": "c.html"},
+                   {"url1": "http://localhost:8000/a", "url2": "http://localhost:8000/b"}]
+    changed = {(tmp_path / "css" / "shared.css").resolve()}
+
+    assert affected_comparisons(comparisons, changed, tmp_path) == [comparisons[0], comparisons[2]]
+    assert affected_comparisons(comparisons, {(tmp_path / "c.html").resolve()}, tmp_path) == comparisons[1:]
+
+
+def test_page_version_follows_local_dependencies(tmp_path):
+    write_site(tmp_path)
+    page = tmp_path / "a.html"
+    version = page_version(page)
+    assert page_version(page) == version
+
+    (tmp_path / "css" / "shared.css").write_text("body { color: red }")
+    assert page_version(page) != version
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Miniaturas WebP y pirámides de teselas para los reportes HTML
+Los reportes muestran la miniatura y cargan la resolución completa solo bajo demanda
+"""
+
+import asyncio
+import json
+import math
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from PIL import Image
+
+
+PREVIEWS_DIRNAME = "previews"
+THUMBNAIL_WIDTH = 480
+TILE_SIZE = 512
+WEBP_QUALITY = 80
+
+
+def _is_fresh(target: Path, source: Path) -> bool:
+    return target.exists() and target.stat().st_mtime >= source.stat().st_mtime
+
+
+def make_thumbnail(image_path: Path, output_path: Path, max_width: int = THUMBNAIL_WIDTH) -> Path:
+    """Miniatura WebP reducida al ancho indicado"""
+    with Image.open(image_path) as img:
+        img = img.convert('RGB')
+        if img.width > max_width:
+            height = max(1, round(img.height * max_width / img.width))
+            img = img.resize((max_width, height), Image.LANCZOS)
+        img.save(output_path, format='WEBP', quality=WEBP_QUALITY, method=4)
+    return output_path
+
+
+def make_tile_pyramid(image_path: Path, output_dir: Path, tile_size: int = TILE_SIZE) -> Dict:
+    """Pirámide de teselas: el nivel 0 es la resolución completa y cada nivel
+    siguiente divide el tamaño por 2 hasta que la imagen cabe en una tesela."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    levels = []
+    with Image.open(image_path) as img:
+        level_img = img.convert('RGB')
+        level = 0
+        while True:
+            cols = math.ceil(level_img.width / tile_size)
+            rows = math.ceil(level_img.height / tile_size)
+            level_dir = output_dir / str(level)
+            level_dir.mkdir(exist_ok=True)
+            for row in range(rows):
+                for col in range(cols):
+                    box = (col * tile_size, row * tile_size,
+                           min((col + 1) * tile_size, level_img.width),
+                           min((row + 1) * tile_size, level_img.height))
+                    level_img.crop(box).save(level_dir / f"{col}_{row}.webp",
+                                             format='WEBP', quality=WEBP_QUALITY, method=4)
+            levels.append({"width": level_img.width, "height": level_img.height,
+                           "cols": cols, "rows": rows})
+            if cols == 1 and rows == 1:
+                break
+            level_img = level_img.resize((max(1, level_img.width // 2), max(1, level_img.height // 2)),
+                                         Image.LANCZOS)
+            level += 1
+
+    pyramid = {"tile_size": tile_size, "levels": levels}
+    with open(output_dir / "pyramid.json", 'w') as f:
+        json.dump(pyramid, f)
+    return pyramid
+
+
+def preview_paths(image_path: Path, results_dir: Path) -> Tuple[Path, Path]:
+    """(miniatura, directorio de teselas) de una captura. Las capturas en subdirectorios
+    de results_dir (p. ej. blobs/ab/) tienen sus previsualizaciones en el mismo
+    subdirectorio de previews/, para que ningún directorio crezca sin límite."""
+    previews_dir = results_dir / PREVIEWS_DIRNAME
+    if results_dir in image_path.parents:
+        previews_dir = previews_dir / image_path.parent.relative_to(results_dir)
+    return previews_dir / f"{image_path.stem}_thumb.webp", previews_dir / f"{image_path.stem}_tiles"
+
+
+def build_previews(image_path: str, results_dir: str) -> Dict:
+    """Genera miniatura y pirámide para una captura. Devuelve rutas relativas a results_dir
+    y, en "io", las lecturas y escrituras de disco realizadas.
+
+    Se ejecuta en un proceso del pool, por eso recibe y devuelve datos serializables.
+    """
+    image_path = Path(image_path)
+    results_dir = Path(results_dir)
+    thumb_path, tiles_dir = preview_paths(image_path, results_dir)
+    thumb_path.parent.mkdir(parents=True, exist_ok=True)
+    # Lecturas y escrituras de disco hechas por este worker, para las estadísticas de E/S
+    io = {"reads": 0, "writes": 0, "bytes_read": 0, "bytes_written": 0}
+    if not _is_fresh(thumb_path, image_path):
+        make_thumbnail(image_path, thumb_path)
+        io["reads"] += 1
+        io["bytes_read"] += image_path.stat().st_size
+        io["writes"] += 1
+        io["bytes_written"] += thumb_path.stat().st_size
+    pyramid_path = tiles_dir / "pyramid.json"
+    if _is_fresh(pyramid_path, image_path):
+        with open(pyramid_path, 'r') as f:
+            pyramid = json.load(f)
+        io["reads"] += 1
+        io["bytes_read"] += pyramid_path.stat().st_size
+    else:
+        pyramid = make_tile_pyramid(image_path, tiles_dir)
+        io["reads"] += 1
+        io["bytes_read"] += image_path.stat().st_size
+        for level in range(len(pyramid["levels"])):
+            for entry in os.scandir(tiles_dir / str(level)):
+                io["writes"] += 1
+                io["bytes_written"] += entry.stat().st_size
+        io["writes"] += 1
+        io["bytes_written"] += pyramid_path.stat().st_size
+
+    return {
+        "full": Path(os.path.relpath(image_path, results_dir)).as_posix(),
+        "thumbnail": Path(os.path.relpath(thumb_path, results_dir)).as_posix(),
+        "tiles": Path(os.path.relpath(tiles_dir, results_dir)).as_posix(),
+        "pyramid": pyramid,
+        "io": io,
+    }
+
+
+def generate_previews(image_paths: List[Path], results_dir: Path, executor: Executor = None) -> List[Dict]:
+    """Genera las previsualizaciones de varias capturas en paralelo"""
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=min(len(image_paths), os.cpu_count() or 1)) as pool:
+            return generate_previews(image_paths, results_dir, pool)
+
+    futures = [executor.submit(build_previews, str(path), str(results_dir)) for path in image_paths]
+    return [_without_io(future.result()) for future in futures]
+
+
+async def generate_previews_async(image_paths: List[Path], results_dir: Path, executor: Executor) -> List[Dict]:
+    """Como generate_previews, pero esperando al pool sin bloquear el event loop.
+    Cada previsualización conserva la clave "io" con las lecturas y escrituras hechas."""
+    loop = asyncio.get_running_loop()
+    return list(await asyncio.gather(*(
+        loop.run_in_executor(executor, build_previews, str(path), str(results_dir)) for path in image_paths
+    )))
+
+
+def _without_io(preview: Dict) -> Dict:
+    preview.pop("io", None)
+    return preview
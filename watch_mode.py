@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Modo watch para iterar en local
+Vigila el directorio de demo (y los que se indiquen), y con el navegador y el
+modelo calientes vuelve a renderizar solo las páginas cuyos ficheros cambiaron
+y a ejecutar solo las comparaciones afectadas
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+POLL_SECONDS = 0.5
+# Los editores guardan en varias escrituras: se espera a que el árbol deje de cambiar
+DEBOUNCE_SECONDS = 0.3
+
+# Referencias a ficheros locales desde un HTML (hojas de estilo, scripts, imágenes)
+_LOCAL_REF = re.compile(r'''(?:href|src)\s*=\s*["']([^"'#?]+)''', re.IGNORECASE)
+_IGNORED_DIRS = {"__pycache__", "node_modules", ".git"}
+
+
+def scan(directories: Iterable[Path], exclude: Iterable[Path] = ()) -> Dict[Path, Tuple[int, int]]:
+    """(mtime_ns, tamaño) de cada fichero bajo `directories`, sin los ocultos ni `exclude`"""
+    excluded = [Path(path).resolve() for path in exclude]
+    files = {}
+    for directory in directories:
+        base = Path(directory).resolve()
+        for path in base.rglob("*"):
+            if any(part.startswith(".") or part in _IGNORED_DIRS for part in path.relative_to(base).parts):
+                continue
+            if any(path == ex or ex in path.parents for ex in excluded) or not path.is_file():
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def changed_files(before: Dict[Path, Tuple[int, int]], after: Dict[Path, Tuple[int, int]]) -> Set[Path]:
+    """Ficheros creados, modificados o eliminados"""
+    return {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+
+
+def local_dependencies(html_path: Path) -> Set[Path]:
+    """Ficheros locales referenciados por la página (solo el primer nivel)"""
+    try:
+        html = html_path.read_text(encoding='utf-8', errors='replace')
+    except OSError:
+        return set()
+    deps = set()
+    for ref in _LOCAL_REF.findall(html):
+        if "://" in ref or ref.startswith(("data:", "mailto:", "javascript:", "//")):
+            continue
+        deps.add((html_path.parent / ref.lstrip("/")).resolve())
+    return deps
+
+
+def page_version(html_path: Path) -> str:
+    """Huella de una página y sus ficheros locales: cambia si hay que volver a renderizarla"""
+    digest = hashlib.sha256()
+    for path in sorted({Path(html_path).resolve(), *local_dependencies(html_path)}):
+        digest.update(str(path).encode('utf-8') + b'\0')
+        try:
+            digest.update(path.read_bytes())
+        except OSError:
+            digest.update(b'<missing>')
+    return digest.hexdigest()
+
+
+def affected_comparisons(comparisons: List[Dict], changed: Set[Path], demo_dir: Path) -> List[Dict]:
+    """Comparaciones de ficheros que usan alguna página cambiada (o un fichero que
+    estas referencian). Las de URLs se repiten ante cualquier cambio: el servidor
+    de desarrollo puede estar sirviendo esos mismos ficheros."""
+    affected = []
+    for spec in comparisons:
+        if 'url1' in spec:
+            affected.append(spec)
+            continue
+        for name in (spec['v1'], spec['v2']):
+            page = (Path(demo_dir) / name).resolve()
+            if page in changed or local_dependencies(page) & changed:
+                affected.append(spec)
+                break
+    return affected
+
+
+async def watch(qa, comparisons: List[Dict], directories: List[Path], jobs: int = 1,
+                interval: float = POLL_SECONDS, on_batch=None, max_batches: int = None) -> None:
+    """Ejecuta todas las comparaciones y después, en cada cambio, solo las afectadas.
+
+    `qa` debe tener el navegador y el modelo ya calientes (ver cli.run_watch).
+    `on_batch(outcomes)` se llama tras cada tanda (p. ej. para regenerar el índice).
+    """
+    semaphore = asyncio.Semaphore(max(1, jobs))
+
+    async def run_one(spec: Dict) -> Dict:
+        async with semaphore:
+            return await qa.run_spec(spec)
+
+    async def run_batch(specs: List[Dict]) -> None:
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(run_one(spec) for spec in specs))
+        errors = sum(1 for outcome in outcomes if outcome['status'] == 'error')
+        print(f"\n[watch] {len(outcomes)} comparaciones en {time.perf_counter() - start:.1f} s"
+              f"{f', {errors} con error' if errors else ''}")
+        if on_batch:
+            on_batch(outcomes)
+
+    exclude = [qa.results_dir]
+    snapshot = scan(directories, exclude)
+    await run_batch(comparisons)
+    batches = 1
+    print(f"[watch] Vigilando {', '.join(str(d) for d in directories)} (Ctrl+C para salir)")
+
+    while max_batches is None or batches < max_batches:
+        await asyncio.sleep(interval)
+        current = await asyncio.to_thread(scan, directories, exclude)
+        if not changed_files(snapshot, current):
+            continue
+        while True:
+            await asyncio.sleep(DEBOUNCE_SECONDS)
+            settled = await asyncio.to_thread(scan, directories, exclude)
+            if settled == current:
+                break
+            current = settled
+        changed = changed_files(snapshot, current)
+        snapshot = current
+
+        affected = affected_comparisons(comparisons, changed, qa.demo_dir)
+        names = ", ".join(sorted(path.name for path in changed)[:5])
+        if not affected:
+            print(f"[watch] Cambios en {names}: ninguna comparación afectada")
+            continue
+        print(f"[watch] Cambios en {names}: {len(affected)} comparaciones afectadas")
+        await run_batch(affected)
+        batches += 1
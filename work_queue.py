@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Cola de trabajo compartida para repartir comparaciones entre máquinas (SQLite)
+Un coordinador encola los trabajos y cualquier número de workers los toma con
+un lease temporal; si un worker muere, el lease caduca y el trabajo se reintenta
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+QUEUE_DB_NAME = "queue.db"
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Ventana usada para calcular el throughput reciente
+THROUGHPUT_WINDOW_SECONDS = 300
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker TEXT,
+    error TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(finished_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """Cola de comparaciones con leases, reintentos y progreso.
+
+    Los estados de un trabajo son pending -> leased -> done | failed. Un lease
+    caducado vuelve a pending mientras queden intentos.
+    """
+
+    def __init__(self, db_path: Path, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Transacciones explícitas: tomar un trabajo debe ser atómico entre procesos.
+        # Los workers llaman desde hilos (ver run_worker): la conexión se comparte con un lock
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        # Sin WAL: su memoria compartida (-shm) no funciona entre máquinas ni en
+        # sistemas de ficheros de red, que es donde vive una cola compartida
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_results_dir(cls, results_dir: Path, **kwargs) -> "WorkQueue":
+        return cls(Path(results_dir) / QUEUE_DB_NAME, **kwargs)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def get_meta(self, key: str, default: str = None) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else default
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._transaction():
+            self.conn.execute("""
+                INSERT INTO meta (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """, (key, value))
+
+    # Coordinador
+
+    def enqueue(self, comparisons: List[Dict]) -> int:
+        """Encola comparaciones {"v1", "v2"} o {"url1", "url2"}"""
+        now = time.time()
+        with self._transaction():
+            self.conn.executemany(
+                "INSERT INTO jobs (spec, enqueued_at) VALUES (?, ?)",
+                [(json.dumps(spec, sort_keys=True), now) for spec in comparisons]
+            )
+        return len(comparisons)
+
+    def retry_failed(self) -> int:
+        """Devuelve a pending los trabajos que agotaron sus intentos"""
+        with self._transaction():
+            cursor = self.conn.execute("""
+                UPDATE jobs SET status = 'pending', attempts = 0, error = NULL,
+                    lease_owner = NULL, lease_expires = NULL
+                WHERE status = 'failed'
+            """)
+        return cursor.rowcount
+
+    # Workers
+
+    def _reclaim_expired(self, now: float) -> None:
+        """Recupera los trabajos de workers que dejaron de renovar su lease"""
+        self.conn.execute("""
+            UPDATE jobs SET
+                status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                error = 'lease expirado (' || lease_owner || ')',
+                finished_at = CASE WHEN attempts >= ? THEN ? ELSE NULL END,
+                lease_owner = NULL, lease_expires = NULL
+            WHERE status = 'leased' AND lease_expires < ?
+        """, (self.max_attempts, self.max_attempts, now, now))
+
+    def lease(self, worker_id: str) -> Optional[Dict]:
+        """Toma el siguiente trabajo pendiente, o None si no hay ninguno"""
+        now = time.time()
+        with self._transaction():
+            self._reclaim_expired(now)
+            row = self.conn.execute(
+                "SELECT id, spec, attempts FROM jobs WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("""
+                UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?,
+                    attempts = attempts + 1, started_at = ?
+                WHERE id = ?
+            """, (worker_id, now + self.lease_seconds, now, row['id']))
+        return {"id": row['id'], "spec": json.loads(row['spec']), "attempt": row['attempts'] + 1}
+
+    def renew(self, job_id: int, worker_id: str) -> bool:
+        """Extiende el lease; False si el trabajo ya no pertenece a este worker"""
+        with self._transaction():
+            cursor = self.conn.execute("""
+                UPDATE jobs SET lease_expires = ?
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+            """, (time.time() + self.lease_seconds, job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: Dict = None) -> bool:
+        with self._transaction():
+            cursor = self.conn.execute("""
+                UPDATE jobs SET status = 'done', finished_at = ?, worker = ?, result = ?,
+                    error = NULL, lease_owner = NULL, lease_expires = NULL
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+            """, (time.time(), worker_id, json.dumps(result) if result is not None else None,
+                  job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """Registra un fallo; el trabajo se reintenta mientras queden intentos"""
+        now = time.time()
+        with self._transaction():
+            cursor = self.conn.execute("""
+                UPDATE jobs SET
+                    status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    finished_at = CASE WHEN attempts >= ? THEN ? ELSE NULL END,
+                    worker = ?, error = ?, lease_owner = NULL, lease_expires = NULL
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+            """, (self.max_attempts, self.max_attempts, now, worker_id, error, job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def is_drained(self) -> bool:
+        """True cuando no queda nada pendiente ni en curso"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')"
+            ).fetchone()
+        return row[0] == 0
+
+    # Progreso
+
+    def progress(self, window_seconds: float = THROUGHPUT_WINDOW_SECONDS) -> Dict:
+        """Conteos por estado, throughput reciente, ETA y trabajo en curso por worker"""
+        now = time.time()
+        counts = {status: 0 for status in ('pending', 'leased', 'done', 'failed')}
+        for row in self.conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+            counts[row['status']] = row['n']
+
+        first_finish = self.conn.execute(
+            "SELECT MIN(finished_at) FROM jobs WHERE status = 'done'"
+        ).fetchone()[0]
+        recent = self.conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'done' AND finished_at >= ?",
+            (now - window_seconds,)
+        ).fetchone()[0]
+        # Con menos historia que la ventana se usa el tiempo transcurrido real
+        elapsed = min(window_seconds, now - first_finish) if first_finish else 0
+        per_minute = recent * 60 / elapsed if elapsed > 0 else 0.0
+        remaining = counts['pending'] + counts['leased']
+
+        workers = [dict(row) for row in self.conn.execute("""
+            SELECT lease_owner AS worker, id AS job_id, spec, started_at, lease_expires
+            FROM jobs WHERE status = 'leased' ORDER BY lease_owner
+        """)]
+        completed_by = {row['worker']: row['n'] for row in self.conn.execute("""
+            SELECT worker, COUNT(*) AS n FROM jobs WHERE status = 'done' GROUP BY worker
+        """)}
+
+        return {
+            **counts,
+            'total': sum(counts.values()),
+            'throughput_per_minute': round(per_minute, 2),
+            'eta_seconds': round(remaining / per_minute * 60) if per_minute and remaining else None,
+            'in_progress': workers,
+            'completed_by_worker': completed_by,
+        }
+
+    def failures(self, limit: int = 20) -> List[sqlite3.Row]:
+        return self.conn.execute("""
+            SELECT id, spec, attempts, worker, error FROM jobs
+            WHERE status = 'failed' ORDER BY finished_at DESC LIMIT ?
+        """, (limit,)).fetchall()
+
+
+def format_progress(progress: Dict) -> str:
+    total = progress['total'] or 1
+    percent = (progress['done'] + progress['failed']) * 100 / total
+    lines = [
+        f"{progress['done']}/{progress['total']} terminados ({percent:.0f}%), "
+        f"{progress['leased']} en curso, {progress['pending']} pendientes, {progress['failed']} fallidos",
+        f"Throughput: {progress['throughput_per_minute']:.1f} comparaciones/min"
+        + (f", ETA ~{progress['eta_seconds'] // 60}m {progress['eta_seconds'] % 60}s"
+           if progress['eta_seconds'] is not None else ""),
+    ]
+    now = time.time()
+    for job in progress['in_progress']:
+        spec = json.loads(job['spec'])
+        label = " vs ".join(str(v) for v in spec.values())
+        lines.append(f"  {job['worker']}: #{job['job_id']} {label} ({now - job['started_at']:.0f}s)")
+    for worker, n in sorted(progress['completed_by_worker'].items(), key=lambda item: -item[1]):
+        lines.append(f"  {worker}: {n} terminados")
+    return "\n".join(lines)
+
+
+async def run_worker(qa, queue: WorkQueue, worker_id: str = None, jobs: int = 1,
+                     only_changed: bool = False, poll_seconds: float = 2.0) -> Dict[str, int]:
+    """Toma trabajos de la cola hasta vaciarla, con hasta `jobs` en paralelo.
+
+    Mientras un trabajo se ejecuta su lease se renueva periódicamente. Si otros
+    workers aún tienen trabajos en curso se sigue sondeando, por si sus leases
+    caducan y hay que recuperarlos. Las operaciones sobre la cola (BEGIN IMMEDIATE
+    con hasta 30 s de espera por el lock) van en un hilo, fuera del event loop.
+    """
+    worker_id = worker_id or default_worker_id()
+    totals = {"done": 0, "errors": 0, "lost": 0}
+
+    async def keep_alive(job_id: int, owner: str):
+        while True:
+            await asyncio.sleep(max(1.0, queue.lease_seconds / 3))
+            if not await asyncio.to_thread(queue.renew, job_id, owner):
+                print(f"[{owner}] lease perdido para el trabajo #{job_id}")
+                return
+
+    async def slot(index: int):
+        owner = f"{worker_id}/{index}" if jobs > 1 else worker_id
+        while True:
+            job = await asyncio.to_thread(queue.lease, owner)
+            if job is None:
+                if await asyncio.to_thread(queue.is_drained):
+                    return
+                await asyncio.sleep(poll_seconds)
+                continue
+
+            print(f"[{owner}] trabajo #{job['id']} (intento {job['attempt']})")
+            heartbeat = asyncio.create_task(keep_alive(job['id'], owner))
+            try:
+                outcome = await qa.run_spec(job['spec'], only_changed)
+            finally:
+                heartbeat.cancel()
+
+            if outcome['status'] == 'error':
+                recorded = await asyncio.to_thread(queue.fail, job['id'], owner, outcome.get('error', 'error'))
+                totals["errors"] += recorded
+            else:
+                recorded = await asyncio.to_thread(queue.complete, job['id'], owner, {
+                    "status": outcome['status'],
+                    "timings": outcome.get('timings', {}),
+                })
+                totals["done"] += recorded
+            if not recorded:
+                totals["lost"] += 1
+
+    await asyncio.gather(*(slot(i) for i in range(max(1, jobs))))
+    return totals